@@ -1 +1 @@
-from . import agent
\ No newline at end of file
+from .adventure_game_master import agent
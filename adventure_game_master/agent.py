@@ -1,51 +1,196 @@
-from google.adk.agents import Agent
 from game_state import GameState
 from music_player import MusicPlayer
 from emotion_analyzer import EmotionAnalyzer
+from music_prefetcher import MusicPrefetcher, rank_by_history
+from music_queue import MusicCommandQueue
+from session_store import SessionRegistry
+from game_persistence import GameJournal
+from story_graph import DEFAULT_SCENARIO_ID, StoryNode, get_scenario, list_scenarios
+from localization import LANGUAGES
+from context_builder import DEFAULT_TOKEN_BUDGET
+from metrics import REGISTRY as metrics_registry, timed
+from tracing import TRACE_FORMATS, tracer
+from session_recorder import SessionRecorder, wrap_tool
+from async_tools import ToolExecutor
+from lazy import LazySingleton, resolve
+from typing import TYPE_CHECKING, Optional
+import hashlib
 import json
+import os
+import threading
+import time
+
+if TYPE_CHECKING:
+    # 只用於型別標註；ADK 依參數名稱 tool_context 注入，執行時不必匯入（約 20 ms）
+    from google.adk.tools.tool_context import ToolContext
 
 # 全域變數
-game_state = GameState()
-music_player = MusicPlayer()
-emotion_analyzer = EmotionAnalyzer()
+# 以下的單例在第一次使用時才建立（見 lazy.py），匯入 agent 模組時不讀取記錄檔、不建立音訊後端
+# 設定 ADVENTURE_STATE_DIR 時把每回合寫入記錄檔，重新啟動後還原進行中的遊戲；會話表建立時才開啟
+game_journal = None
+
+def _open_sessions() -> SessionRegistry:
+    """建立會話表；設定 ADVENTURE_STATE_DIR 時開啟記錄檔，進行中的遊戲在會話下次使用時還原"""
+    global game_journal
+    journal = GameJournal(
+        os.environ["ADVENTURE_STATE_DIR"],
+        max_sessions=int(os.environ.get("ADVENTURE_JOURNAL_MAX_SESSIONS", "100000")),
+        ttl_seconds=float(os.environ.get("ADVENTURE_JOURNAL_TTL", "86400"))
+    ) if os.environ.get("ADVENTURE_STATE_DIR") else None
+    game_journal = journal
+    return open_registry(journal)
+
+def open_registry(journal: Optional[GameJournal] = None) -> SessionRegistry:
+    """
+    建立會話表；有記錄檔時，被淘汰出記憶體的會話下次存取會從記錄檔重建（含會話語言）
 
-def start_game() -> dict:
-    """開始遊戲，播放開場音樂並提供背景故事"""
-    global game_state, music_player
+    每個 ADK 會話各自的遊戲狀態；閒置 1 小時或超過上限時把最久未使用的會話移出記憶體。
+    """
+    return SessionRegistry(
+        max_sessions=int(os.environ.get("ADVENTURE_MAX_SESSIONS", "10000")),
+        ttl_seconds=float(os.environ.get("ADVENTURE_SESSION_TTL", "3600")),
+        loader=journal.load_session if journal else None,
+        on_remove=journal.record_drop if journal else None
+    )
+
+sessions = LazySingleton(_open_sessions, globals(), "sessions")
+# 沒有 ADK 會話時（例如直接呼叫工具函數）使用的會話 id
+DEFAULT_SESSION_ID = "local"
+
+music_player = LazySingleton(MusicPlayer, globals(), "music_player")
+# 重複的短指令直接命中快取；設定 EMOTION_MODEL_PATH 時改用編譯後的模型檔
+emotion_analyzer = LazySingleton(
+    lambda: EmotionAnalyzer(cache_size=1024, model_path=os.environ.get("EMOTION_MODEL_PATH")),
+    globals(), "emotion_analyzer")
+music_prefetcher = LazySingleton(lambda: MusicPrefetcher(resolve(music_player), max_concurrent=2),
+                                 globals(), "music_prefetcher")
+# 工具函數只排入音樂指令，由音訊執行緒合併並執行；每首音樂至少播放 3 秒
+music_queue = LazySingleton(lambda: MusicCommandQueue(resolve(music_player), min_dwell_seconds=3.0),
+                            globals(), "music_queue")
+
+# 每回合最多預先載入的候選音樂數
+PREFETCH_CANDIDATES = 4
+
+# 給模型的故事上下文 token 上限（0 表示不限制）
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("ADVENTURE_CONTEXT_TOKENS", str(DEFAULT_TOKEN_BUDGET)))
+
+def predict_next_music(state: GameState) -> list:
+    """預測下一回合可能播放的音樂，依情緒歷史出現頻率排序"""
+    if state.is_game_over():
+        return []
     
-    # 重置遊戲狀態
-    game_state = GameState()
+    history = state.emotion_history
+    candidates = rank_by_history(history, emotion_analyzer.emotion_keywords.keys())
     
-    # 播放開場音樂
-    music_result = music_player.play_music("intro")
+    # 下一回合的節點帶有音樂提示（例如最終回合的結局音樂）：其中之一一定會播放，
+    # 依歷史中觸發該節點的情緒次數排在最前面
+    cues = state.scenario.music_cues(state.current_turn + 1)
+    if cues:
+        endings = sorted(cues, key=lambda music: -sum(history.count(emotion) for emotion in cues[music]))
+        candidates = endings + [emotion for emotion in candidates if emotion not in cues]
     
-    # 開場故事 - 中英文雙語版本
-    opening_story = """
-🏰 === 文字冒險遊戲 | Text Adventure Game ===
-
-💥 巨人攻破了一直保護人類的城牆！| Giants have broken through the walls that protected humanity!
-🔥 城市在燃燒，人們在哭泣... | The city is burning, people are crying...
-⚔️  你是保護人類最後的希望！| You are humanity's last hope!
-
-現在你要怎麼做？| What will you do now?
+    return candidates[:PREFETCH_CANDIDATES]
+
+def get_session_id(tool_context: Optional["ToolContext"]) -> str:
+    """取得目前 ADK 會話的 id"""
+    if tool_context is None:
+        return DEFAULT_SESSION_ID
+    session = getattr(tool_context, "session", None)
+    if session is None:
+        session = tool_context._invocation_context.session
+    return session.id
+
+# 設定 ADVENTURE_RECORD_FILE 時錄製每個工具呼叫，可用 benchmarks/replay_sessions.py 重播
+# 錄製檔在第一次工具呼叫時才開啟
+session_recorder = (LazySingleton(lambda: SessionRecorder(os.environ["ADVENTURE_RECORD_FILE"]), globals(), "session_recorder")
+                    if os.environ.get("ADVENTURE_RECORD_FILE") else None)
+
+def recorded(func):
+    """錄製工具呼叫的參數、延遲與結果 digest；未設定錄製檔時原樣回傳函數"""
+    if session_recorder is None:
+        return func
+    return wrap_tool(func, get_session_id, _record_call)
+
+def _record_call(*args):
+    # 呼叫時才取得錄製器：第一次寫入記錄時才建立（開啟錄製檔）
+    resolve(session_recorder).record(*args)
+
+@recorded
+@timed("tool.start_game")
+def start_game(scenario: str = "", language: str = "", tool_context: Optional["ToolContext"] = None) -> dict:
+    """
+    開始遊戲，播放開場音樂並提供背景故事
 
-（請描述你的行動，遊戲將根據你的情緒選擇對應的背景音樂）
-(Please describe your action. The game will choose appropriate background music based on your emotion)
+    Args:
+        scenario: 劇本 id，空字串表示預設劇本（巨人攻城）
+        language: 故事語言 zh / en / both，空字串表示沿用這個會話目前的設定（預設 both）
     """
     
-    game_state.add_story(opening_story)
+    if language and language not in LANGUAGES:
+        return _unknown_language(language)
+    
+    try:
+        story = get_scenario(scenario or DEFAULT_SCENARIO_ID)
+    except KeyError:
+        return {
+            "status": "error",
+            "message": f"找不到劇本 | Scenario not found: {scenario}",
+            "available_scenarios": list_scenarios()
+        }
+    
+    # 模型檔有更新時熱替換（未使用模型檔時不做任何事）
+    emotion_analyzer.reload_if_changed()
+    
+    # 重置這個會話的遊戲狀態
+    session = sessions.reset(get_session_id(tool_context), GameState(story))
+    with session.lock, tracer.trace(session.session_id), tracer.span("start_game", scenario=story.scenario_id):
+        if language:
+            session.language = language
+        return _start_game(session)
+
+def _start_game(session) -> dict:
+    game_state = session.game_state
+    opening = game_state.scenario.opening
+    
+    # 播放開場音樂
+    music_result = music_queue.play(opening.music or "intro", session.language).to_dict()
+    
+    # 開場故事 - 依會話語言取得預先拆好的版本
+    opening_story = opening.render(session.language)
+    
+    game_state.add_story_ref(opening.node_id)
+    if game_journal is not None:
+        game_journal.record_start(session.session_id, game_state.scenario.scenario_id, session.language)
+    
+    # 背景預先載入第一回合可能的音樂
+    music_prefetcher.prefetch(predict_next_music(game_state))
     
     return {
         "status": "success",
         "message": opening_story,
+        "scenario": game_state.scenario.scenario_id,
+        "language": session.language,
         "music_status": music_result,
         "turn": game_state.current_turn,
         "max_turns": game_state.max_turns
     }
 
-def process_user_action(user_action: str) -> dict:
-    """處理用戶行動，分析情緒，播放音樂，生成故事"""
-    global game_state, music_player, emotion_analyzer
+@recorded
+@timed("tool.process_user_action")
+def process_user_action(user_action: str, verbose: bool = False, tool_context: Optional["ToolContext"] = None) -> dict:
+    """
+    處理用戶行動，分析情緒，播放音樂，生成故事
+
+    Args:
+        user_action: 玩家的行動
+        verbose: True 時回傳完整的情緒分析與音樂狀態；預設只回傳精簡結果，細節可用 get_turn_details 取得
+    """
+    session = sessions.get_or_create(get_session_id(tool_context))
+    with session.lock, tracer.trace(session.session_id), tracer.span("process_user_action"):
+        return _process_user_action(session, user_action, verbose)
+
+def _process_user_action(session, user_action: str, verbose: bool = False) -> dict:
+    game_state = session.game_state
     
     if game_state.is_game_over():
         return {
@@ -57,320 +202,357 @@ def process_user_action(user_action: str) -> dict:
     game_state.add_user_action(user_action)
     
     # 分析用戶情緒
-    emotion_result = emotion_analyzer.analyze_emotion(user_action)
+    with tracer.span("analyze_emotion"):
+        emotion_result = emotion_analyzer.analyze_emotion(user_action, session.language)
     primary_emotion = emotion_result["primary_emotion"]
     
-    # 播放對應音樂
-    music_result = music_player.play_music(primary_emotion)
+    game_state.add_emotion(primary_emotion)
+    
+    # 播放對應音樂（實際的停止/載入/播放在音訊執行緒，span 帶有同一個 trace id）
+    with tracer.span("music.enqueue", emotion=primary_emotion):
+        music_ticket = music_queue.play(primary_emotion, session.language)
     
     # 進入下一回合
     game_state.next_turn()
     
     # 根據回合數和用戶行動生成故事
-    story_response = generate_story_response(user_action, emotion_result)
-    game_state.add_story(story_response)
+    node = play_story_turn(game_state, primary_emotion, session.language)
+    story_id = node.node_id if node is not None else None
+    story_response = node.render(session.language) if node is not None else None
+    game_state.add_story_ref(story_id)
+    if game_journal is not None:
+        with tracer.span("journal.record_turn"):
+            game_journal.record_turn(session.session_id, user_action, primary_emotion, story_id)
+            if game_state.is_game_over():
+                # 已結束的遊戲不必再從記錄檔重建，記錄檔的記憶體與快照不會無限成長
+                game_journal.record_drop(session.session_id)
+    
+    # 背景預先載入下一回合可能的音樂（包含最終回合的結局音樂）
+    with tracer.span("music.prefetch"):
+        music_prefetcher.prefetch(predict_next_music(game_state))
     
+    # 完整的分析結果只保留引用，get_turn_details 需要時才展開
+    session.last_turn = (game_state.current_turn, emotion_result, music_ticket.ticket_id)
+    
+    if verbose:
+        return {
+            "status": "success",
+            "story": story_response,
+            "emotion_analysis": emotion_result,
+            "music_status": music_ticket.to_dict(),
+            "turn": game_state.current_turn,
+            "max_turns": game_state.max_turns,
+            "game_over": game_state.is_game_over()
+        }
+    
+    # 精簡回應：只有故事與主要結果
     return {
         "status": "success",
         "story": story_response,
-        "emotion_analysis": emotion_result,
-        "music_status": music_result,
+        "story_id": story_id,
+        "emotion": primary_emotion,
+        "confidence": emotion_result["confidence"],
+        "music": music_ticket.file,
+        "music_ticket": music_ticket.ticket_id,
         "turn": game_state.current_turn,
         "max_turns": game_state.max_turns,
         "game_over": game_state.is_game_over()
     }
 
-def generate_story_response(user_action: str, emotion_result: dict) -> str:
-    """根據用戶行動和情緒生成故事回應 - 中英文雙語版本"""
-    global game_state
-    
-    turn = game_state.current_turn
-    emotion = emotion_result["primary_emotion"]
-    
-    # 巨人攻城固定劇本的分支故事 - 完全按照用戶行動走
-    if turn == 1:
-        if emotion in ["battle", "tense_battle", "heroic", "charge", "advance"]:
-            return f"""
-
-⚔️  你握緊武器，眼中燃燒著決心的火焰！| You grip your weapon tightly, determination burning in your eyes!
-💨 你衝向巨大的敵人，戰吼聲響徹雲霄！| You charge toward the giant enemy, your battle cry echoing through the sky!
-🔥 巨人注意到了你的挑戰，轉身面對著你... | The giant notices your challenge and turns to face you...
-👹 它的眼中閃爍著憤怒的紅光，巨大的拳頭朝你砸來！| Its eyes flash with angry red light, and its massive fist comes crashing toward you!
-
-
-現在情況變得更加危險了！你要如何應對？
-The situation has become even more dangerous! How will you respond?
-            """
-        elif emotion in ["sad", "retreat", "wait_hide"]:
-            return f"""
-
-😰 面對巨大的威脅，你感到恐懼和無助... | Facing the enormous threat, you feel fear and helplessness...
-💔 你的內心充滿掙扎，腳步開始遲疑... | Your heart is full of struggle, your steps begin to hesitate...
-🏃‍♂️ 你想要退縮，但身後傳來孩子們絕望的哭聲... | You want to retreat, but desperate cries of children echo behind you...
-👶 一個小女孩拉住了你的衣角：「大哥哥，不要拋下我們...」| A little girl grabs your sleeve: "Big brother, don't abandon us..."
-😢 你的內心充滿愧疚和痛苦... | Your heart fills with guilt and pain...
-
-
-你的良心在折磨著你，你會繼續這樣做還是改變主意？
-Your conscience is tormenting you. Will you continue or change your mind?
-            """
-        elif emotion in ["sacrifice", "heroic_death"]:
-            return f"""
-
-✨ 你意識到了自己的使命，準備為他人犧牲... | You realize your mission and prepare to sacrifice for others...
-💫 一股神聖的力量在你身上湧現... | A sacred energy surges within you...
-⚔️  你決定用自己的生命來保護無辜的人們！| You decide to use your life to protect innocent people!
-🌟 你的勇氣感染了周圍的人，他們看到了希望... | Your courage inspires those around you, they see hope...
-
-
-你準備做出最大的犧牲，這將如何改變一切？
-You're prepared to make the ultimate sacrifice. How will this change everything?
-            """
-        elif emotion in ["smile", "peaceful"]:
-            return f"""
-🎵 背景音樂：溫柔的希望之歌... | Background Music: Gentle song of hope...
-
-😌 即使在這危機時刻，你保持著內心的平靜... | Even in this moment of crisis, you maintain inner peace...
-🌅 你的微笑給絕望的人們帶來了一絲溫暖... | Your smile brings a touch of warmth to desperate people...
-✨ 你的正面態度開始影響周圍的人... | Your positive attitude begins to influence those around you...
-💝 人們在你身上看到了不同的力量... | People see a different kind of strength in you...
-
-
-你的樂觀精神會如何影響這場危機？
-How will your optimistic spirit affect this crisis?
-            """
-        else:
-            return f"""
-
-🤔 你站在廢墟中，仔細思考著情況... | You stand in the ruins, carefully considering the situation...
-🌪️ 巨人的腳步聲越來越近，地面在顫抖... | The giant's footsteps grow closer, the ground trembles...
-⏰ 時間不多了，你必須做出決定！| Time is running out, you must make a decision!
-
-
-局勢變得更加緊迫，你的下一步是？
-The situation becomes more urgent. What's your next move?
-            """
-    
-    elif turn == 2:
-        # 第二回合：根據情緒和行動發展劇情
-        if emotion in ["sad", "retreat", "wait_hide"]:
-            return f"""
-
-😭 你的內心掙扎變得更加激烈... | Your inner struggle becomes more intense...
-🌧️ 彷彿連天空都在為這場悲劇哭泣... | It's as if even the sky is crying for this tragedy...
-💔 每一個選擇都充滿了痛苦... | Every choice is filled with pain...
-🏃‍♂️ 你的行動反映了內心深處的恐懼... | Your actions reflect the fear deep in your heart...
-
-
-關鍵時刻已經到來，你要怎麼面對自己的內心？
-The critical moment has arrived. How will you face your inner self?
-            """
-        elif emotion in ["battle", "tense_battle", "charge"]:
-            return f"""
-🎵 背景音樂：戰鬥達到白熱化！| Background Music: Battle reaches fever pitch!
-
-⚡ 激烈的戰鬥持續進行！| Intense battle continues!
-💥 你和巨人展開了生死搏鬥！| You engage in a life-or-death struggle with the giant!
-⚔️  你的攻擊越來越精準，巨人開始露出疲態！| Your attacks become more precise, the giant shows signs of fatigue!
-🎯 你發現了巨人的弱點！| You discover the giant's weakness!
-
-
-最終決戰的時刻到了！你要如何給予致命一擊？
-The moment of final battle has arrived! How will you deliver the killing blow?
-                """
-        elif emotion in ["heroic", "advance", "sacrifice", "heroic_death"]:
-            return f"""
-
-✨ 你的英勇行為激勵了所有人！| Your heroic actions inspire everyone!
-🔥 正義的火焰在你心中燃燒！| The flame of justice burns in your heart!
-👥 越來越多的人加入你的行列！| More and more people join your cause!
-⚔️  眾人齊心，準備最後的決戰！| United, everyone prepares for the final battle!
-
-
-英雄的時刻到來了！你將如何創造奇蹟？
-The hero's moment has arrived! How will you create a miracle?
-            """
-        elif emotion in ["smile", "victory", "peaceful"]:
-            return f"""
-🎵 背景音樂：希望的光芒主題... | Background Music: Theme of hope's radiance...
-
-🌟 你的正面能量開始改變一切... | Your positive energy begins to change everything...
-✨ 奇蹟般地，情況開始好轉... | Miraculously, the situation begins to improve...
-💝 愛與希望的力量顯現了... | The power of love and hope manifests...
-🕊️  和平的可能性出現了... | The possibility of peace emerges...
-
-
-愛能戰勝一切嗎？你的選擇將決定結局...
-Can love conquer all? Your choice will determine the ending...
-            """
-        else:
-            return f"""
-🎵 背景音樂：命運的主題曲奏響... | Background Music: Destiny's theme plays...
-
-⚡ 戰鬥進入了關鍵階段！| The battle enters its critical phase!
-🔥 局勢瞬息萬變！| The situation changes rapidly!
-💪 所有人的命運都掌握在你手中... | Everyone's fate is in your hands...
-
+@recorded
+@timed("tool.get_turn_details")
+def get_turn_details(tool_context: Optional["ToolContext"] = None) -> dict:
+    """取得上一回合的完整情緒分析（分數、關鍵字、說明）與音樂指令狀態"""
+    session = sessions.get_or_create(get_session_id(tool_context))
+    with session.lock:
+        last_turn = session.last_turn
+        if last_turn is None and session.game_state.current_turn > 0:
+            last_turn = session.last_turn = _replay_last_turn(session)
+    if last_turn is None:
+        return {
+            "status": "error",
+            "message": "這場遊戲還沒有進行任何回合 | No turn has been played in this game yet"
+        }
+    turn, emotion_result, ticket_id = last_turn
+    if ticket_id is None:
+        music_status = {
+            "status": "error",
+            "message": "會話由記錄檔重建，音樂指令已不存在 | Session was rebuilt from the journal, music ticket is gone"
+        }
+    else:
+        ticket = music_queue.get_ticket(ticket_id)
+        music_status = ticket.to_dict() if ticket is not None else {
+            "status": "error",
+            "message": f"找不到音樂指令 | Music ticket not found: {ticket_id}"
+        }
+    return {
+        "status": "success",
+        "turn": turn,
+        "emotion_analysis": emotion_result,
+        "music_status": music_status
+    }
 
-最後的時刻到了！你的決定將決定所有人的命運！
-The final moment has arrived! Your decision will determine everyone's fate!
-            """
+def _replay_last_turn(session) -> tuple:
+    """從記錄檔重建的會話沒有上一回合的結果：重新分析最後一個行動（沒有音樂指令）"""
+    turn, action, _, _ = session.game_state.turn_entries(session.game_state.current_turn)[-1]
+    return turn, emotion_analyzer.analyze_emotion(action, session.language), None
+
+@timed("story.play_story_turn")
+def play_story_turn(game_state: GameState, emotion: str, language: str = "both") -> Optional[StoryNode]:
+    """從劇本圖取得本回合的故事節點，並播放節點的音樂提示（例如結局音樂）"""
+    with tracer.span("story.select", turn=game_state.current_turn, emotion=emotion):
+        node = game_state.scenario.select(game_state.current_turn, emotion)
+    if node is not None and node.music is not None:
+        with tracer.span("music.enqueue_cue", music=node.music):
+            music_queue.play(node.music, language)
+    return node
+
+def generate_story_response(user_action: str, emotion_result: dict, game_state: Optional[GameState] = None,
+                            language: str = "both") -> str:
+    """根據用戶行動和情緒生成故事回應 - 預設為中英文雙語版本"""
+    if game_state is None:
+        game_state = sessions.get_or_create(DEFAULT_SESSION_ID).game_state
     
-    elif turn == 3:  # 最終回合
-        if emotion in ["victory", "battle", "tense_battle", "heroic", "charge", "advance"]:
-            # 勝利結局
-            music_player.play_music("victory")
-            return f"""
-
-🏆 === 勝利結局 | Victory Ending ===
-
-✨ 你成功了！巨人倒下了！| You succeeded! The giant has fallen!
-🌅 曙光穿破雲層，照亮了大地！| Dawn breaks through the clouds, illuminating the earth!
-👏 人們歡呼著你的名字，你成為了真正的英雄！| People cheer your name, you have become a true hero!
-🏰 城市將會重建，而你的傳說將永遠流傳... | The city will be rebuilt, and your legend will live forever...
-
-💭 
-
-🎉 恭喜！你拯救了世界！| Congratulations! You saved the world!
-📖 你的英勇故事將被載入史冊！| Your heroic story will be recorded in history!
-
-=== 遊戲結束 | Game Over ===
-            """
-        elif emotion in ["sad", "retreat", "wait_hide"]:
-            # 逃跑/退縮結局
-            music_player.play_music("defeat")
-            return f"""
-
-💔 === 逃亡者結局 | Fugitive Ending ===
-
-😢 你最終選擇了退縮... | You ultimately chose to retreat...
-🌧️ 你獨自承受著內心的痛苦... | You bear the inner pain alone...
-👻 城市的命運未卜，但你選擇了自保... | The city's fate is uncertain, but you chose self-preservation...
-💭 你將永遠活在後悔中，想著「如果當初我...」| You will forever live in regret, thinking "If only I had..."
-
-
-😔 你保住了生命，但失去了什麼更重要的東西... | You preserved your life, but lost something more important...
-🌫️ 從此你帶著遺憾生活，永遠無法原諒自己... | From now on you live with regret, never able to forgive yourself...
-
-=== 遊戲結束 | Game Over ===
-            """
-        elif emotion in ["defeat", "death"]:
-            # 失敗結局
-            music_player.play_music("defeat")
-            return f"""
+    # 劇本的分支故事 - 完全按照用戶行動走（劇本見 scenarios/）
+    with tracer.span("generate_story_response"):
+        node = play_story_turn(game_state, emotion_result["primary_emotion"], language)
+    return node.render(language) if node is not None else None
 
-💀 === 悲劇結局 | Tragic Ending ===
-
-😢 儘管你勇敢戰鬥，但最終還是失敗了... | Despite fighting bravely, you ultimately failed...
-🕯️  你的犧牲並非毫無意義，你的勇氣激勵了後人... | Your sacrifice was not meaningless, your courage inspired future generations...
-📜 未來的英雄們會繼承你的意志，繼續戰鬥... | Future heroes will inherit your will and continue fighting...
-⭐ 你雖然倒下了，但你的精神永垂不朽... | Though you have fallen, your spirit is immortal...
-
-
-😇 你安詳地閉上了眼睛，帶著無悔的微笑... | You peacefully close your eyes with a smile of no regret...
-🌟 傳說，在最黑暗的夜晚，人們還能看到你的靈魂在守護著他們... | Legend says, in the darkest nights, people can still see your soul protecting them...
-
-=== 遊戲結束 | Game Over ===
-            """
-        elif emotion in ["sacrifice", "heroic_death"]:
-            # 英勇犧牲結局
-            music_player.play_music("heroic_death")
-            return f"""
-
-🌟 === 英雄結局 | Hero Ending ===
-
-⚔️  在最後一刻，你選擇了最崇高的犧牲！| In the final moment, you chose the most noble sacrifice!
-💥 你用自己的生命重創了巨人，為人類爭取了希望！| You used your life to severely wound the giant, winning hope for humanity!
-👼 你的犧牲感動了天地，巨人也被你的精神所震撼！| Your sacrifice moved heaven and earth, even the giant was moved by your spirit!
-🕊️  在你倒下的瞬間，奇蹟出現了... | The moment you fell, a miracle occurred...
-
-
-✨ 你的犧牲成就了最偉大的勝利！| Your sacrifice achieved the greatest victory!
-🏛️  人們將為你建立紀念碑，永遠緬懷你的英勇！| People will build monuments to forever commemorate your bravery!
-📚 你的名字將與傳奇並存！| Your name will live alongside legends!
-
-=== 遊戲結束 | Game Over ===
-            """
-        elif emotion in ["smile", "peaceful", "victory"]:
-            # 和平結局
-            music_player.play_music("peaceful")
-            return f"""
-
-🕊️ === 和平結局 | Peaceful Ending ===
-
-💝 你用愛與理解化解了仇恨... | You resolved hatred with love and understanding...
-🌅 奇蹟般地，巨人停止了攻擊... | Miraculously, the giant stopped attacking...
-✨ 你證明了和平比戰爭更強大... | You proved that peace is stronger than war...
-🤝 人類與巨人開始嘗試和解... | Humans and giants begin to attempt reconciliation...
-
-
-🌍 世界因為你的智慧而改變... | The world changed because of your wisdom...
-📖 你開創了一個新的時代，一個和平的時代... | You ushered in a new era, an era of peace...
-
-=== 遊戲結束 | Game Over ===
-            """
-        else:
-            # 開放結局
-            return f"""
-🎵 背景音樂：命運的終章... | Background Music: Finale of destiny...
+def _unknown_language(language: str) -> dict:
+    return {
+        "status": "error",
+        "message": f"不支援的語言 | Unsupported language: {language}",
+        "available_languages": list(LANGUAGES)
+    }
 
-🌅 === 開放結局 | Open Ending ===
+@recorded
+@timed("tool.set_language")
+def set_language(language: str, tool_context: Optional["ToolContext"] = None) -> dict:
+    """
+    設定這個會話的故事與說明文字語言
 
-🔄 故事結束了，但新的開始即將到來... | The story ends, but a new beginning is about to come...
-💭 你做出了自己的選擇，承擔了相應的後果... | You made your choice and bear the consequences...
-🌍 世界因為你的行動而改變... | The world changed because of your actions...
-⏳ 時間將證明你的選擇是否正確... | Time will prove whether your choice was right...
+    Args:
+        language: zh（繁體中文）、en（English）或 both（雙語）
+    """
+    if language not in LANGUAGES:
+        return _unknown_language(language)
+    session = sessions.get_or_create(get_session_id(tool_context))
+    with session.lock:
+        session.language = language
+        if game_journal is not None:
+            game_journal.record_language(session.session_id, language)
+    return {
+        "status": "success",
+        "message": f"語言已設定 | Language set: {language}",
+        "language": language
+    }
 
+# get_game_status 可選取的欄位
+STATUS_FIELDS = ("current_turn", "max_turns", "game_over", "story_history", "user_actions",
+                 "current_music", "available_emotions")
 
-🤔 這就是你的故事，結局由你的內心決定... | This is your story, the ending is determined by your heart...
+def emotions_etag(emotions: list) -> str:
+    """情緒清單的 ETag：清單不變時相同"""
+    return hashlib.sha1(json.dumps(emotions).encode("utf-8")).hexdigest()[:16]
 
-=== 遊戲結束 | Game Over ===
-            """
+@recorded
+@timed("tool.get_game_status")
+def get_game_status(since_version: int = -1, fields: str = "", emotions_etag_seen: str = "",
+                    tool_context: Optional["ToolContext"] = None) -> dict:
+    """
+    獲取當前遊戲狀態
 
-def get_game_status() -> dict:
-    """獲取當前遊戲狀態"""
-    global game_state, music_player
+    Args:
+        since_version: 上次取得的 version；提供時 story_history / user_actions 只包含之後新增的項目
+        fields: 以逗號分隔的欄位名稱，空字串表示全部欄位
+        emotions_etag_seen: 上次取得的 emotions_etag；相同時不再回傳 available_emotions
+    """
     
-    return {
-        "current_turn": game_state.current_turn,
-        "max_turns": game_state.max_turns,
-        "game_over": game_state.is_game_over(),
-        "story_history": game_state.story_history,
-        "user_actions": game_state.user_actions,
-        "current_music": music_player.get_current_playing(),
-        "available_emotions": music_player.list_available_emotions()
-    }
+    selected = [field.strip() for field in fields.split(",") if field.strip()] or list(STATUS_FIELDS)
+    unknown = [field for field in selected if field not in STATUS_FIELDS]
+    if unknown:
+        return {
+            "status": "error",
+            "message": f"未知的欄位 | Unknown fields: {', '.join(unknown)}",
+            "available_fields": list(STATUS_FIELDS)
+        }
+    
+    session = sessions.get_or_create(get_session_id(tool_context))
+    with session.lock:
+        game_state = session.game_state
+        status = {"version": game_state.version, "delta": False}
+        
+        # 只回傳 since_version 之後新增的故事與行動；版本號不屬於目前這場遊戲時回傳全部
+        entries = game_state.entries_since(since_version, session.language) if since_version >= 0 else None
+        if entries is not None:
+            status["delta"] = True
+            story_history, user_actions = entries
+        else:
+            story_history = game_state.render_story_history(session.language) if "story_history" in selected else None
+            user_actions = list(game_state.user_actions)
+        
+        for field in selected:
+            if field == "current_turn":
+                status["current_turn"] = game_state.current_turn
+            elif field == "max_turns":
+                status["max_turns"] = game_state.max_turns
+            elif field == "game_over":
+                status["game_over"] = game_state.is_game_over()
+            elif field == "story_history":
+                status["story_history"] = story_history
+            elif field == "user_actions":
+                status["user_actions"] = user_actions
+            elif field == "current_music":
+                status["current_music"] = music_player.get_current_playing()
+            elif field == "available_emotions":
+                # 靜態資料：呼叫端已有相同 ETag 的清單時只回傳 ETag
+                emotions = music_player.list_available_emotions()
+                status["emotions_etag"] = emotions_etag(emotions)
+                if emotions_etag_seen != status["emotions_etag"]:
+                    status["available_emotions"] = emotions
+        return status
+
+@recorded
+@timed("tool.get_story_context")
+def get_story_context(token_budget: int = -1, tool_context: Optional["ToolContext"] = None) -> dict:
+    """
+    取得符合 token 預算的故事上下文：最近的回合完整內容，較早的回合只有摘要（情緒走向與關鍵選擇）
 
+    Args:
+        token_budget: token 上限；-1 使用預設值，0 表示不限制
+    """
+    session = sessions.get_or_create(get_session_id(tool_context))
+    with session.lock:
+        context = session.game_state.get_context(
+            session.language, CONTEXT_TOKEN_BUDGET if token_budget < 0 else token_budget)
+    context["status"] = "success"
+    return context
+
+@recorded
+@timed("tool.stop_music")
 def stop_music() -> dict:
     """停止音樂播放"""
-    global music_player
-    return music_player.stop_music()
+    return music_queue.stop().to_dict()
+
+@recorded
+@timed("tool.get_music_ticket")
+def get_music_ticket(ticket_id: int) -> dict:
+    """查詢音樂指令的執行狀態"""
+    ticket = music_queue.get_ticket(ticket_id)
+    if ticket is None:
+        return {
+            "status": "error",
+            "message": f"找不到音樂指令 | Music ticket not found: {ticket_id}"
+        }
+    return ticket.to_dict()
 
+@recorded
+@timed("tool.get_music_info")
 def get_music_info() -> dict:
     """獲取音樂系統信息"""
-    global music_player
     return {
+        "audio_backend": music_player.backend.name,
         "available_emotions": music_player.list_available_emotions(),
         "music_files": music_player.list_available_music_files(),
         "emotion_mapping": music_player.get_emotion_music_mapping(),
-        "validation_status": music_player.validate_music_files()
+        "validation_status": music_player.validate_music_files(),
+        "cache_stats": music_player.get_cache_stats(),
+        "prefetch_stats": music_prefetcher.get_stats(),
+        "queue_stats": music_queue.get_stats(),
+        "session_stats": sessions.stats(),
+        "tool_executor_stats": tool_executor.stats()
     }
 
+@recorded
+@timed("tool.get_emotion_analysis_info")
 def get_emotion_analysis_info() -> dict:
     """獲取情緒分析系統信息"""
-    global emotion_analyzer
     return {
         "emotion_keywords": emotion_analyzer.emotion_keywords,
         "emotion_weights": emotion_analyzer.emotion_weights,
         "supported_emotions": list(emotion_analyzer.emotion_keywords.keys())
     }
 
-# 建立主要代理程式
-root_agent = Agent(
-    name="bilingual_adventure_game_master",
-    model="gemini-2.0-flash",
-    description="A bilingual text adventure game master that creates stories and plays music based on player emotions in both Chinese and English",
-    instruction="""
+@recorded
+@timed("tool.get_diagnostics")
+def get_diagnostics() -> dict:
+    """取得每個工具與情緒分析、音樂播放的呼叫次數、錯誤次數與延遲百分位數，並寫出 Prometheus 格式的檔案"""
+    diagnostics = {
+        "status": "success",
+        "metrics_enabled": metrics_registry.enabled,
+        "metrics": metrics_registry.snapshot()
+    }
+    try:
+        diagnostics["prometheus_file"] = metrics_registry.write_prometheus()
+    except OSError as e:
+        diagnostics["prometheus_file"] = None
+        diagnostics["message"] = f"寫入統計檔失敗 | Failed to write metrics file: {str(e)}"
+    return diagnostics
+
+@recorded
+@timed("tool.export_trace")
+def export_trace(trace_format: str = "chrome", all_sessions: bool = False,
+                 tool_context: Optional["ToolContext"] = None) -> dict:
+    """
+    把追蹤緩衝區裡的 span 匯出成檔案（需設定 ADVENTURE_TRACE=1）
+
+    Args:
+        trace_format: chrome（chrome://tracing、Perfetto）或 speedscope
+        all_sessions: True 時匯出所有會話，預設只匯出這個會話
+    """
+    if trace_format not in TRACE_FORMATS:
+        return {
+            "status": "error",
+            "message": f"不支援的追蹤格式 | Unsupported trace format: {trace_format}",
+            "available_formats": list(TRACE_FORMATS)
+        }
+    if not tracer.enabled:
+        return {
+            "status": "error",
+            "message": "追蹤未開啟，請設定 ADVENTURE_TRACE=1 | Tracing is off, set ADVENTURE_TRACE=1"
+        }
+    session_id = get_session_id(tool_context)
+    directory = os.environ.get("ADVENTURE_TRACE_DIR", "traces")
+    name = "all" if all_sessions else hashlib.sha1(session_id.encode("utf-8")).hexdigest()[:12]
+    path = os.path.join(directory, f"trace-{name}-{int(time.time())}.{trace_format}.json")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        spans = tracer.export(path, trace_format, None if all_sessions else session_id)
+    except OSError as e:
+        return {
+            "status": "error",
+            "message": f"匯出追蹤失敗 | Failed to export trace: {str(e)}"
+        }
+    return {
+        "status": "success",
+        "message": f"已匯出追蹤 | Trace exported: {path}",
+        "file": path,
+        "spans": spans
+    }
+
+# 註冊到代理程式的 async 版本：同步工具在執行緒池執行，不阻塞 ADK 的事件迴圈
+tool_executor = ToolExecutor(
+    max_workers=int(os.environ.get("ADVENTURE_TOOL_WORKERS", "8")),
+    max_pending=int(os.environ.get("ADVENTURE_TOOL_MAX_PENDING", "256"))
+)
+start_game_async = tool_executor.make_async(start_game)
+process_user_action_async = tool_executor.make_async(process_user_action)
+get_game_status_async = tool_executor.make_async(get_game_status)
+get_story_context_async = tool_executor.make_async(get_story_context)
+get_turn_details_async = tool_executor.make_async(get_turn_details)
+set_language_async = tool_executor.make_async(set_language)
+stop_music_async = tool_executor.make_async(stop_music)
+get_music_ticket_async = tool_executor.make_async(get_music_ticket)
+get_music_info_async = tool_executor.make_async(get_music_info)
+get_diagnostics_async = tool_executor.make_async(get_diagnostics)
+export_trace_async = tool_executor.make_async(export_trace)
+
+# 同步版本的工具（重播錄製檔、遊戲伺服器與負載測試直接呼叫）
+TOOLS = (start_game, process_user_action, get_game_status, get_story_context, get_turn_details, set_language,
+         stop_music, get_music_ticket, get_music_info, get_emotion_analysis_info, get_diagnostics, export_trace)
+
+# 代理程式的說明（中英雙語）
+AGENT_INSTRUCTION = """
 你是一個雙語文字冒險遊戲的主持人 | You are a bilingual text adventure game master.
 
 核心原則 | Core Principles：
@@ -412,8 +594,45 @@ root_agent = Agent(
 - 戰鬥失敗 → 悲劇結局 | Battle failure → Tragic ending
 - 和平路線 → 和平結局 | Peaceful route → Peace ending
 
+語言 | Language：
+- 玩家只想看中文或英文時，呼叫 set_language("zh") 或 set_language("en")，之後只用該語言回覆 | When the player wants only Chinese or English, call set_language("zh") or set_language("en") and reply in that language only
+
+查詢狀態 | Status Queries：
+- 呼叫 get_game_status 時傳入上次回傳的 version 作為 since_version，只取得新的故事與行動 | Pass the last returned version as since_version to get only new story entries and actions
+- 用 fields 只選需要的欄位；已取得情緒清單後傳入 emotions_etag_seen | Use fields to select only what you need; pass emotions_etag_seen once you have the emotion list
+
+回合結果 | Turn Results：
+- process_user_action 預設只回傳故事、主要情緒、信心度與音樂；需要完整的情緒分數與音樂狀態時呼叫 get_turn_details | process_user_action returns only the story, primary emotion, confidence and track by default; call get_turn_details for full emotion scores and music status
+
+故事上下文 | Story Context：
+- 需要回顧之前的劇情時呼叫 get_story_context，不要要求完整的故事歷史；較早的回合已整理成摘要 | Call get_story_context to recall earlier events instead of requesting the full story history; older turns are already summarized
+
 請使用提供的工具函數來管理遊戲流程，並確保故事完全符合玩家的選擇且提供雙語版本。
 Please use the provided tool functions to manage the game flow and ensure the story completely matches player choices with bilingual versions.
-    """,
-    tools=[start_game, process_user_action, get_game_status, stop_music, get_music_info, get_emotion_analysis_info]
-)
\ No newline at end of file
+    """
+
+_root_agent_lock = threading.Lock()
+
+def _build_root_agent():
+    """建立主要代理程式；google.adk.agents 匯入要將近一秒，只在需要代理程式時才匯入"""
+    from google.adk.agents import Agent
+
+    return Agent(
+        name="bilingual_adventure_game_master",
+        model="gemini-2.0-flash",
+        description="A bilingual text adventure game master that creates stories and plays music based on player emotions in both Chinese and English",
+        instruction=AGENT_INSTRUCTION,
+        tools=[start_game_async, process_user_action_async, get_game_status_async, get_story_context_async,
+               get_turn_details_async, set_language_async, stop_music_async, get_music_ticket_async,
+               get_music_info_async, get_emotion_analysis_info, get_diagnostics_async, export_trace_async]
+    )
+
+def __getattr__(name: str):
+    """root_agent 在第一次被讀取時才建立（adk web 載入 agent 模組後讀取）"""
+    if name == "root_agent":
+        with _root_agent_lock:
+            agent = globals().get("root_agent")
+            if agent is None:
+                agent = globals()["root_agent"] = _build_root_agent()
+        return agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
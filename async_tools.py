@@ -0,0 +1,113 @@
+"""
+把同步的工具函數包成 asyncio 版本，避免阻塞 ADK 的事件迴圈
+
+同步工具會在事件迴圈的執行緒上直接執行：等待會話鎖、寫入記錄檔（fsync）、
+載入情緒模型或音樂都會卡住同一個迴圈上其他會話的請求。
+async 版本把呼叫交給固定大小的執行緒池，事件迴圈只等待結果。
+
+取消 | Cancellation:
+    呼叫一旦被接受就會完整執行（以 asyncio.shield 保護），請求被取消時只是不再等待結果，
+    音樂指令與遊戲狀態不會停在一半；執行緒池已滿且排隊的呼叫超過上限時直接回傳錯誤。
+
+asyncio 與執行緒池在第一次呼叫時才匯入與建立：只使用同步工具的程序（遊戲伺服器的 worker、
+重播與負載測試）不需要付出匯入 asyncio 的時間。
+"""
+import contextvars
+import functools
+import threading
+from typing import Any, Callable, Dict
+
+
+class ToolExecutor:
+    def __init__(self, max_workers: int = 8, max_pending: int = 256):
+        """
+        執行同步工具函數的執行緒池
+
+        Args:
+            max_workers (int): 同時執行的工具呼叫數
+            max_pending (int): 執行中加上排隊中的呼叫上限，超過時拒絕新的呼叫
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.abandoned = 0
+
+    def make_async(self, func: Callable) -> Callable:
+        """
+        建立 func 的 async 版本：名稱、說明與參數與原函數相同，可直接註冊成 ADK 工具
+        """
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            import asyncio
+
+            if not self._reserve():
+                return {
+                    "status": "error",
+                    "message": "伺服器忙碌中，請稍後再試 | Server busy, please try again shortly"
+                }
+            loop = asyncio.get_running_loop()
+            # 沿用呼叫端的 contextvars（例如 ADK 的追蹤資訊）
+            context = contextvars.copy_context()
+            future = loop.run_in_executor(self._get_executor(), self._run, context, func, args, kwargs)
+            future.add_done_callback(_retrieve)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # 呼叫仍會在執行緒池完成，只是不再等待結果
+                with self._lock:
+                    self.abandoned += 1
+                raise
+        return wrapper
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "abandoned": self.abandoned
+            }
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _get_executor(self):
+        """第一次呼叫時才建立執行緒池"""
+        with self._lock:
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="adventure-tool")
+            return self._executor
+
+    def _reserve(self) -> bool:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                return False
+            self._pending += 1
+            return True
+
+    def _run(self, context: contextvars.Context, func: Callable, args: tuple, kwargs: dict) -> Any:
+        # 在執行緒池裡釋放名額：呼叫端的事件迴圈已關閉時（例如被放棄的呼叫）也不會遺漏
+        try:
+            return context.run(func, *args, **kwargs)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.completed += 1
+
+
+def _retrieve(future) -> None:
+    """取出結果，被放棄的呼叫拋出例外時不會出現未讀取的警告"""
+    if not future.cancelled():
+        future.exception()
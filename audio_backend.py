@@ -0,0 +1,216 @@
+import importlib.util
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from metrics import timed
+from tracing import tracer
+
+# 可用的淡化曲線名稱（實作在 playback_engine.CROSSFADE_CURVES，這裡不匯入 pygame）
+CROSSFADE_CURVE_NAMES = ("linear", "equal_power", "exponential", "s_curve")
+
+
+class AudioBackend:
+    """音訊後端介面：MusicPlayer 只透過這些方法播放音樂"""
+
+    name = "base"
+    # 是否有解碼快取可供預先載入
+    supports_prefetch = False
+
+    def play(self, music_path: str, emotion_type: str) -> Dict[str, Any]:
+        """排程播放音樂並立即返回，回傳本次切換的設定"""
+        raise NotImplementedError
+
+    def stop(self) -> None:
+        """停止播放"""
+        raise NotImplementedError
+
+    def prefetch(self, music_path: str) -> bool:
+        """預先解碼音樂；回傳是否實際進行了解碼"""
+        return False
+
+    def is_cached(self, music_path: str) -> bool:
+        """音樂是否已解碼在記憶體中"""
+        return False
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """解碼快取統計"""
+        return {
+            "hits": 0, "misses": 0, "hit_rate": 0.0, "evictions": 0,
+            "decode_count": 0, "decode_seconds_total": 0.0, "decode_seconds_avg": 0.0,
+            "prefetch_hits": 0, "prefetch_saved_seconds": 0.0,
+            "cached_tracks": [], "bytes": 0, "max_bytes": 0
+        }
+
+    def set_crossfade(self, duration_ms: int, curve: Optional[str] = None) -> None:
+        """調整交叉淡化設定"""
+
+
+class PygameBackend(AudioBackend):
+    name = "pygame"
+    supports_prefetch = True
+
+    def __init__(self, cache_max_bytes: int = 64 * 1024 * 1024, crossfade_ms: int = 1500, crossfade_curve: str = "equal_power"):
+        """
+        以 pygame 混音器播放的後端；混音器在第一次實際播放或預先載入時才初始化
+
+        Args:
+            cache_max_bytes (int): 已解碼音樂快取的記憶體預算（位元組）
+            crossfade_ms (int): 交叉淡化時間（毫秒）
+            crossfade_curve (str): 淡化曲線
+        """
+        if crossfade_curve not in CROSSFADE_CURVE_NAMES:
+            raise ValueError(f"未知的淡化曲線 | Unknown crossfade curve: {crossfade_curve}")
+        self.cache_max_bytes = cache_max_bytes
+        self.crossfade_ms = crossfade_ms
+        self.crossfade_curve = crossfade_curve
+
+        self._init_lock = threading.Lock()
+        self._pygame = None
+        self.audio_cache = None
+        self.playback = None
+
+    def _ensure_mixer(self):
+        """第一次使用時才匯入 pygame 並初始化混音器"""
+        if self._pygame is not None:
+            return self._pygame
+        with self._init_lock:
+            if self._pygame is None:
+                import pygame
+                from audio_cache import AudioCache
+                from playback_engine import CrossfadeEngine
+
+                pygame.mixer.init()
+                self.audio_cache = AudioCache(pygame.mixer.Sound, self._sound_bytes, self.cache_max_bytes)
+                # 交叉淡化引擎：切換只排程、不等待解碼與淡化完成
+                self.playback = CrossfadeEngine(self.crossfade_ms, self.crossfade_curve)
+                self._pygame = pygame
+        return self._pygame
+
+    def play(self, music_path: str, emotion_type: str) -> Dict[str, Any]:
+        self._ensure_mixer()
+        trace_id = tracer.current_trace_id()
+
+        def load():
+            # 解碼在播放引擎的載入執行緒進行，span 沿用發出指令的會話 trace id
+            with tracer.trace(trace_id), tracer.span("audio.load", file=os.path.basename(music_path)):
+                return self._load_for_playback(music_path)
+        return self.playback.play(load)
+
+    def stop(self) -> None:
+        if self._pygame is None:
+            return
+        self._pygame.mixer.music.stop()
+        self.playback.stop()
+
+    def prefetch(self, music_path: str) -> bool:
+        self._ensure_mixer()
+        return self.audio_cache.load(music_path)
+
+    def is_cached(self, music_path: str) -> bool:
+        return self.audio_cache is not None and self.audio_cache.contains(music_path)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        if self.audio_cache is None:
+            stats = super().cache_stats()
+            stats["max_bytes"] = self.cache_max_bytes
+            return stats
+        return self.audio_cache.stats()
+
+    def set_crossfade(self, duration_ms: int, curve: Optional[str] = None) -> None:
+        self.crossfade_ms = duration_ms
+        if curve is not None:
+            self.crossfade_curve = curve
+        if self.playback is not None:
+            self.playback.duration_ms = self.crossfade_ms
+            self.playback.curve = self.crossfade_curve
+
+    @timed("audio_backend.load_for_playback")
+    def _load_for_playback(self, music_path: str):
+        """
+        在播放引擎的載入執行緒取得已解碼的音樂
+
+        無法整首解碼時改用串流播放並回傳 None，引擎會淡出目前頻道上的音樂。
+        """
+        pygame = self._pygame
+        try:
+            sound = self.audio_cache.get(music_path)
+        except pygame.error:
+            pygame.mixer.music.load(music_path)
+            pygame.mixer.music.play(-1)  # -1 表示循環播放
+            return None
+        pygame.mixer.music.stop()
+        return sound
+
+    def _sound_bytes(self, sound) -> int:
+        """依混音器設定計算解碼後音樂佔用的位元組數"""
+        frequency, sample_format, channels = self._pygame.mixer.get_init()
+        return int(sound.get_length() * frequency) * channels * (abs(sample_format) // 8)
+
+
+class NullBackend(AudioBackend):
+    name = "null"
+
+    def __init__(self, max_events: int = 10000, **_ignored):
+        """
+        無聲的後端：不輸出聲音，只記錄音樂提示事件（情緒、文件、時間）
+
+        適用於 CI、壓力測試與沒有音效卡的伺服器。
+
+        Args:
+            max_events (int): 保留的事件數量上限
+        """
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self.crossfade_ms = 0
+        self.crossfade_curve = "linear"
+
+    def play(self, music_path: str, emotion_type: str) -> Dict[str, Any]:
+        with self._lock:
+            self._events.append({
+                "action": "play",
+                "emotion": emotion_type,
+                "file": os.path.basename(music_path),
+                "timestamp": time.time()
+            })
+        return {"curve": self.crossfade_curve, "duration_ms": self.crossfade_ms}
+
+    def stop(self) -> None:
+        with self._lock:
+            self._events.append({"action": "stop", "emotion": None, "file": None, "timestamp": time.time()})
+
+    def set_crossfade(self, duration_ms: int, curve: Optional[str] = None) -> None:
+        self.crossfade_ms = duration_ms
+        if curve is not None:
+            self.crossfade_curve = curve
+
+    def events(self) -> List[Dict[str, Any]]:
+        """已記錄的音樂提示事件（舊到新）"""
+        with self._lock:
+            return list(self._events)
+
+    def clear_events(self) -> None:
+        with self._lock:
+            self._events.clear()
+
+
+def create_backend(name: Optional[str] = None, **options) -> AudioBackend:
+    """
+    建立音訊後端
+
+    Args:
+        name (str): "pygame" 或 "null"；未指定時讀取環境變數 ADVENTURE_AUDIO_BACKEND，
+                    預設為 pygame，pygame 未安裝時改用 null
+        **options: 傳給後端的設定（cache_max_bytes、crossfade_ms、crossfade_curve）
+    """
+    name = (name or os.environ.get("ADVENTURE_AUDIO_BACKEND") or "pygame").lower()
+    if name == "null":
+        return NullBackend()
+    if name != "pygame":
+        raise ValueError(f"未知的音訊後端 | Unknown audio backend: {name}")
+
+    if importlib.util.find_spec("pygame") is None:
+        return NullBackend()
+    return PygameBackend(**options)
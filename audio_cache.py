@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+
+class AudioCache:
+    def __init__(self, loader: Callable[[str], Any], size_of: Callable[[Any], int], max_bytes: int = 64 * 1024 * 1024):
+        """
+        已解碼音訊的 LRU 快取
+
+        Args:
+            loader (Callable): 讀取並解碼音樂文件的函式，回傳可播放的物件
+            size_of (Callable): 計算解碼後物件佔用位元組數的函式
+            max_bytes (int): 快取的記憶體預算（位元組）
+        """
+        self.loader = loader
+        self.size_of = size_of
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.decode_count = 0
+        self.decode_seconds = 0.0
+        self.last_decode_seconds: Dict[str, float] = {}
+        
+        # 預先載入但尚未播放過的音樂 -> 解碼耗時，用於計算預先載入省下的時間
+        self._prefetched: Dict[str, float] = {}
+        self.prefetch_hits = 0
+        self.prefetch_saved_seconds = 0.0
+
+    def get(self, path: str) -> Any:
+        """
+        取得解碼後的音訊，未命中時解碼並放入快取
+
+        Args:
+            path (str): 音樂文件路徑
+
+        Returns:
+            解碼後的音訊物件
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                saved = self._prefetched.pop(path, None)
+                if saved is not None:
+                    self.prefetch_hits += 1
+                    self.prefetch_saved_seconds += saved
+                return entry[0]
+            self.misses += 1
+
+        return self._decode_and_store(path)
+
+    def load(self, path: str) -> bool:
+        """
+        預先解碼並放入快取（不計入命中/未命中）
+
+        Returns:
+            bool: 是否實際進行了解碼（已在快取中則為 False）
+        """
+        with self._lock:
+            if path in self._entries:
+                return False
+        self._decode_and_store(path, prefetch=True)
+        return True
+
+    def contains(self, path: str) -> bool:
+        """檢查音訊是否已在快取中"""
+        with self._lock:
+            return path in self._entries
+
+    def _decode_and_store(self, path: str, prefetch: bool = False) -> Any:
+        start = time.perf_counter()
+        audio = self.loader(path)
+        elapsed = time.perf_counter() - start
+        size = self.size_of(audio)
+
+        with self._lock:
+            self.decode_count += 1
+            self.decode_seconds += elapsed
+            self.last_decode_seconds[path] = elapsed
+
+            # 單一音樂超過整個預算時直接播放、不放入快取
+            if size > self.max_bytes:
+                return audio
+
+            previous = self._entries.pop(path, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[path] = (audio, size)
+            self._bytes += size
+            if prefetch:
+                self._prefetched[path] = elapsed
+
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                evicted_path, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._prefetched.pop(evicted_path, None)
+                self.evictions += 1
+
+        return audio
+
+    def clear(self) -> None:
+        """清空快取（統計數字保留）"""
+        with self._lock:
+            self._entries.clear()
+            self._prefetched.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """回傳快取統計：命中率、解碼次數與耗時、目前佔用的記憶體"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "decode_count": self.decode_count,
+                "decode_seconds_total": self.decode_seconds,
+                "decode_seconds_avg": self.decode_seconds / self.decode_count if self.decode_count else 0.0,
+                "prefetch_hits": self.prefetch_hits,
+                "prefetch_saved_seconds": self.prefetch_saved_seconds,
+                "cached_tracks": list(self._entries.keys()),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes
+            }
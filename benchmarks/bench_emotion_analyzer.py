@@ -0,0 +1,133 @@
+"""
+情緒分析效能基準測試 | Emotion analysis benchmark
+
+比較舊版逐一 re.search 的比對方式與 Aho-Corasick 單次掃描，
+並確認兩者輸出的 emotion_scores / matched_keywords 完全一致。
+
+用法 | Usage:
+    python benchmarks/bench_emotion_analyzer.py [--repeat 200]
+"""
+import argparse
+import importlib.util
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from emotion_analyzer import EmotionAnalyzer
+
+# 中英混合的測試輸入，涵蓋短指令到長段落
+SAMPLE_INPUTS = [
+    "衝",
+    "attack",
+    "hide",
+    "我要拔劍衝向巨人！",
+    "I grab my sword and charge at the giant with all my courage",
+    "我害怕得想逃跑，躲在牆後面等待 I want to hide and wait",
+    "為了保護孩子們，我願意犧牲自己 I will sacrifice myself, a heroic death for humanity",
+    "我微笑著向巨人伸出手，希望能和平解決 I smile and hope for a peaceful, calm ending",
+]
+
+
+def build_inputs():
+    """產生不同長度的輸入：原始樣本、約 500 字與約 5000 字的長文"""
+    joined = " ".join(SAMPLE_INPUTS)
+    return {
+        "short": SAMPLE_INPUTS,
+        "medium": [(joined + " ") * 2],
+        "long": [(joined + " ") * 20],
+    }
+
+
+def legacy_scores(analyzer: EmotionAnalyzer, user_input: str):
+    """舊版實作：每種情緒的每個關鍵詞都呼叫一次 re.search"""
+    text_lower = user_input.lower()
+    emotion_scores = {}
+    matched_keywords = {}
+    for emotion, keywords in analyzer.emotion_keywords.items():
+        score = 0
+        matches = []
+        for keyword in keywords:
+            if re.search(keyword, text_lower):
+                score += 1
+                matches.append(keyword)
+        weighted_score = score * analyzer.emotion_weights.get(emotion, 1.0)
+        if weighted_score > 0:
+            emotion_scores[emotion] = weighted_score
+            matched_keywords[emotion] = matches
+    return emotion_scores, matched_keywords
+
+
+def current_scores(analyzer: EmotionAnalyzer, user_input: str):
+    """目前實作：單次掃描"""
+    model = analyzer._get_model()
+    return analyzer._score_matches(model.matcher.find(user_input.lower()), model)
+
+
+def time_per_call(func, analyzer, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            func(analyzer, text)
+    return (time.perf_counter() - start) / (repeat * len(texts))
+
+
+def batch_mismatch(batch, scalar, tolerance: float = 1e-9):
+    """比較 analyze_batch 與逐筆 analyze_emotion 的主要情緒、信心度與所有分數，回傳第一個不一致處"""
+    for row, result in enumerate(scalar):
+        if batch["primary_emotion"][row] != result["primary_emotion"]:
+            return f"#{row} primary_emotion {batch['primary_emotion'][row]} != {result['primary_emotion']}"
+        if abs(float(batch["confidence"][row]) - result["confidence"]) > tolerance:
+            return f"#{row} confidence {float(batch['confidence'][row])} != {result['confidence']}"
+        unknown = set(result["emotion_scores"]) - set(batch["emotion_scores"])
+        if unknown:
+            return f"#{row} emotions missing from batch: {sorted(unknown)}"
+        for emotion, column in batch["emotion_scores"].items():
+            expected = result["emotion_scores"].get(emotion, 0.0)
+            if abs(float(column[row]) - expected) > tolerance:
+                return f"#{row} scores[{emotion}] {float(column[row])} != {expected}"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="每組輸入重複次數")
+    args = parser.parse_args()
+
+    analyzer = EmotionAnalyzer()
+
+    for name, texts in build_inputs().items():
+        for text in texts:
+            if legacy_scores(analyzer, text) != current_scores(analyzer, text):
+                raise SystemExit(f"結果不一致 | Result mismatch: {text[:40]!r}")
+
+        legacy = time_per_call(legacy_scores, analyzer, texts, args.repeat)
+        current = time_per_call(current_scores, analyzer, texts, args.repeat)
+        avg_len = sum(len(text) for text in texts) / len(texts)
+        print(f"{name:>6} (avg {avg_len:6.0f} chars): "
+              f"re.search {legacy * 1e6:9.1f} µs | aho-corasick {current * 1e6:8.1f} µs | "
+              f"speedup x{legacy / current:5.1f}")
+
+    # 批次 API：重新評分一份大型行動記錄
+    if importlib.util.find_spec("numpy") is None:
+        print("numpy 未安裝，略過批次測試 | numpy not installed, skipping batch benchmark")
+        return
+
+    log = SAMPLE_INPUTS * max(1, args.repeat)
+    start = time.perf_counter()
+    scalar = [analyzer.analyze_emotion(text) for text in log]
+    scalar_time = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = analyzer.analyze_batch(log)
+    batch_time = time.perf_counter() - start
+    mismatch = batch_mismatch(batch, scalar)
+    if mismatch is not None:
+        raise SystemExit(f"批次結果不一致 | Batch result mismatch: {mismatch}")
+    print(f" batch ({len(log)} texts): analyze_emotion {scalar_time * 1e3:8.1f} ms | "
+          f"analyze_batch {batch_time * 1e3:8.1f} ms | speedup x{scalar_time / batch_time:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
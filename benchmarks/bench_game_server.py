@@ -0,0 +1,75 @@
+"""
+多程序遊戲伺服器擴展性基準測試 | Sharded game server scaling benchmark
+
+以不同的 worker 數啟動 game_server.GameServer，從父程序以多個執行緒同時推進大量會話
+（start_game → process_user_action × 3），量測每秒回合數與相對單一 worker 的擴展效率。
+worker 數超過 CPU 數時無法再線性成長。
+
+用法 | Usage:
+    python benchmarks/bench_game_server.py [--workers 1,2,4] [--sessions 400] [--clients 16]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("ADVENTURE_AUDIO_BACKEND", "null")
+
+from game_server import GameServer
+
+ACTIONS = ["我要拔劍衝向巨人！", "I want to hide and wait", "為了保護孩子們，我願意犧牲自己",
+           "I smile and hope for a peaceful ending", "attack", "我害怕得想逃跑"]
+
+
+def drive(server: GameServer, session_ids, errors):
+    """一個客戶端執行緒：每個會話進行一場完整的遊戲"""
+    failed = 0
+    for number, session_id in enumerate(session_ids):
+        server.call(session_id, "start_game")
+        for turn in range(3):
+            result = server.call(session_id, "process_user_action", user_action=ACTIONS[(number + turn) % len(ACTIONS)])
+            failed += result.get("status") != "success"
+    errors.append(failed)
+
+
+def run(workers: int, sessions: int, clients: int) -> dict:
+    with GameServer(workers) as server:
+        # 先讓每個 worker 處理一次，排除第一次呼叫的初始化成本
+        for index in range(workers * 4):
+            server.call(f"warmup-{index}", "start_game")
+        session_ids = [f"bench-{workers}-{index}" for index in range(sessions)]
+        errors = []
+        threads = [threading.Thread(target=drive, args=(server, session_ids[index::clients], errors))
+                   for index in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        calls = [worker["calls"] for worker in server.stats()["workers"]]
+    return {"turns_per_second": sessions * 3 / elapsed, "errors": sum(errors), "calls": calls}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="以逗號分隔的 worker 數")
+    parser.add_argument("--sessions", type=int, default=400, help="每組設定進行的會話數")
+    parser.add_argument("--clients", type=int, default=16, help="送出請求的執行緒數")
+    args = parser.parse_args()
+
+    print(f"CPU: {os.cpu_count()}")
+    baseline = None
+    for workers in [int(count) for count in args.workers.split(",") if count.strip()]:
+        result = run(workers, args.sessions, args.clients)
+        baseline = baseline or result["turns_per_second"]
+        speedup = result["turns_per_second"] / baseline
+        print(f"{workers:>3} workers: {result['turns_per_second']:9.1f} turns/s | x{speedup:4.2f} "
+              f"(efficiency {speedup / workers * 100:5.1f}%) | calls per worker {result['calls']} | "
+              f"errors {result['errors']}")
+
+
+if __name__ == "__main__":
+    main()
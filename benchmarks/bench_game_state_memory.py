@@ -0,0 +1,121 @@
+"""
+遊戲狀態記憶體基準測試 | GameState memory benchmark
+
+比較舊版（每個實例一個 __dict__、情緒名稱與故事文本存在 list）與目前的
+__slots__ + array 編碼版本，每個已完成三回合的會話佔用多少位元組。
+
+故事文本有兩種來源：
+    shared  直接取自共用故事表（list 只存指標），也就是遊戲實際執行時的情況
+    copied  每個會話各自一份文本（例如從儲存空間反序列化或由模型產生）
+
+主要數字是 shared：舊版約 701 B，目前約 420 B（約 1.7x）。
+節省來自把故事、情緒、行動與回合放進同一個變更記錄 array，用戶行動改存 UTF-8 文本，
+省下三個 list、每則行動一個 str 物件與實例的 __dict__。
+copied 的情況下舊版每個會話還多保存約 8 KB 的文本（約 8.6 KB → 0.4 KB）。
+
+用法 | Usage:
+    python benchmarks/bench_game_state_memory.py [--sessions 20000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from game_state import GameState
+from story_graph import get_scenario
+
+SCENARIO = get_scenario()
+
+TURNS = [
+    ("我要拔劍衝向巨人！", "charge", "turn1_battle"),
+    ("I want to hide and wait", "wait_hide", "turn2_retreat"),
+    ("為了保護孩子們，我願意犧牲自己", "sacrifice", "ending_hero"),
+]
+
+
+class LegacyGameState:
+    """舊版實作"""
+
+    def __init__(self):
+        self.current_turn = 0
+        self.max_turns = 3
+        self.story_history = []
+        self.user_actions = []
+        self.emotion_history = []
+        self.current_emotion = "intro"
+
+    def add_story(self, story):
+        self.story_history.append(story)
+
+    def add_user_action(self, action):
+        self.user_actions.append(action)
+
+    def add_emotion(self, emotion):
+        self.emotion_history.append(emotion)
+        self.current_emotion = emotion
+
+    def next_turn(self):
+        self.current_turn += 1
+
+
+def play_legacy(player: int, copy_text: bool):
+    state = LegacyGameState()
+    text = SCENARIO.opening.text
+    state.add_story((text + " ")[:-1] if copy_text else text)
+    for action, emotion, story_id in TURNS:
+        state.add_user_action(f"{action} #{player}")
+        state.add_emotion(emotion)
+        state.next_turn()
+        text = SCENARIO.texts[story_id]
+        state.add_story((text + " ")[:-1] if copy_text else text)
+    return state
+
+
+def play_compact(player: int, copy_text: bool):
+    state = GameState()
+    state.add_story_ref(SCENARIO.opening.node_id)
+    for action, emotion, story_id in TURNS:
+        state.add_user_action(f"{action} #{player}")
+        state.add_emotion(emotion)
+        state.next_turn()
+        state.add_story_ref(story_id)
+    return state
+
+
+def bytes_per_session(play, sessions: int, copy_text: bool) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    states = [play(player, copy_text) for player in range(sessions)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del states
+    return (after - before) / sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20000, help="建立的會話數")
+    args = parser.parse_args()
+
+    legacy = play_legacy(0, False)
+    compact = play_compact(0, False)
+    if (legacy.story_history != compact.story_history or legacy.emotion_history != compact.emotion_history
+            or legacy.user_actions != compact.user_actions):
+        raise SystemExit("結果不一致 | Result mismatch")
+
+    # 第一行（shared）是遊戲實際的情況
+    for copy_text in (False, True):
+        label = "copied" if copy_text else "shared"
+        old = bytes_per_session(play_legacy, args.sessions, copy_text)
+        new = bytes_per_session(play_compact, args.sessions, copy_text)
+        print(f"{label:>6} story text: legacy {old:9.0f} B/session | compact {new:7.0f} B/session | "
+              f"x{old / new:5.1f} smaller | {args.sessions} sessions: {old * args.sessions / 2**20:7.1f} MB -> "
+              f"{new * args.sessions / 2**20:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
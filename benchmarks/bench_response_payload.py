@@ -0,0 +1,75 @@
+"""
+回合回應大小基準測試 | Turn response payload benchmark
+
+比較 process_user_action 的精簡回應與完整回應（verbose=True）：
+每回合序列化後的位元組數與 JSON 編碼時間。使用無音效後端，不需要音效裝置。
+
+用法 | Usage:
+    python benchmarks/bench_response_payload.py [--games 200] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("ADVENTURE_AUDIO_BACKEND", "null")
+
+from adventure_game_master import agent
+
+GAMES = [
+    ["我要拔劍衝向巨人！", "I keep fighting with all my courage", "為了保護孩子們，我願意犧牲自己"],
+    ["I want to hide and wait", "我害怕得想逃跑", "I run away from the city"],
+    ["我微笑著向巨人伸出手", "I hope for a peaceful, calm ending", "smile"],
+]
+
+
+def collect_responses(games: int, verbose: bool, language: str) -> list:
+    """進行多場遊戲並收集每回合的回應"""
+    responses = []
+    for game in range(games):
+        agent.start_game(language=language)
+        for action in GAMES[game % len(GAMES)]:
+            responses.append(agent.process_user_action(action, verbose=verbose))
+    return responses
+
+
+def measure(responses: list, repeat: int, ensure_ascii: bool) -> dict:
+    payloads = [json.dumps(response, ensure_ascii=ensure_ascii).encode("utf-8") for response in responses]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for response in responses:
+            json.dumps(response, ensure_ascii=ensure_ascii).encode("utf-8")
+    elapsed = time.perf_counter() - start
+    return {
+        "bytes_per_turn": sum(len(payload) for payload in payloads) / len(payloads),
+        "encode_us": elapsed / (repeat * len(responses)) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=200, help="每種模式進行的遊戲場數")
+    parser.add_argument("--repeat", type=int, default=20, help="JSON 編碼重複次數")
+    args = parser.parse_args()
+
+    try:
+        for language in ("both", "en"):
+            full = collect_responses(args.games, True, language)
+            compact = collect_responses(args.games, False, language)
+            if [r["story"] for r in full] != [r["story"] for r in compact]:
+                raise SystemExit("故事不一致 | Story mismatch")
+            for ensure_ascii in (True, False):
+                old = measure(full, args.repeat, ensure_ascii)
+                new = measure(compact, args.repeat, ensure_ascii)
+                label = f"{language}, {'ascii' if ensure_ascii else 'utf-8'}"
+                print(f"{label:>12}: full {old['bytes_per_turn']:7.0f} B/turn {old['encode_us']:6.1f} us | "
+                      f"compact {new['bytes_per_turn']:6.0f} B/turn {new['encode_us']:6.1f} us | "
+                      f"x{old['bytes_per_turn'] / new['bytes_per_turn']:4.1f} smaller")
+    finally:
+        agent.music_queue.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+冷啟動時間基準測試 | Cold-start benchmark
+
+每次以新的 Python 程序匯入 agent 模組，量測整個程序的執行時間與匯入時間（中位數），
+另外量測第一次讀取 root_agent（匯入 google.adk.agents 並建立代理程式）的時間；
+再以 python -X importtime 列出累計匯入時間最長的模組與各套件的匯入時間。
+
+程序執行時間的中位數超過預算時以結束碼 1 結束，可以放進 CI 檢查冷啟動退化。
+預算可用 --budget-ms 或環境變數 ADVENTURE_STARTUP_BUDGET_MS 設定，0 表示不檢查。
+
+用法 | Usage:
+    python benchmarks/bench_startup.py [--runs 7] [--budget-ms 400] [--top 15]
+                                       [--module adventure_game_master.agent] [--output startup.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+DEFAULT_MODULE = "adventure_game_master.agent"
+DEFAULT_BUDGET_MS = 400.0
+
+# 子程序：匯入模組後（可選）讀取 root_agent，以 JSON 回報各段時間
+CHILD = """
+import importlib, json, sys, time
+start = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+root_agent_ms = None
+if sys.argv[2] == "1" and hasattr(module, "root_agent"):
+    root_agent_ms = (time.perf_counter() - imported) * 1000
+print(json.dumps({"import_ms": (imported - start) * 1000, "root_agent_ms": root_agent_ms,
+                  "modules": len(sys.modules)}))
+"""
+
+
+def child_env() -> dict:
+    env = dict(os.environ)
+    env.setdefault("ADVENTURE_AUDIO_BACKEND", "null")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.abspath(ROOT), env.get("PYTHONPATH")]))
+    return env
+
+
+def measure(module: str, with_agent: bool) -> dict:
+    """啟動一個新程序，回傳程序執行時間與子程序回報的時間"""
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", CHILD, module, "1" if with_agent else "0"],
+                               capture_output=True, text=True, env=child_env(), cwd=ROOT)
+    wall_ms = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise SystemExit(f"匯入失敗 | Import failed:\n{completed.stderr}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["wall_ms"] = wall_ms
+    return result
+
+
+def import_profile(module: str) -> list:
+    """以 -X importtime 匯入模組，回傳 (模組, 自身毫秒, 累計毫秒, 深度) 的清單"""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               capture_output=True, text=True, env=child_env(), cwd=ROOT)
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue    # 標題行
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(fields[0]) / 1000, int(fields[1]) / 1000, depth))
+    return entries
+
+
+def by_package(entries: list) -> dict:
+    """各頂層套件自身匯入時間的總和（毫秒）"""
+    totals = {}
+    for name, self_ms, _, _ in entries:
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0.0) + self_ms
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="要匯入的模組")
+    parser.add_argument("--runs", type=int, default=7, help="量測次數（另外先執行一次暖機）")
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.environ.get("ADVENTURE_STARTUP_BUDGET_MS", DEFAULT_BUDGET_MS)),
+                        help="程序執行時間中位數的上限（毫秒），0 表示不檢查")
+    parser.add_argument("--top", type=int, default=15, help="列出累計匯入時間最長的模組數")
+    parser.add_argument("--output", default=None, help="結果 JSON 檔")
+    args = parser.parse_args()
+
+    # 第一次執行會編譯 .pyc，不列入統計
+    measure(args.module, with_agent=False)
+    runs = [measure(args.module, with_agent=False) for _ in range(args.runs)]
+    agent_runs = [measure(args.module, with_agent=True) for _ in range(max(1, args.runs // 2))]
+    interpreter = [measure("site", with_agent=False)["wall_ms"] for _ in range(args.runs)]
+
+    wall_ms = statistics.median(run["wall_ms"] for run in runs)
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    agent_times = [run["root_agent_ms"] for run in agent_runs if run["root_agent_ms"] is not None]
+    root_agent_ms = statistics.median(agent_times) if agent_times else None
+    print(f"模組 | Module: {args.module} ({args.runs} runs, {runs[-1]['modules']} modules loaded)")
+    print(f"  直譯器啟動 | interpreter only : {statistics.median(interpreter):8.1f} ms")
+    print(f"  冷啟動 | cold start (wall)    : {wall_ms:8.1f} ms  (min {min(run['wall_ms'] for run in runs):.1f}, "
+          f"max {max(run['wall_ms'] for run in runs):.1f})")
+    print(f"  匯入 | import                 : {import_ms:8.1f} ms")
+    if root_agent_ms is not None:
+        print(f"  首次 root_agent | first agent  : {root_agent_ms:8.1f} ms")
+
+    entries = import_profile(args.module)
+    print("\n累計匯入時間最長的模組 | Slowest imports (cumulative):")
+    for name, self_ms, cumulative_ms, depth in sorted(entries, key=lambda entry: -entry[2])[:args.top]:
+        print(f"  {cumulative_ms:8.1f} ms  (self {self_ms:6.1f})  {'  ' * depth}{name}")
+    packages = by_package(entries)
+    print("\n各套件的匯入時間 | Import time by package (self):")
+    for package, total_ms in list(packages.items())[:args.top]:
+        print(f"  {total_ms:8.1f} ms  {package}")
+
+    if args.output:
+        report = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": sys.version.split()[0],
+            "module": args.module,
+            "runs": runs,
+            "wall_ms": wall_ms,
+            "import_ms": import_ms,
+            "root_agent_ms": root_agent_ms,
+            "budget_ms": args.budget_ms,
+            "imports": [{"module": name, "self_ms": self_ms, "cumulative_ms": cumulative_ms}
+                        for name, self_ms, cumulative_ms, _ in entries],
+            "packages": packages,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n結果已寫入 | Results written to {args.output}")
+
+    if args.budget_ms > 0 and wall_ms > args.budget_ms:
+        print(f"\n冷啟動超過預算 | Cold start over budget: {wall_ms:.1f} ms > {args.budget_ms:.1f} ms")
+        sys.exit(1)
+    if args.budget_ms > 0:
+        print(f"\n冷啟動在預算內 | Cold start within budget: {wall_ms:.1f} ms <= {args.budget_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+多會話負載產生器 | Headless multi-session load generator
+
+不經過 LLM，直接呼叫 agent 的工具函數模擬大量虛擬玩家：
+每位玩家 start_game → process_user_action × 回合數 → get_game_status，
+各自使用獨立的 ADK 會話 id，音效使用無音效後端。
+
+依序以不同的同時玩家數執行，回報每秒回合數、各工具的延遲百分位數與記憶體用量，
+並把結果寫成 JSON，方便比較不同版本的結果。
+
+用法 | Usage:
+    python benchmarks/load_generator.py [--players 1,10,100,1000,5000] [--threads 16] [--games 1]
+                                        [--corpus actions.txt] [--output load_results.json] [--compare old.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("ADVENTURE_AUDIO_BACKEND", "null")
+os.environ.setdefault("ADVENTURE_MAX_SESSIONS", "1000000")
+
+from adventure_game_master import agent
+
+# 預設的行動語料：中英文、短指令到長句
+DEFAULT_CORPUS = [
+    "我要拔劍衝向巨人！",
+    "I grab my sword and charge at the giant",
+    "attack",
+    "我害怕得想逃跑",
+    "I want to hide and wait",
+    "為了保護孩子們，我願意犧牲自己",
+    "I sacrifice myself for humanity",
+    "我微笑著向巨人伸出手，希望能和平解決",
+    "I smile and hope for a peaceful ending",
+    "衝",
+    "keep fighting, never give up",
+    "我們一起前進吧 let's advance together",
+]
+
+TOOLS = ("start_game", "process_user_action", "get_game_status")
+
+_results_lock = threading.Lock()
+
+
+def load_corpus(path):
+    if path is None:
+        return DEFAULT_CORPUS
+    with open(path, encoding="utf-8") as f:
+        actions = [line.strip() for line in f if line.strip()]
+    if not actions:
+        raise SystemExit(f"語料是空的 | Corpus is empty: {path}")
+    return actions
+
+
+def tool_context(session_id: str):
+    """工具函數只讀取 tool_context.session.id"""
+    return SimpleNamespace(session=SimpleNamespace(id=session_id))
+
+
+def rss_mb() -> float:
+    """目前的常駐記憶體（MB）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """程序到目前為止的最大常駐記憶體（MB）；Linux 以 KB 回報，macOS 以位元組回報"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def run_worker(contexts, games: int, corpus, seed: int, latencies, errors):
+    """一個執行緒輪流推進多位玩家：所有玩家的遊戲同時進行"""
+    rng = random.Random(seed)
+    samples = {tool: [] for tool in TOOLS}
+    failed = 0
+    clock = time.perf_counter_ns
+    for _ in range(games):
+        for context in contexts:
+            start = clock()
+            result = agent.start_game(tool_context=context)
+            samples["start_game"].append(clock() - start)
+            failed += result.get("status") == "error"
+        for context in contexts:
+            context.version = -1
+        game_over = False
+        while not game_over:
+            for context in contexts:
+                start = clock()
+                result = agent.process_user_action(rng.choice(corpus), tool_context=context)
+                samples["process_user_action"].append(clock() - start)
+                failed += result.get("status") == "error"
+                game_over = result.get("game_over", True)
+            for context in contexts:
+                start = clock()
+                result = agent.get_game_status(since_version=context.version, tool_context=context)
+                samples["get_game_status"].append(clock() - start)
+                context.version = result["version"]
+    with _results_lock:
+        for tool in TOOLS:
+            latencies[tool].extend(samples[tool])
+        errors.append(failed)
+
+
+def percentiles(samples) -> dict:
+    if not samples:
+        return {}
+    samples.sort()
+
+    def at(quantile):
+        return round(samples[min(len(samples) - 1, int(quantile * len(samples)))] / 1e6, 4)
+    return {"p50_ms": at(0.5), "p95_ms": at(0.95), "p99_ms": at(0.99), "max_ms": round(samples[-1] / 1e6, 4),
+            "calls": len(samples)}
+
+
+def run_level(players: int, threads: int, games: int, corpus, seed: int) -> dict:
+    """以固定的同時玩家數執行一輪"""
+    threads = max(1, min(threads, players))
+    contexts = [tool_context(f"load-{players}-{player}") for player in range(players)]
+    latencies = {tool: [] for tool in TOOLS}
+    errors = []
+    workers = [threading.Thread(target=run_worker,
+                                args=(contexts[index::threads], games, corpus, seed + index, latencies, errors))
+               for index in range(threads)]
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    turns = len(latencies["process_user_action"])
+    result = {
+        "players": players,
+        "threads": threads,
+        "games_per_player": games,
+        "turns": turns,
+        "errors": sum(errors),
+        "seconds": round(elapsed, 3),
+        "turns_per_second": round(turns / elapsed, 1),
+        "tool_latency": {tool: percentiles(samples) for tool, samples in latencies.items()},
+        "rss_mb": round(rss_mb(), 1),
+        "rss_growth_mb": round(rss_mb() - rss_before, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "live_sessions": len(agent.sessions),
+    }
+    # 下一輪使用新的會話 id，先移除這一輪的會話
+    for context in contexts:
+        agent.sessions.remove(context.session.id)
+    return result
+
+
+def compare(results: list, path: str):
+    """與先前的結果比較每秒回合數與 process_user_action 的 p99"""
+    with open(path, encoding="utf-8") as f:
+        previous = {level["players"]: level for level in json.load(f)["results"]}
+    for level in results:
+        old = previous.get(level["players"])
+        if old is None:
+            continue
+        old_p99 = old["tool_latency"]["process_user_action"].get("p99_ms") or 0
+        new_p99 = level["tool_latency"]["process_user_action"].get("p99_ms") or 0
+        print(f"{level['players']:>6} players: turns/s {old['turns_per_second']:>10.1f} -> "
+              f"{level['turns_per_second']:>10.1f} (x{level['turns_per_second'] / old['turns_per_second']:.2f}) | "
+              f"process p99 {old_p99:.3f} -> {new_p99:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--players", default="1,10,100,1000,5000", help="以逗號分隔的同時玩家數")
+    parser.add_argument("--threads", type=int, default=16, help="工作執行緒數")
+    parser.add_argument("--games", type=int, default=1, help="每位玩家進行的遊戲場數")
+    parser.add_argument("--corpus", default=None, help="行動語料檔（每行一個行動）")
+    parser.add_argument("--seed", type=int, default=1, help="隨機種子")
+    parser.add_argument("--output", default="load_results.json", help="結果 JSON 檔")
+    parser.add_argument("--compare", default=None, help="要比較的先前結果 JSON 檔")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    levels = [int(players) for players in args.players.split(",") if players.strip()]
+    results = []
+    try:
+        for players in levels:
+            level = run_level(players, args.threads, args.games, corpus, args.seed)
+            results.append(level)
+            process = level["tool_latency"]["process_user_action"]
+            print(f"{players:>6} players x{level['threads']:<3} threads: {level['turns_per_second']:10.1f} turns/s | "
+                  f"process p50 {process['p50_ms']:.3f} p95 {process['p95_ms']:.3f} p99 {process['p99_ms']:.3f} ms | "
+                  f"rss {level['rss_mb']:.1f} MB (peak {level['peak_rss_mb']:.1f}) | errors {level['errors']}")
+    finally:
+        agent.music_queue.stop()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {"threads": args.threads, "games": args.games, "corpus_size": len(corpus), "seed": args.seed},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"結果已寫入 | Results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
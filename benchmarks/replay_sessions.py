@@ -0,0 +1,65 @@
+"""
+錄製會話重播 | Recorded session replay
+
+以目前的 EmotionAnalyzer、GameState 與劇本程式碼重播 ADVENTURE_RECORD_FILE 錄下的工具呼叫，
+列出結果不一致與延遲退化的呼叫。有不一致或退化時以結束碼 1 結束，可放在 CI 裡。
+
+錄製 | Record:
+    ADVENTURE_RECORD_FILE=sessions.jsonl adk web
+
+用法 | Usage:
+    python benchmarks/replay_sessions.py sessions.jsonl [--pacing full|original] [--threshold 0.5]
+                                         [--min-regression-ms 1.0] [--output replay_report.json]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("ADVENTURE_AUDIO_BACKEND", "null")
+# 重播時不再錄製
+os.environ.pop("ADVENTURE_RECORD_FILE", None)
+
+from adventure_game_master import agent
+from session_recorder import DEFAULT_MIN_REGRESSION_MS, DEFAULT_THRESHOLD, SessionReplayer, load_records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("record_file", help="錄製檔（JSONL）")
+    parser.add_argument("--pacing", choices=("full", "original"), default="full",
+                        help="full 全速重播，original 依錄製時的時間間隔")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="延遲退化的比例門檻")
+    parser.add_argument("--min-regression-ms", type=float, default=DEFAULT_MIN_REGRESSION_MS,
+                        help="延遲退化的最小絕對差（毫秒）")
+    parser.add_argument("--output", default=None, help="完整報告 JSON 檔")
+    args = parser.parse_args()
+
+    tools = {tool.__name__: tool for tool in agent.TOOLS}
+    replayer = SessionReplayer(tools, args.threshold, args.min_regression_ms)
+    try:
+        report = replayer.replay(load_records(args.record_file), args.pacing)
+    finally:
+        agent.music_queue.stop()
+
+    for tool, stats in sorted(report["tools"].items()):
+        print(f"{tool:>26}: {stats['calls']:6d} calls | p50 {stats['recorded_p50_ms']:8.3f} -> "
+              f"{stats['replay_p50_ms']:8.3f} ms | p95 {stats['recorded_p95_ms']:8.3f} -> "
+              f"{stats['replay_p95_ms']:8.3f} ms | mismatches {stats['mismatches']} | regressions {stats['regressions']}")
+    for mismatch in report["mismatches"][:10]:
+        print(f"結果不一致 | Mismatch: #{mismatch['seq']} {mismatch['tool']} {json.dumps(mismatch['args'], ensure_ascii=False)}")
+    for regression in report["regressions"][:10]:
+        print(f"延遲退化 | Regression: #{regression['seq']} {regression['tool']} "
+              f"{regression['recorded_ms']:.3f} -> {regression['replay_ms']:.3f} ms")
+    if report["skipped"]:
+        print(f"略過未知工具的呼叫 | Skipped calls to unknown tools: {report['skipped']}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    sys.exit(0 if report["status"] == "success" else 1)
+
+
+if __name__ == "__main__":
+    main()
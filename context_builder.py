@@ -0,0 +1,214 @@
+"""
+以 token 預算組成給模型的遊戲上下文
+
+最近 window_turns 個回合保留完整內容（行動、情緒、故事文本）；更早的回合在離開視窗時
+逐回合併入摘要（情緒走向、各情緒次數、關鍵選擇），每回合只處理新增的部分，
+不會隨遊戲變長而重新讀取整段歷史。
+
+超出 token 預算時依序：
+    1. 拿掉較舊回合的故事文本（保留 story id）
+    2. 從最舊的開始拿掉摘要裡的關鍵選擇
+    3. 從最新一回合開始截短故事與行動文本
+    4. 拿掉摘要，再從最舊的開始拿掉回合
+只有 turn 與 current_emotion 一定保留；預算小於這兩個欄位時才會超出預算。
+
+token 數為估計值：中日韓文字每字約 1 token，其他文字每 4 個字元約 1 token。
+"""
+import json
+import re
+from collections import deque
+from typing import Dict, List, Optional
+
+DEFAULT_WINDOW_TURNS = 2
+DEFAULT_TOKEN_BUDGET = 1200
+ARC_LIMIT = 12          # 情緒走向最多保留的段數
+CHOICE_LIMIT = 6        # 摘要最多保留的關鍵選擇數
+CHOICE_CHARS = 40       # 每個關鍵選擇保留的字元數
+
+# 與 localization 相同的中日韓字元範圍
+_CJK = re.compile(r"[㐀-鿿豈-﫿　-〿＀-￯]")
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """估計文本的 token 數"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def payload_tokens(payload) -> int:
+    """估計 JSON 內容送給模型時的 token 數"""
+    return estimate_tokens(json.dumps(payload, ensure_ascii=False))
+
+
+class ContextBuilder:
+    # 每個會話一個；呼叫端需持有會話鎖
+    __slots__ = ("window_turns", "language", "next_fold", "next_observe", "history_tokens",
+                 "emotion_counts", "arc", "arc_dropped", "choices", "choices_omitted")
+
+    def __init__(self, window_turns: int = DEFAULT_WINDOW_TURNS):
+        """
+        增量摘要的上下文產生器
+
+        Args:
+            window_turns (int): 保留完整內容的最近回合數
+        """
+        self.window_turns = max(1, window_turns)
+        self.language = None
+        self.next_fold = 0              # 第一個還沒併入摘要的回合
+        self.next_observe = 0           # 第一個還沒計入完整歷史 token 數的回合
+        self.history_tokens = 0         # 已完成回合的完整內容 token 數
+        self.emotion_counts: Dict[str, int] = {}
+        self.arc = deque()              # 情緒走向：[[情緒, 連續回合數], ...]
+        self.arc_dropped = 0
+        self.choices = deque()
+        self.choices_omitted = 0
+
+    def build(self, state, language: str = "both", token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET) -> Dict:
+        """
+        組成上下文
+
+        Args:
+            state (GameState): 遊戲狀態
+            language (str): 故事文本的語言：zh / en / both
+            token_budget (int): token 上限；None 或小於等於 0 表示不限制
+
+        Returns:
+            Dict: turn, current_emotion, summary, recent_turns 與 token_report
+        """
+        if language != self.language:
+            # 完整歷史的 token 數與語言有關，換語言時重新計算一次
+            self.language = language
+            self.next_observe = 0
+            self.history_tokens = 0
+
+        latest = state.current_turn
+        window_start = max(0, latest - self.window_turns + 1)
+        texts = state.scenario.localized_texts[language]
+        recent = []
+        latest_tokens = 0
+        for turn, action, emotion, story_id in state.turn_entries(min(self.next_fold, self.next_observe, window_start)):
+            entry = self._entry(turn, action, emotion, story_id, texts.get(story_id))
+            if turn < latest:
+                # 已完成的回合只計算一次
+                if turn >= self.next_observe:
+                    self.history_tokens += payload_tokens(entry)
+                    self.next_observe = turn + 1
+            else:
+                latest_tokens = payload_tokens(entry)
+            if turn < window_start:
+                if turn >= self.next_fold:
+                    self._fold(turn, action, emotion)
+                    self.next_fold = turn + 1
+            else:
+                recent.append(entry)
+
+        summary = self._summary()
+        context = {"turn": latest, "current_emotion": state.current_emotion,
+                   "summary": summary, "recent_turns": recent}
+        tokens = payload_tokens(context)
+        if token_budget is not None and token_budget > 0:
+            tokens = self._fit(context, tokens, token_budget)
+
+        full_tokens = self.history_tokens + latest_tokens
+        context["token_report"] = {
+            "context_tokens": tokens,
+            "full_history_tokens": full_tokens,
+            "saved_tokens": max(0, full_tokens - tokens),
+            "token_budget": token_budget,
+            "window_turns": self.window_turns,
+            "summarized_turns": self.next_fold,
+        }
+        return context
+
+    @staticmethod
+    def _entry(turn: int, action: Optional[str], emotion: Optional[str],
+               story_id: Optional[str], story: Optional[str]) -> Dict:
+        entry = {"turn": turn}
+        if action is not None:
+            entry["action"] = action
+        if emotion is not None:
+            entry["emotion"] = emotion
+        if story_id is not None:
+            entry["story_id"] = story_id
+        if story is not None:
+            entry["story"] = story
+        return entry
+
+    def _fold(self, turn: int, action: Optional[str], emotion: Optional[str]):
+        """把離開視窗的回合併入摘要"""
+        if emotion is not None:
+            self.emotion_counts[emotion] = self.emotion_counts.get(emotion, 0) + 1
+            if self.arc and self.arc[-1][0] == emotion:
+                self.arc[-1][1] += 1
+            else:
+                self.arc.append([emotion, 1])
+                if len(self.arc) > ARC_LIMIT:
+                    self.arc.popleft()
+                    self.arc_dropped += 1
+        if action is not None:
+            short = action if len(action) <= CHOICE_CHARS else action[:CHOICE_CHARS] + "…"
+            self.choices.append(f"T{turn} ({emotion}): {short}")
+            if len(self.choices) > CHOICE_LIMIT:
+                self.choices.popleft()
+                self.choices_omitted += 1
+
+    def _summary(self) -> Optional[Dict]:
+        if not self.next_fold:
+            return None
+        arc = " → ".join(emotion if count == 1 else f"{emotion}×{count}" for emotion, count in self.arc)
+        return {
+            "summarized_turns": self.next_fold,
+            "emotion_arc": ("… → " + arc) if self.arc_dropped else arc,
+            "emotion_counts": dict(self.emotion_counts),
+            "key_choices": list(self.choices),
+            "omitted_choices": self.choices_omitted,
+        }
+
+    @staticmethod
+    def _fit(context: Dict, tokens: int, token_budget: int) -> int:
+        """依序縮減內容直到符合 token 預算，回傳縮減後的 token 數"""
+        recent: List[Dict] = context["recent_turns"]
+        for entry in recent[:-1]:
+            if tokens <= token_budget:
+                return tokens
+            if entry.pop("story", None) is not None:
+                tokens = payload_tokens(context)
+
+        summary = context["summary"]
+        while tokens > token_budget and summary and summary["key_choices"]:
+            summary["key_choices"].pop(0)
+            summary["omitted_choices"] += 1
+            tokens = payload_tokens(context)
+
+        # 從最新一回合開始截短文本
+        for entry in reversed(recent):
+            for key in ("story", "action"):
+                if tokens <= token_budget:
+                    return tokens
+                tokens = ContextBuilder._truncate(context, entry, key, tokens, token_budget)
+
+        if tokens > token_budget and summary is not None:
+            context["summary"] = None
+            tokens = payload_tokens(context)
+        while tokens > token_budget and recent:
+            recent.pop(0)
+            tokens = payload_tokens(context)
+        return tokens
+
+    @staticmethod
+    def _truncate(context: Dict, entry: Dict, key: str, tokens: int, token_budget: int) -> int:
+        """截短 entry[key] 直到符合預算，截到沒有內容時拿掉該欄位"""
+        text = entry.get(key)
+        while text and tokens > token_budget:
+            over = tokens - token_budget
+            # 依每 token 的平均字元數決定要截掉多少
+            cut = max(1, over * len(text) // max(1, estimate_tokens(text)))
+            text = text[:max(0, len(text) - cut)]
+            entry[key] = text + "…"
+            tokens = payload_tokens(context)
+        if key in entry and not text:
+            entry.pop(key)
+            tokens = payload_tokens(context)
+        return tokens
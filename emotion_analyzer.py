@@ -1,9 +1,178 @@
-import re
-from typing import Dict, List
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from emotion_cache import EmotionCache, normalize_text
+from localization import split_bilingual
+from metrics import timed
+
+if TYPE_CHECKING:
+    # 模型與關鍵詞比對器在第一次分析或載入模型檔時才匯入
+    from emotion_model import EmotionModel
+
+# 信心度說明，載入時預先拆成各語言版本
+CONFIDENCE_LEVELS = {
+    "very_certain": split_bilingual("非常確定 | Very certain"),
+    "quite_certain": split_bilingual("相當確定 | Quite certain"),
+    "medium": split_bilingual("中等確定度 | Medium certainty"),
+    "low": split_bilingual("低確定度 | Low certainty")
+}
+CONFIDENCE_LABELS = {"zh": "信心度:", "en": "Confidence:", "both": "信心度 | Confidence:"}
+# 空白輸入的分析說明
+EMPTY_INPUT_ANALYSIS = split_bilingual("輸入為空，使用預設情緒 | Empty input, using the default emotion")
+
+
+def _track(value, on_change):
+    """把詞典裡的 dict 與 list 換成會通知變動的容器（遞迴處理巢狀內容）"""
+    if isinstance(value, dict):
+        return _TrackedDict(on_change, value)
+    if isinstance(value, list):
+        return _TrackedList(on_change, value)
+    return value
+
+
+class _TrackedDict(dict):
+    """就地修改時呼叫 on_change 的 dict，讓分析器在下一次分析時重建模型"""
+    __slots__ = ("_on_change",)
+
+    def __init__(self, on_change, items=()):
+        self._on_change = on_change
+        super().__init__((key, _track(value, on_change)) for key, value in dict(items).items())
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, _track(value, self._on_change))
+        self._on_change()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._on_change()
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def update(self, *args, **kwargs):
+        super().update({key: _track(value, self._on_change) for key, value in dict(*args, **kwargs).items()})
+        self._on_change()
+
+    def setdefault(self, key, default=None):
+        if key in self:
+            return self[key]
+        self[key] = default
+        return self[key]
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._on_change()
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self._on_change()
+        return item
+
+    def clear(self):
+        super().clear()
+        self._on_change()
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class _TrackedList(list):
+    """就地修改時呼叫 on_change 的 list"""
+    __slots__ = ("_on_change",)
+
+    def __init__(self, on_change, items=()):
+        self._on_change = on_change
+        super().__init__(_track(item, on_change) for item in items)
+
+    def _changed(name):
+        def method(self, *args, **kwargs):
+            result = getattr(super(_TrackedList, self), name)(*args, **kwargs)
+            self._on_change()
+            return result
+        method.__name__ = name
+        return method
+
+    __delitem__ = _changed("__delitem__")
+    pop = _changed("pop")
+    remove = _changed("remove")
+    clear = _changed("clear")
+    sort = _changed("sort")
+    reverse = _changed("reverse")
+    __imul__ = _changed("__imul__")
+    del _changed
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = [_track(item, self._on_change) for item in value]
+        else:
+            value = _track(value, self._on_change)
+        super().__setitem__(index, value)
+        self._on_change()
+
+    def append(self, item):
+        super().append(_track(item, self._on_change))
+        self._on_change()
+
+    def insert(self, index, item):
+        super().insert(index, _track(item, self._on_change))
+        self._on_change()
+
+    def extend(self, items):
+        super().extend(_track(item, self._on_change) for item in items)
+        self._on_change()
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+class _LexiconField:
+    """詞典欄位：重新指定或就地修改時遞增分析器的詞典版本，下一次分析時重建模型"""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return instance.__dict__[self.name]
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = _track(value, instance._lexicon_changed)
+        instance._lexicon_changed()
+
 
 class EmotionAnalyzer:
-    def __init__(self):
-        """初始化情緒分析器"""
+    # 詞典的公開屬性；重新指定或就地修改（例如 append 關鍵詞）都會讓下一次分析重建模型
+    emotion_keywords = _LexiconField()
+    emotion_weights = _LexiconField()
+    priority_rules = _LexiconField()
+    escape_emotions = _LexiconField()
+    escape_rivals = _LexiconField()
+    analysis_templates = _LexiconField()
+
+    def __init__(self, cache_size: int = 0, cache_max_bytes: Optional[int] = None, model_path: Optional[str] = None):
+        """
+        初始化情緒分析器
+        
+        Args:
+            cache_size (int): 結果快取的最大筆數，0 表示不使用快取
+            cache_max_bytes (int): 可選的快取記憶體上限（位元組）
+            model_path (str): 可選的編譯後模型檔，取代內建詞典
+        """
+        
+        # 詞典版本：詞典屬性被重新指定或就地修改時遞增，模型只在版本改變時重建
+        self._lexicon_version = 0
+        self._model_version = -1
+        
+        # 結果快取：以正規化後的輸入為鍵，詞典或權重變動時自動失效
+        self._cache = EmotionCache(cache_size, cache_max_bytes) if cache_size > 0 else None
         
         # 大幅擴展的情緒關鍵詞字典 - 支援更多音樂類型
         self.emotion_keywords = {
@@ -131,13 +300,52 @@ class EmotionAnalyzer:
             "heroic_death": 1.5,    # 英勇犧牲權重最高
             "peaceful": 1.0         # 和平
         }
+        
+        # 優先規則：(優先情緒, 被取代的情緒, 門檻比例)，依序只套用第一條兩者皆出現的規則
+        self.priority_rules = [
+            ("heroic_death", "sacrifice", 0.8),   # 1. 英勇犧牲優先於普通犧牲
+            ("tense_battle", "battle", 0.8),      # 2. 緊張戰鬥優先於普通戰鬥
+            ("charge", "advance", 0.8)            # 3. 衝鋒優先於前進
+        ]
+        
+        # 逃跑相關情緒：總分超過所有對手情緒時，改用其中最高分者
+        self.escape_emotions = ["sad", "retreat", "wait_hide"]
+        self.escape_rivals = ["battle", "heroic"]
+        
+        # 情緒分析說明模板
+        self.analysis_templates = {
+            "battle": "檢測到戰鬥意圖，充滿戰鬥精神！ | Detected battle intent, full of fighting spirit!",
+            "tense_battle": "檢測到激烈戰鬥情緒，情況緊張！ | Detected intense battle emotion, situation is tense!",
+            "heroic": "檢測到英勇犧牲精神，令人敬佩的決心！ | Detected heroic sacrifice spirit, admirable determination!",
+            "advance": "檢測到前進意志，勇往直前！ | Detected advancing will, moving forward bravely!",
+            "charge": "檢測到衝鋒號令，全力攻擊！ | Detected charge command, full assault!",
+            "sad": "檢測到悲傷情緒，內心充滿掙扎。 | Detected sadness, heart full of struggle.",
+            "wait_hide": "檢測到等待隱藏策略，謹慎觀察中。 | Detected wait-and-hide strategy, observing cautiously.",
+            "retreat": "檢測到撤退意圖，選擇戰略性後退。 | Detected retreat intention, choosing strategic withdrawal.",
+            "sacrifice": "檢測到犧牲精神，準備為他人獻身。 | Detected sacrifice spirit, ready to give life for others.",
+            "victory": "檢測到勝利的喜悅！ | Detected joy of victory!",
+            "defeat": "檢測到失敗的沮喪情緒。 | Detected frustration of defeat.",
+            "smile": "檢測到快樂正面情緒，心情愉悅！ | Detected happy positive emotion, joyful mood!",
+            "heroic_death": "檢測到英勇就義精神，壯烈犧牲！ | Detected heroic martyrdom spirit, glorious sacrifice!",
+            "peaceful": "檢測到平和寧靜情緒，內心安詳。 | Detected peaceful calm emotion, serene heart."
+        }
+        
+        # 編譯後的不可變模型；詞典屬性重新指定時自動重建，也可由模型檔熱替換
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._model_source = None
+        
+        if model_path:
+            self.load_model(model_path)
     
-    def analyze_emotion(self, user_input: str) -> Dict[str, any]:
+    @timed("emotion_analyzer.analyze_emotion")
+    def analyze_emotion(self, user_input: str, language: str = "both") -> Dict[str, any]:
         """
         分析用戶輸入的情緒
         
         Args:
             user_input (str): 用戶輸入的文字
+            language (str): 分析說明的語言：zh / en / both
             
         Returns:
             Dict: 包含主要情緒、信心度和詳細分析
@@ -149,32 +357,262 @@ class EmotionAnalyzer:
                 "confidence": 0.0,
                 "emotion_scores": {},
                 "matched_keywords": {},
-                "analysis": "輸入為空，使用預設情緒"
+                "analysis": EMPTY_INPUT_ANALYSIS[language]
             }
         
+        # 整個分析過程使用同一個模型，熱替換不會影響進行中的分析
+        model = self._get_model()
+        
+        if self._cache is None:
+            result = self._analyze_text(user_input, model)
+        else:
+            # 快取鍵只轉小寫，分析的仍是原始輸入，結果與不使用快取時相同
+            key = normalize_text(user_input)
+            result = self._cache.get(key, model)
+            if result is None:
+                result = self._analyze_text(user_input, model)
+                self._cache.put(key, model, result)
+        
+        # 快取只保存雙語版本；單一語言只重新組合分析說明
+        if language != "both":
+            result["analysis"] = self._generate_analysis(result["primary_emotion"], result["confidence"],
+                                                         result["matched_keywords"], model, language)
+        return result
+
+    def cache_info(self) -> Dict[str, any]:
+        """獲取結果快取的統計資訊"""
+        if self._cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self._cache.info()}
+    
+    def clear_cache(self) -> None:
+        """清空結果快取"""
+        if self._cache is not None:
+            self._cache.clear()
+    
+    @timed("emotion_analyzer.load_model")
+    def load_model(self, model_path: str) -> Dict[str, any]:
+        """
+        載入編譯後的模型檔並原子替換目前的模型
+        
+        進行中的分析會繼續使用舊模型完成；之後的呼叫使用新模型。
+        
+        Raises:
+            ValueError: 模型檔格式或校驗碼不正確
+        """
+        from emotion_model import DEFINITION_FIELDS, load_artifact
+
+        stat = os.stat(model_path)
+        model = load_artifact(model_path)
+        definition = model.to_definition()
+        
+        with self._model_lock:
+            for field in DEFINITION_FIELDS:
+                setattr(self, field, definition[field])
+            self._model = model
+            self._model_version = self._lexicon_version
+            self._model_source = (model_path, stat.st_mtime_ns, stat.st_size)
+        
+        return {
+            "status": "success",
+            "message": f"已載入情緒模型 | Emotion model loaded: {model_path}",
+            "emotions": len(model.lexicon),
+            "keywords": len(model.matcher.patterns)
+        }
+    
+    def reload_if_changed(self) -> Dict[str, any]:
+        """若已載入的模型檔有更新則熱替換；載入失敗時保留目前的模型"""
+        source = self._model_source
+        if source is None:
+            return {"status": "skipped", "message": "未使用模型檔 | No model file in use"}
+        
+        model_path = source[0]
+        try:
+            stat = os.stat(model_path)
+            if (stat.st_mtime_ns, stat.st_size) == source[1:]:
+                return {"status": "unchanged", "message": f"模型未變更 | Model unchanged: {model_path}"}
+            return self.load_model(model_path)
+        except (OSError, ValueError) as e:
+            return {
+                "status": "error",
+                "message": f"重新載入模型失敗，沿用目前模型 | Model reload failed, keeping current model: {str(e)}"
+            }
+    
+    def export_lexicon(self) -> Dict[str, any]:
+        """匯出目前的詞典定義（可寫成 JSON 交給 emotion_model.py 編譯）"""
+        return self._get_model().to_definition()
+    
+    def mark_lexicon_changed(self) -> None:
+        """強制下一次分析時重建模型（詞典屬性的修改會自動呼叫，通常不必手動呼叫）"""
+        self._lexicon_changed()
+
+    def _lexicon_changed(self) -> None:
+        self._lexicon_version += 1
+    
+    def _get_model(self) -> "EmotionModel":
+        """取得目前的模型；詞典版本改變時重建（只比較版本號，不逐項比對詞典）"""
+        model = self._model
+        if model is not None and self._model_version == self._lexicon_version:
+            return model
+        
+        with self._model_lock:
+            version = self._lexicon_version
+            model = self._model
+            if model is None or self._model_version != version:
+                from emotion_model import EmotionModel
+
+                model = EmotionModel.from_analyzer(self)
+                self._model = model
+                self._model_version = version
+            return model
+    
+    def _analyze_text(self, user_input: str, model: "EmotionModel") -> Dict[str, any]:
+        """實際執行關鍵詞比對與情緒判斷"""
+        
         # 將輸入轉為小寫便於比對
         text_lower = user_input.lower()
         
-        # 計算每種情緒的分數
+        # 單次掃描找出所有命中的關鍵詞，再依情緒計分
+        emotion_scores, matched_keywords = self._score_matches(model.matcher.find(text_lower), model)
+        
+        return self._resolve_emotion(emotion_scores, matched_keywords, model)
+    
+    @timed("emotion_analyzer.analyze_batch")
+    def analyze_batch(self, texts: List[str]) -> Dict[str, any]:
+        """
+        批次分析多筆輸入的情緒（需要 NumPy）
+        
+        先建立「輸入 × 關鍵詞」的稀疏命中矩陣，再乘上由 emotion_keywords 與
+        emotion_weights 建立的「關鍵詞 → 情緒」權重矩陣，一次算出所有分數。
+        主要情緒、信心度與分數和逐筆呼叫 analyze_emotion 的結果完全一致。
+        
+        Args:
+            texts (List[str]): 多筆用戶輸入
+            
+        Returns:
+            Dict: 欄位式結果 - emotions（情緒名稱）、primary_emotion、confidence
+                  以及 emotion_scores（每種情緒一個分數陣列）
+        """
+        import numpy as np
+        
+        model = self._get_model()
+        matcher = model.matcher
+        emotions = [emotion for emotion, _ in model.lexicon]
+        column = {emotion: i for i, emotion in enumerate(emotions)}
+        
+        # 關鍵詞 -> 情緒的次數矩陣，只在模型變動時重建
+        tables = getattr(self, "_batch_tables", None)
+        if tables is None or tables[0] is not model:
+            keyword_emotions = np.zeros((len(model.keyword_index), len(emotions)), dtype=np.int64)
+            for pattern_id, entries in enumerate(model.keyword_index):
+                for emotion, _ in entries:
+                    keyword_emotions[pattern_id, column[emotion]] += 1
+            self._batch_tables = tables = (model, keyword_emotions)
+        keyword_emotions = tables[1]
+        
+        weights = np.array([model.weight(emotion) for emotion in emotions], dtype=np.float64)
+        
+        # 稀疏命中矩陣（COO 格式：第幾筆輸入、命中的關鍵詞編號）
+        rows = []
+        cols = []
+        blank = np.zeros(len(texts), dtype=bool)
+        for row, text in enumerate(texts):
+            if not text.strip():
+                blank[row] = True
+                continue
+            found = matcher.find(text.lower())
+            rows.extend([row] * len(found))
+            cols.extend(found)
+        
+        counts = np.zeros((len(texts), len(emotions)), dtype=np.int64)
+        if rows:
+            np.add.at(counts, np.array(rows, dtype=np.intp), keyword_emotions[np.array(cols, dtype=np.intp)])
+        
+        # 與逐筆計算相同：命中數 × 權重，非正分數視為未命中
+        scores = counts * weights
+        scores[scores <= 0] = 0.0
+        
+        def score_of(emotion):
+            if emotion in column:
+                return scores[:, column[emotion]]
+            return np.zeros(len(texts))
+        
+        has_hits = (scores > 0).any(axis=1) if emotions else np.zeros(len(texts), dtype=bool)
+        best = scores.argmax(axis=1) if emotions else np.zeros(len(texts), dtype=np.intp)
+        max_score = scores.max(axis=1) if emotions else np.zeros(len(texts))
+        primary = np.array(emotions, dtype=object)[best] if emotions else np.full(len(texts), "battle", dtype=object)
+        
+        # 1-3. 優先規則：只套用第一條兩者皆出現的規則
+        undecided = has_hits.copy()
+        for preferred, replaced, ratio in model.priority_rules:
+            both = undecided & (score_of(preferred) > 0) & (score_of(replaced) > 0)
+            primary[both & (score_of(preferred) >= score_of(replaced) * ratio)] = preferred
+            undecided &= ~both
+        
+        # 4. 逃跑相關情緒的優先處理
+        escape_columns = [score_of(emo) for emo in model.escape_emotions]
+        if escape_columns:
+            escape_total = 0
+            for escape_score in escape_columns:
+                escape_total = escape_total + escape_score
+            escape_wins = has_hits.copy()
+            for rival in model.escape_rivals:
+                escape_wins &= escape_total > score_of(rival)
+            escape_best = np.array(model.escape_emotions, dtype=object)[np.stack(escape_columns, axis=1).argmax(axis=1)]
+            primary[escape_wins] = escape_best[escape_wins]
+        
+        confidence = np.minimum(max_score / 3.0, 1.0)
+        
+        # 沒有匹配到關鍵詞：預設為戰鬥情緒、低信心度；空白輸入：intro
+        no_hits = ~has_hits & ~blank
+        primary[no_hits] = "battle"
+        confidence[no_hits] = 0.2
+        primary[blank] = "intro"
+        confidence[blank] = 0.0
+        
+        emotion_scores = {emotion: scores[:, i] for i, emotion in enumerate(emotions)}
+        if "battle" not in emotion_scores:
+            emotion_scores["battle"] = np.zeros(len(texts))
+            emotions.append("battle")
+        emotion_scores["battle"][no_hits] = 0.2
+        
+        return {
+            "emotions": emotions,
+            "primary_emotion": primary,
+            "confidence": confidence,
+            "emotion_scores": emotion_scores
+        }
+    
+    def _score_matches(self, found: Iterable[int], model: "EmotionModel") -> Tuple[Dict[str, float], Dict[str, List[str]]]:
+        """根據命中的關鍵詞編號計算每種情緒的加權分數"""
+        
+        keyword_index = model.keyword_index
+        hits = {}
+        for pattern_id in found:
+            for emotion, position in keyword_index[pattern_id]:
+                hits.setdefault(emotion, []).append(position)
+        
+        # 依情緒字典順序輸出，確保同分時的選擇與逐一比對時一致
         emotion_scores = {}
         matched_keywords = {}
         
-        for emotion, keywords in self.emotion_keywords.items():
-            score = 0
-            matches = []
-            
-            for keyword in keywords:
-                # 使用正則表達式尋找關鍵詞
-                if re.search(keyword, text_lower):
-                    score += 1
-                    matches.append(keyword)
+        for emotion, keywords in model.lexicon:
+            positions = hits.get(emotion)
+            if not positions:
+                continue
+            positions.sort()
             
             # 套用權重
-            weighted_score = score * self.emotion_weights.get(emotion, 1.0)
+            weighted_score = len(positions) * model.weight(emotion)
             
             if weighted_score > 0:
                 emotion_scores[emotion] = weighted_score
-                matched_keywords[emotion] = matches
+                matched_keywords[emotion] = [keywords[position] for position in positions]
+        
+        return emotion_scores, matched_keywords
+    
+    def _resolve_emotion(self, emotion_scores: Dict[str, float], matched_keywords: Dict[str, List[str]], model: "EmotionModel") -> Dict[str, any]:
+        """套用優先規則決定主要情緒並組成分析結果"""
         
         # 找出得分最高的情緒
         if emotion_scores:
@@ -182,33 +620,24 @@ class EmotionAnalyzer:
             max_score = emotion_scores[primary_emotion]
             
             # 特殊處理邏輯：
-            # 1. 英勇犧牲優先於普通犧牲
-            if "heroic_death" in emotion_scores and "sacrifice" in emotion_scores:
-                if emotion_scores["heroic_death"] >= emotion_scores["sacrifice"] * 0.8:
-                    primary_emotion = "heroic_death"
-            
-            # 2. 緊張戰鬥優先於普通戰鬥
-            elif "tense_battle" in emotion_scores and "battle" in emotion_scores:
-                if emotion_scores["tense_battle"] >= emotion_scores["battle"] * 0.8:
-                    primary_emotion = "tense_battle"
-            
-            # 3. 衝鋒優先於前進
-            elif "charge" in emotion_scores and "advance" in emotion_scores:
-                if emotion_scores["charge"] >= emotion_scores["advance"] * 0.8:
-                    primary_emotion = "charge"
+            # 1-3. 特定情緒優先於相近的普通情緒
+            for preferred, replaced, ratio in model.priority_rules:
+                if preferred in emotion_scores and replaced in emotion_scores:
+                    if emotion_scores[preferred] >= emotion_scores[replaced] * ratio:
+                        primary_emotion = preferred
+                    break
             
             # 4. 逃跑相關情緒的優先處理
-            escape_emotions = ["sad", "retreat", "wait_hide"]
+            escape_emotions = model.escape_emotions
             escape_total = sum(emotion_scores.get(emo, 0) for emo in escape_emotions)
             
-            if escape_total > emotion_scores.get("battle", 0) and escape_total > emotion_scores.get("heroic", 0):
+            if all(escape_total > emotion_scores.get(rival, 0) for rival in model.escape_rivals):
                 # 在逃跑相關情緒中選擇最高分的
                 escape_scores = {emo: emotion_scores.get(emo, 0) for emo in escape_emotions if emotion_scores.get(emo, 0) > 0}
                 if escape_scores:
                     primary_emotion = max(escape_scores, key=escape_scores.get)
             
             # 計算信心度 (0-1之間)
-            total_keywords = sum(len(keywords) for keywords in matched_keywords.values())
             confidence = min(max_score / 3.0, 1.0)  # 最多3個關鍵詞就達到100%信心
             
         else:
@@ -223,39 +652,23 @@ class EmotionAnalyzer:
             "confidence": confidence,
             "emotion_scores": emotion_scores,
             "matched_keywords": matched_keywords,
-            "analysis": self._generate_analysis(primary_emotion, confidence, matched_keywords)
+            "analysis": self._generate_analysis(primary_emotion, confidence, matched_keywords, model)
         }
     
-    def _generate_analysis(self, emotion: str, confidence: float, matches: Dict) -> str:
-        """生成情緒分析說明"""
-        
-        analysis_templates = {
-            "battle": "檢測到戰鬥意圖，充滿戰鬥精神！ | Detected battle intent, full of fighting spirit!",
-            "tense_battle": "檢測到激烈戰鬥情緒，情況緊張！ | Detected intense battle emotion, situation is tense!",
-            "heroic": "檢測到英勇犧牲精神，令人敬佩的決心！ | Detected heroic sacrifice spirit, admirable determination!",
-            "advance": "檢測到前進意志，勇往直前！ | Detected advancing will, moving forward bravely!",
-            "charge": "檢測到衝鋒號令，全力攻擊！ | Detected charge command, full assault!",
-            "sad": "檢測到悲傷情緒，內心充滿掙扎。 | Detected sadness, heart full of struggle.",
-            "wait_hide": "檢測到等待隱藏策略，謹慎觀察中。 | Detected wait-and-hide strategy, observing cautiously.",
-            "retreat": "檢測到撤退意圖，選擇戰略性後退。 | Detected retreat intention, choosing strategic withdrawal.",
-            "sacrifice": "檢測到犧牲精神，準備為他人獻身。 | Detected sacrifice spirit, ready to give life for others.",
-            "victory": "檢測到勝利的喜悅！ | Detected joy of victory!",
-            "defeat": "檢測到失敗的沮喪情緒。 | Detected frustration of defeat.",
-            "smile": "檢測到快樂正面情緒，心情愉悅！ | Detected happy positive emotion, joyful mood!",
-            "heroic_death": "檢測到英勇就義精神，壯烈犧牲！ | Detected heroic martyrdom spirit, glorious sacrifice!",
-            "peaceful": "檢測到平和寧靜情緒，內心安詳。 | Detected peaceful calm emotion, serene heart."
-        }
+    def _generate_analysis(self, emotion: str, confidence: float, matches: Dict, model: Optional["EmotionModel"] = None,
+                           language: str = "both") -> str:
+        """生成情緒分析說明（language: zh / en / both）"""
         
-        base_analysis = analysis_templates.get(emotion, f"檢測到{emotion}情緒 | Detected {emotion} emotion")
+        base_analysis = (model or self._get_model()).template(emotion, language)
         
         confidence_desc = ""
         if confidence >= 0.8:
-            confidence_desc = "非常確定 | Very certain"
+            confidence_desc = CONFIDENCE_LEVELS["very_certain"][language]
         elif confidence >= 0.6:
-            confidence_desc = "相當確定 | Quite certain"
+            confidence_desc = CONFIDENCE_LEVELS["quite_certain"][language]
         elif confidence >= 0.4:
-            confidence_desc = "中等確定度 | Medium certainty"
+            confidence_desc = CONFIDENCE_LEVELS["medium"][language]
         else:
-            confidence_desc = "低確定度 | Low certainty"
+            confidence_desc = CONFIDENCE_LEVELS["low"][language]
         
-        return f"{base_analysis} (信心度 | Confidence: {confidence_desc} {confidence:.1%})"
\ No newline at end of file
+        return f"{base_analysis} ({CONFIDENCE_LABELS[language]} {confidence_desc} {confidence:.1%})"
\ No newline at end of file
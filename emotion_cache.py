@@ -0,0 +1,142 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+def normalize_text(text: str) -> str:
+    """
+    快取鍵：只轉小寫
+
+    分析本身只看小寫後的文字；空白與換行會影響關鍵詞是否相連（例如 "give up" 與 "give  up"），
+    所以不能合併，否則同一個鍵會對應到不同的結果。
+    """
+    return text.lower()
+
+
+def freeze_result(result: Dict[str, any]) -> Tuple:
+    """把分析結果轉成不可變的 tuple 結構，避免呼叫端修改到快取內容"""
+    return (
+        result["primary_emotion"],
+        result["confidence"],
+        tuple(result["emotion_scores"].items()),
+        tuple((emotion, tuple(keywords)) for emotion, keywords in result["matched_keywords"].items()),
+        result["analysis"]
+    )
+
+
+def thaw_result(frozen: Tuple) -> Dict[str, any]:
+    """由快取內容重建一份新的分析結果 dict"""
+    primary_emotion, confidence, scores, matches, analysis = frozen
+    return {
+        "primary_emotion": primary_emotion,
+        "confidence": confidence,
+        "emotion_scores": dict(scores),
+        "matched_keywords": {emotion: list(keywords) for emotion, keywords in matches},
+        "analysis": analysis
+    }
+
+
+def _estimate_size(key: str, frozen: Tuple) -> int:
+    """粗估一筆快取佔用的位元組數"""
+    primary_emotion, confidence, scores, matches, analysis = frozen
+    size = sys.getsizeof(key) + sys.getsizeof(frozen) + sys.getsizeof(analysis)
+    size += sys.getsizeof(scores) + sum(sys.getsizeof(item) + sys.getsizeof(item[1]) for item in scores)
+    size += sys.getsizeof(matches) + sum(sys.getsizeof(item) + sys.getsizeof(item[1]) for item in matches)
+    return size
+
+
+class EmotionCache:
+    def __init__(self, max_entries: int = 1024, max_bytes: Optional[int] = None):
+        """
+        情緒分析結果的 LRU 快取
+
+        Args:
+            max_entries (int): 最多保留的筆數
+            max_bytes (int): 可選的記憶體上限（粗估位元組數）
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[Tuple, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Hashable = None
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str, version: Hashable) -> Optional[Dict[str, any]]:
+        """
+        查詢快取
+
+        Args:
+            key (str): 正規化後的輸入
+            version: 目前的詞典版本；與快取建立時不同則整個快取失效
+
+        Returns:
+            Dict: 命中時回傳新的結果 dict，否則為 None
+        """
+        with self._lock:
+            if version != self._version:
+                self._reset(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            frozen = entry[0]
+        return thaw_result(frozen)
+
+    def put(self, key: str, version: Hashable, result: Dict[str, any]) -> None:
+        """寫入快取，超過筆數或記憶體上限時淘汰最久未使用的項目"""
+        if self.max_entries <= 0:
+            return
+        frozen = freeze_result(result)
+        size = _estimate_size(key, frozen)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        with self._lock:
+            if version != self._version:
+                self._reset(version)
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (frozen, size)
+            self._bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or
+                                     (self.max_bytes is not None and self._bytes > self.max_bytes)):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """清空快取（統計數字保留）"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _reset(self, version: Hashable) -> None:
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._bytes = 0
+        self._version = version
+
+    def info(self) -> Dict[str, any]:
+        """回傳快取統計：命中、未命中、淘汰次數與目前大小"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes
+            }
@@ -0,0 +1,203 @@
+"""
+情緒模型：把詞典、權重、優先規則與分析模板編譯成不可變的模型，
+並可序列化成二進位檔，讓內容團隊不必修改 Python 程式就能更新詞典。
+
+用法 | Usage:
+    python emotion_model.py export lexicon.json           # 匯出內建詞典
+    python emotion_model.py compile lexicon.json model.bin  # 編譯成模型檔
+"""
+import hashlib
+import json
+import os
+import struct
+import sys
+from typing import Dict
+
+from keyword_matcher import KeywordMatcher
+from localization import split_table
+
+# 模型檔格式：魔術字串 + 標頭（格式版本、內容長度、SHA-256）+ UTF-8 JSON 內容
+#   {"definition": 詞典定義, "matcher": [patterns, goto, fail, output], "keyword_index": [[[情緒, 位置], ...], ...]}
+# JSON 與 Python 版本無關，載入時也不會執行檔案裡的任何程式碼（內容團隊提供的檔案可以直接載入）
+ARTIFACT_MAGIC = b"AGMEMO\x00\x01"
+ARTIFACT_VERSION = 2
+_HEADER = struct.Struct("<8sIQ32s")
+
+# 詞典定義中的欄位名稱，與 EmotionAnalyzer 的公開屬性同名
+DEFINITION_FIELDS = (
+    "emotion_keywords", "emotion_weights", "priority_rules",
+    "escape_emotions", "escape_rivals", "analysis_templates"
+)
+
+
+class EmotionModel:
+    __slots__ = (
+        "lexicon", "weights", "priority_rules", "escape_emotions", "escape_rivals",
+        "analysis_templates", "matcher", "keyword_index", "_weight_lookup", "_template_lookup"
+    )
+    # _template_lookup: 語言 -> 情緒 -> 分析說明模板，建立模型時預先拆好
+
+    def __init__(self, definition: Dict[str, any], matcher: KeywordMatcher = None, keyword_index=None):
+        """
+        由詞典定義建立不可變的情緒模型
+
+        Args:
+            definition (Dict): 包含 DEFINITION_FIELDS 各欄位的詞典定義
+            matcher (KeywordMatcher): 已編譯的自動機（由模型檔載入時提供）
+            keyword_index: 關鍵詞編號 -> (情緒, 位置) 的索引（由模型檔載入時提供）
+        """
+        missing = [field for field in DEFINITION_FIELDS if field not in definition]
+        if missing:
+            raise ValueError(f"詞典定義缺少欄位 | Lexicon definition is missing fields: {', '.join(missing)}")
+
+        set_field = object.__setattr__
+        set_field(self, "lexicon", tuple((emotion, tuple(keywords)) for emotion, keywords in definition["emotion_keywords"].items()))
+        set_field(self, "weights", tuple(definition["emotion_weights"].items()))
+        set_field(self, "priority_rules", tuple(tuple(rule) for rule in definition["priority_rules"]))
+        set_field(self, "escape_emotions", tuple(definition["escape_emotions"]))
+        set_field(self, "escape_rivals", tuple(definition["escape_rivals"]))
+        set_field(self, "analysis_templates", tuple(definition["analysis_templates"].items()))
+        set_field(self, "_weight_lookup", dict(self.weights))
+        set_field(self, "_template_lookup", split_table(dict(self.analysis_templates)))
+
+        if matcher is None:
+            matcher = KeywordMatcher(keyword for _, keywords in self.lexicon for keyword in keywords)
+            pattern_ids = {pattern: pattern_id for pattern_id, pattern in enumerate(matcher.patterns)}
+
+            # 關鍵詞編號 -> 所屬的 (情緒, 在該情緒關鍵詞列表中的位置)
+            entries = [[] for _ in matcher.patterns]
+            for emotion, keywords in self.lexicon:
+                for position, keyword in enumerate(keywords):
+                    if keyword:
+                        entries[pattern_ids[keyword]].append((emotion, position))
+            keyword_index = [tuple(entry) for entry in entries]
+
+        set_field(self, "matcher", matcher)
+        set_field(self, "keyword_index", tuple(tuple(tuple(entry) for entry in entries) for entries in keyword_index))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("EmotionModel 為不可變物件 | EmotionModel is immutable")
+
+    @classmethod
+    def from_analyzer(cls, analyzer) -> "EmotionModel":
+        """由分析器目前的公開屬性建立模型"""
+        return cls({field: getattr(analyzer, field) for field in DEFINITION_FIELDS})
+
+    def weight(self, emotion: str) -> float:
+        """情緒權重，未設定時為 1.0"""
+        return self._weight_lookup.get(emotion, 1.0)
+
+    def template(self, emotion: str, language: str = "both") -> str:
+        """情緒分析說明模板（language: zh / en / both）"""
+        template = self._template_lookup[language].get(emotion)
+        if template is not None:
+            return template
+        if language == "zh":
+            return f"檢測到{emotion}情緒"
+        if language == "en":
+            return f"Detected {emotion} emotion"
+        return f"檢測到{emotion}情緒 | Detected {emotion} emotion"
+
+    def to_definition(self) -> Dict[str, any]:
+        """轉回可寫成 JSON 的詞典定義（每次回傳新的可修改物件）"""
+        return {
+            "emotion_keywords": {emotion: list(keywords) for emotion, keywords in self.lexicon},
+            "emotion_weights": dict(self.weights),
+            "priority_rules": [list(rule) for rule in self.priority_rules],
+            "escape_emotions": list(self.escape_emotions),
+            "escape_rivals": list(self.escape_rivals),
+            "analysis_templates": dict(self.analysis_templates)
+        }
+
+
+def write_artifact(model: EmotionModel, artifact_path: str) -> Dict[str, any]:
+    """
+    把模型寫成二進位模型檔（先寫暫存檔再原子替換，讀取端不會看到寫到一半的檔案）
+
+    Returns:
+        Dict: 寫入狀態、檔案大小與 SHA-256
+    """
+    payload = json.dumps({
+        "definition": model.to_definition(),
+        "matcher": model.matcher.to_tables(),
+        "keyword_index": model.keyword_index
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.sha256(payload).digest()
+
+    temp_path = f"{artifact_path}.tmp{os.getpid()}"
+    with open(temp_path, "wb") as artifact:
+        artifact.write(_HEADER.pack(ARTIFACT_MAGIC, ARTIFACT_VERSION, len(payload), digest))
+        artifact.write(payload)
+        artifact.flush()
+        os.fsync(artifact.fileno())
+    os.replace(temp_path, artifact_path)
+
+    return {
+        "status": "success",
+        "path": artifact_path,
+        "bytes": _HEADER.size + len(payload),
+        "sha256": digest.hex()
+    }
+
+
+def load_artifact(artifact_path: str) -> EmotionModel:
+    """
+    讀取模型檔並驗證格式與校驗碼（一般的檔案讀取；自動機表格直接還原，不重新建構）
+
+    Raises:
+        ValueError: 檔案格式、版本、校驗碼或內容不正確
+    """
+    with open(artifact_path, "rb") as artifact:
+        header = artifact.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"模型檔過短 | Artifact too short: {artifact_path}")
+        magic, version, length, digest = _HEADER.unpack(header)
+        if magic != ARTIFACT_MAGIC or version != ARTIFACT_VERSION:
+            raise ValueError(f"不支援的模型檔格式 | Unsupported artifact format: {artifact_path}")
+        payload = artifact.read(length)
+
+    if len(payload) != length or hashlib.sha256(payload).digest() != digest:
+        raise ValueError(f"模型檔校驗失敗 | Artifact checksum mismatch: {artifact_path}")
+    try:
+        content = json.loads(payload.decode("utf-8"))
+        matcher = KeywordMatcher.from_tables(*content["matcher"])
+        return EmotionModel(content["definition"], matcher=matcher, keyword_index=content["keyword_index"])
+    except (UnicodeDecodeError, KeyError, TypeError) as e:
+        raise ValueError(f"模型檔內容不正確 | Invalid artifact content: {artifact_path}: {e}") from e
+
+
+def load_lexicon(lexicon_path: str) -> EmotionModel:
+    """讀取 JSON 詞典檔；缺少的欄位沿用內建預設值"""
+    from emotion_analyzer import EmotionAnalyzer
+
+    with open(lexicon_path, "r", encoding="utf-8") as lexicon_file:
+        definition = json.load(lexicon_file)
+
+    defaults = EmotionAnalyzer().export_lexicon()
+    return EmotionModel({field: definition.get(field, defaults[field]) for field in DEFINITION_FIELDS})
+
+
+def compile_lexicon(lexicon_path: str, artifact_path: str) -> Dict[str, any]:
+    """把 JSON 詞典檔編譯成二進位模型檔"""
+    return write_artifact(load_lexicon(lexicon_path), artifact_path)
+
+
+def main(argv=None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    if len(args) == 2 and args[0] == "export":
+        from emotion_analyzer import EmotionAnalyzer
+
+        with open(args[1], "w", encoding="utf-8") as lexicon_file:
+            json.dump(EmotionAnalyzer().export_lexicon(), lexicon_file, ensure_ascii=False, indent=2)
+        print(f"已匯出詞典 | Lexicon exported: {args[1]}")
+        return 0
+    if len(args) == 3 and args[0] == "compile":
+        result = compile_lexicon(args[1], args[2])
+        print(f"已編譯模型 | Model compiled: {result['path']} ({result['bytes']} bytes, sha256 {result['sha256'][:12]})")
+        return 0
+    print(__doc__)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
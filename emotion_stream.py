@@ -0,0 +1,78 @@
+from typing import Dict
+
+from emotion_analyzer import EmotionAnalyzer
+
+
+class EmotionStream:
+    def __init__(self, analyzer: EmotionAnalyzer):
+        """
+        串流式情緒分析：逐段輸入文字，隨時取得目前的主要情緒
+
+        關鍵詞自動機的狀態在段落之間保留，跨段落的關鍵詞也能正確比對；
+        每段輸入只掃描一次，總成本與輸入長度成線性關係。
+
+        Args:
+            analyzer (EmotionAnalyzer): 提供詞典、權重與優先規則的分析器
+        """
+        self.analyzer = analyzer
+        # 保留建立時的模型，分析途中詞典變動或模型熱替換都不會影響這個串流
+        self._model = analyzer._get_model()
+        self._matcher = self._model.matcher
+        self.reset()
+
+    def reset(self) -> None:
+        """清除所有累計狀態，重新開始"""
+        self._state = 0
+        self.keyword_counts: Dict[int, int] = {}
+        self.chars_fed = 0
+        self._has_content = False
+
+    def feed(self, chunk: str) -> int:
+        """
+        輸入一段文字並更新關鍵詞計數
+
+        Args:
+            chunk (str): 新的文字片段
+
+        Returns:
+            int: 到目前為止命中的不同關鍵詞數量
+        """
+        if not chunk:
+            return len(self.keyword_counts)
+        if not self._has_content and chunk.strip():
+            self._has_content = True
+        self._state, _ = self._matcher.count(chunk.lower(), self._state, self.keyword_counts)
+        self.chars_fed += len(chunk)
+        return len(self.keyword_counts)
+
+    def matched_counts(self) -> Dict[str, int]:
+        """每個命中關鍵詞的累計出現次數"""
+        patterns = self._matcher.patterns
+        return {patterns[pattern_id]: count for pattern_id, count in self.keyword_counts.items()}
+
+    def result(self) -> Dict[str, any]:
+        """
+        依目前已輸入的內容產生分析結果
+
+        Returns:
+            Dict: 與 EmotionAnalyzer.analyze_emotion 相同格式的結果
+        """
+        if not self._has_content:
+            return self.analyzer.analyze_emotion("")
+
+        emotion_scores, matched_keywords = self.analyzer._score_matches(self.keyword_counts.keys(), self._model)
+        return self.analyzer._resolve_emotion(emotion_scores, matched_keywords, self._model)
+
+    def current_emotion(self) -> str:
+        """目前的主要情緒"""
+        return self.result()["primary_emotion"]
+
+    def snapshot(self) -> Dict[str, any]:
+        """目前的串流狀態摘要"""
+        result = self.result()
+        return {
+            "primary_emotion": result["primary_emotion"],
+            "confidence": result["confidence"],
+            "chars_fed": self.chars_fed,
+            "keyword_counts": self.matched_counts()
+        }
@@ -0,0 +1,429 @@
+"""
+遊戲狀態持久化：每回合附加寫入記錄檔，定期寫入快照，重新啟動時還原所有會話
+
+記錄檔是 JSON Lines（每行一筆），只保存行動、情緒、story id 與會話語言，
+故事文本在需要時由 GameState 從劇本圖（story_graph）取得。
+已結束的遊戲、閒置超過 ttl_seconds 或超過 max_sessions 的最久未更新會話會寫入 drop 記錄並從記憶體移除，
+記錄檔的記憶體與快照大小都有上限。
+
+檔案 | Files:
+    snapshot.json                 最近一次快照（涵蓋到 seq 為止的所有記錄）
+    journal-<第一筆 seq>.jsonl     快照之後的記錄
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from game_state import GameState
+from session_store import GameSession
+from story_graph import DEFAULT_SCENARIO_ID, get_scenario
+
+SNAPSHOT_FILE = "snapshot.json"
+JOURNAL_PREFIX = "journal-"
+JOURNAL_SUFFIX = ".jsonl"
+
+# 寫入保證 | Durability modes
+#   group: 呼叫端等到所在批次 fsync 完成才返回；同時到達的記錄共用一次 fsync
+#   async: 立即返回，背景每 commit_interval_ms 批次寫入並 fsync
+#   off:   只寫入作業系統緩衝區，不 fsync
+DURABILITY_MODES = ("group", "async", "off")
+
+
+def rebuild_state(record: Dict[str, Any], state_factory=GameState) -> GameState:
+    """
+    依會話記錄重建遊戲狀態
+
+    Args:
+        record (Dict): {"scenario": 劇本 id, "opening": 是否有開場故事, "turns": [[行動, 情緒, story id], ...]}
+        state_factory (Callable): 以劇本圖建立新遊戲狀態的函式
+
+    Raises:
+        KeyError: 記錄使用的劇本已不存在
+    """
+    state = state_factory(get_scenario(record.get("scenario", DEFAULT_SCENARIO_ID)))
+    if record["opening"]:
+        state.add_story_ref(state.scenario.opening.node_id)
+    for action, emotion, story_id in record["turns"]:
+        state.add_user_action(action)
+        state.add_emotion(emotion)
+        state.next_turn()
+        state.add_story_ref(story_id)
+    return state
+
+
+class GameJournal:
+    def __init__(self, directory: str, durability: str = "group", commit_interval_ms: int = 5,
+                 snapshot_every: int = 10000, max_sessions: int = 100000, ttl_seconds: float = 86400.0):
+        """
+        附加寫入的遊戲記錄檔；建立時先從快照與記錄檔還原既有的會話
+
+        Args:
+            directory (str): 存放快照與記錄檔的資料夾
+            durability (str): 寫入保證，見 DURABILITY_MODES
+            commit_interval_ms (int): async 模式的批次寫入間隔（毫秒）
+            snapshot_every (int): 每累積多少筆記錄寫一次快照
+            max_sessions (int): 保留記錄的會話上限，超過時捨棄最久未更新的會話（應不小於會話表的上限）
+            ttl_seconds (float): 超過此秒數沒有新記錄的會話會被捨棄（應不小於會話表的閒置時間）
+        """
+        if durability not in DURABILITY_MODES:
+            raise ValueError(f"未知的寫入保證 | Unknown durability mode: {durability}")
+        self.directory = directory
+        self.durability = durability
+        self.commit_interval_ms = commit_interval_ms
+        self.snapshot_every = snapshot_every
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+
+        self._condition = threading.Condition()
+        self._buffer: List[bytes] = []
+        self._seq = 0               # 最後一筆記錄的序號
+        self._written_seq = 0       # 已寫入檔案的序號
+        self._durable_seq = 0       # 已 fsync 的序號
+        self._snapshot_seq = 0      # 最近一次快照涵蓋的序號
+        self._snapshot_requested = False
+        self._closing = False
+        self._error: Optional[BaseException] = None
+        # 會話記錄的記憶體副本，用來寫快照；依最後一筆記錄的時間排序，最久未更新的在最前面
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+        self.records_written = 0
+        self.batches = 0
+        self.fsyncs = 0
+        self.snapshots = 0
+        self.expired = 0
+        self.recovery: Dict[str, Any] = {}
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+        self._file = open(self._journal_path(self._seq + 1), "ab")
+        # 停機期間過期的會話：drop 記錄由寫入執行緒寫進新的記錄檔
+        self._expire(time.time())
+        self._thread = threading.Thread(target=self._run, name="game-journal", daemon=True)
+        self._thread.start()
+
+    def record_start(self, session_id: str, scenario_id: str = DEFAULT_SCENARIO_ID, language: str = "both") -> None:
+        """記錄開始新遊戲（含開場故事）與會話語言"""
+        self._append({"op": "start", "session": session_id, "scenario": scenario_id, "language": language})
+
+    def record_turn(self, session_id: str, action: str, emotion: str, story_id: Optional[str]) -> None:
+        """記錄一個回合"""
+        self._append({"op": "turn", "session": session_id, "action": action, "emotion": emotion, "story": story_id})
+
+    def record_language(self, session_id: str, language: str) -> None:
+        """
+        記錄會話語言的變更；沒有記錄的會話不寫入
+
+        不等待 fsync：遺失這筆記錄頂多讓重建的會話沿用舊的語言。
+        """
+        with self._condition:
+            if session_id not in self._sessions:
+                return
+        self._append({"op": "language", "session": session_id, "language": language}, wait=False)
+
+    def record_drop(self, session_id: str) -> None:
+        """
+        記錄會話已結束（遊戲結束或明確移除），還原時不再重建（會話表只是淘汰出記憶體時不應呼叫）
+
+        不等待 fsync：遺失這筆記錄頂多多還原一個已結束的會話。
+        """
+        with self._condition:
+            if session_id not in self._sessions:
+                return
+        self._append({"op": "drop", "session": session_id}, wait=False)
+
+    def sessions(self) -> Dict[str, Dict[str, Any]]:
+        """目前所有會話的記錄（副本）"""
+        with self._condition:
+            return self._copy_sessions()
+
+    def rebuild(self, session_id: str, state_factory=GameState) -> Optional[GameState]:
+        """依記錄重建單一會話的遊戲狀態；沒有記錄或劇本已不存在時回傳 None"""
+        with self._condition:
+            record = self._sessions.get(session_id)
+            if record is None:
+                return None
+            record = self._copy_record(record)
+        try:
+            return rebuild_state(record, state_factory)
+        except KeyError:
+            return None
+
+    def load_session(self, session_id: str, state_factory=GameState) -> Optional[GameSession]:
+        """依記錄重建單一會話（遊戲狀態與語言），給 SessionRegistry 當 loader；沒有記錄時回傳 None"""
+        with self._condition:
+            record = self._sessions.get(session_id)
+            if record is None:
+                return None
+            record = self._copy_record(record)
+        try:
+            session = GameSession(session_id, rebuild_state(record, state_factory))
+        except KeyError:
+            return None
+        session.language = record["language"]
+        return session
+
+    def rebuild_states(self, state_factory=GameState) -> Dict[str, GameState]:
+        """依記錄重建所有會話的遊戲狀態；劇本已不存在的會話略過"""
+        states = {}
+        for session_id, record in self.sessions().items():
+            try:
+                states[session_id] = rebuild_state(record, state_factory)
+            except KeyError:
+                continue
+        return states
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待目前為止的記錄都寫入並 fsync（off 模式只等寫入）"""
+        with self._condition:
+            target = self._seq
+            self._condition.notify_all()
+            return self._wait_for(target, timeout)
+
+    def snapshot(self, timeout: Optional[float] = None) -> bool:
+        """立即寫一次快照並等待完成"""
+        with self._condition:
+            target = self._seq
+            self._snapshot_requested = True
+            self._condition.notify_all()
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self._snapshot_seq < target and self._error is None:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            self._raise_error()
+            return True
+
+    def close(self) -> None:
+        """寫完剩餘的記錄並關閉檔案"""
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._thread.join()
+        self._file.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """記錄檔統計"""
+        with self._condition:
+            return {
+                "durability": self.durability,
+                "sessions": len(self._sessions),
+                "last_seq": self._seq,
+                "durable_seq": self._durable_seq,
+                "snapshot_seq": self._snapshot_seq,
+                "records_written": self.records_written,
+                "batches": self.batches,
+                "fsyncs": self.fsyncs,
+                "records_per_fsync": round(self.records_written / self.fsyncs, 2) if self.fsyncs else 0.0,
+                "snapshots": self.snapshots,
+                "expired": self.expired,
+                "recovery": dict(self.recovery)
+            }
+
+    def _append(self, record: Dict[str, Any], wait: bool = True) -> None:
+        with self._condition:
+            self._raise_error()
+            if self._closing:
+                raise RuntimeError("記錄檔已關閉 | Journal is closed")
+            record["t"] = round(time.time(), 3)
+            self._log(record)
+            self._expire(record["t"])
+            self._condition.notify_all()
+            if wait and self.durability == "group":
+                self._wait_for(record["seq"], None)
+
+    def _log(self, record: Dict[str, Any]) -> None:
+        # 呼叫端需持有 self._condition（或在寫入執行緒啟動前呼叫）
+        self._seq += 1
+        record["seq"] = self._seq
+        self._apply(record)
+        self._buffer.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n")
+
+    def _expire(self, now: float) -> None:
+        """捨棄閒置過久或超過上限的會話；寫入 drop 記錄，重播時得到相同的結果"""
+        while self._sessions:
+            session_id, record = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - (record.get("touched") or now) < self.ttl_seconds:
+                break
+            self._log({"op": "drop", "session": session_id, "t": now})
+            self.expired += 1
+
+    def _wait_for(self, seq: int, timeout: Optional[float]) -> bool:
+        # 呼叫端需持有 self._condition
+        deadline = None if timeout is None else time.monotonic() + timeout
+        done = (lambda: self._written_seq >= seq) if self.durability == "off" else (lambda: self._durable_seq >= seq)
+        while not done() and self._error is None:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._condition.wait(remaining)
+        self._raise_error()
+        return True
+
+    def _raise_error(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"記錄檔寫入失敗 | Journal write failed: {self._error}")
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        op = record["op"]
+        session_id = record["session"]
+        if op == "drop":
+            self._sessions.pop(session_id, None)
+            return
+        if op == "start":
+            self._sessions[session_id] = {"scenario": record.get("scenario", DEFAULT_SCENARIO_ID), "opening": True,
+                                          "turns": [], "language": record.get("language", "both")}
+        elif op == "turn":
+            session = self._sessions.setdefault(session_id, {"scenario": DEFAULT_SCENARIO_ID, "opening": False,
+                                                             "turns": [], "language": "both"})
+            session["turns"].append([record["action"], record["emotion"], record["story"]])
+        elif op == "language":
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session["language"] = record["language"]
+        # 舊版記錄沒有時間：視為現在
+        self._sessions[session_id]["touched"] = record.get("t") or time.time()
+        self._sessions.move_to_end(session_id)
+
+    def _copy_sessions(self) -> Dict[str, Dict[str, Any]]:
+        # 呼叫端需持有 self._condition
+        return {session_id: self._copy_record(record) for session_id, record in self._sessions.items()}
+
+    @staticmethod
+    def _copy_record(record: Dict[str, Any]) -> Dict[str, Any]:
+        return {"scenario": record.get("scenario", DEFAULT_SCENARIO_ID), "opening": record["opening"],
+                "turns": [list(turn) for turn in record["turns"]], "language": record.get("language", "both"),
+                "touched": record.get("touched")}
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._buffer and not self._closing and not self._snapshot_requested:
+                    self._condition.wait()
+                if self.durability == "async" and not self._closing and not self._snapshot_requested:
+                    # 等一小段時間讓更多記錄併入同一批次
+                    self._condition.wait(self.commit_interval_ms / 1000)
+                batch, self._buffer = self._buffer, []
+                seq = self._seq
+                take_snapshot = self._snapshot_requested or seq - self._snapshot_seq >= self.snapshot_every
+                if take_snapshot:
+                    # 快照與批次取自同一時間點：快照涵蓋到 seq，之後的記錄寫入新的記錄檔
+                    self._snapshot_requested = False
+                    sessions = self._copy_sessions()
+                closing = self._closing and not self._buffer
+
+            try:
+                if batch:
+                    self._write_batch(batch, seq)
+                if take_snapshot:
+                    self._write_snapshot(seq, sessions)
+            except Exception as e:
+                with self._condition:
+                    self._error = e
+                    self._condition.notify_all()
+                return
+
+            if closing:
+                return
+
+    def _write_batch(self, batch: List[bytes], seq: int) -> None:
+        self._file.write(b"".join(batch))
+        self._file.flush()
+        if self.durability != "off":
+            os.fsync(self._file.fileno())
+        with self._condition:
+            self._written_seq = seq
+            if self.durability != "off":
+                self._durable_seq = seq
+                self.fsyncs += 1
+            self.records_written += len(batch)
+            self.batches += 1
+            self._condition.notify_all()
+
+    def _write_snapshot(self, seq: int, sessions: Dict[str, Dict[str, Any]]) -> None:
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"seq": seq, "sessions": sessions}, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self._fsync_directory()
+
+        # 之後的記錄寫入新的記錄檔，快照已涵蓋的舊記錄檔可以刪除
+        self._file.close()
+        self._file = open(self._journal_path(seq + 1), "ab")
+        for name, first_seq in self._journal_files():
+            if first_seq <= seq:
+                os.remove(os.path.join(self.directory, name))
+
+        with self._condition:
+            self._snapshot_seq = seq
+            self.snapshots += 1
+            self._condition.notify_all()
+
+    def _recover(self) -> None:
+        """載入最近的快照，再重播快照之後的記錄"""
+        start = time.perf_counter()
+        snapshot_sessions = 0
+        replayed = 0
+
+        path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+            self._sessions = OrderedDict(snapshot["sessions"])
+            self._seq = self._snapshot_seq = snapshot["seq"]
+            snapshot_sessions = len(self._sessions)
+
+        for name, _ in self._journal_files():
+            journal_path = os.path.join(self.directory, name)
+            valid_bytes = 0
+            with open(journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete record")
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    valid_bytes += len(line)
+                    if record["seq"] <= self._seq:
+                        continue
+                    self._apply(record)
+                    self._seq = record["seq"]
+                    replayed += 1
+            if valid_bytes < os.path.getsize(journal_path):
+                # 寫到一半中斷的最後一行：截掉，之後的記錄才不會接在殘缺的行後面
+                os.truncate(journal_path, valid_bytes)
+
+        self._written_seq = self._durable_seq = self._seq
+        self.recovery = {
+            "snapshot_sessions": snapshot_sessions,
+            "replayed_records": replayed,
+            "sessions": len(self._sessions),
+            "seconds": round(time.perf_counter() - start, 4)
+        }
+
+    def _journal_files(self) -> List[tuple]:
+        files = []
+        for name in os.listdir(self.directory):
+            if name.startswith(JOURNAL_PREFIX) and name.endswith(JOURNAL_SUFFIX):
+                files.append((name, int(name[len(JOURNAL_PREFIX):-len(JOURNAL_SUFFIX)])))
+        return sorted(files, key=lambda item: item[1])
+
+    def _journal_path(self, first_seq: int) -> str:
+        return os.path.join(self.directory, f"{JOURNAL_PREFIX}{first_seq:012d}{JOURNAL_SUFFIX}")
+
+    def _fsync_directory(self) -> None:
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(self.directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,376 @@
+"""
+多程序遊戲伺服器：預先載入後 fork 多個 worker，以一致性雜湊把會話分配到固定的 worker
+
+父程序先載入情緒分析器、劇本與音樂清單（以及 agent 模組本身），執行 gc.freeze() 後才 fork，
+worker 以 copy-on-write 共用這些唯讀資料；每個會話依 session id 固定交給同一個 worker，
+遊戲狀態只存在該 worker，不需要跨程序同步。
+
+設定 ADVENTURE_STATE_DIR 時，每個 worker 使用自己的記錄檔子資料夾（worker-<編號>），
+worker 數不變時重新啟動後會話仍分配到同一個 worker 並從記錄檔還原。
+設定 ADVENTURE_RECORD_FILE 時，每個 worker 錄製到自己的檔案（例如 sessions.worker-0.jsonl），
+同一個會話的呼叫都在同一個檔案裡，可分別重播。
+worker 一律使用無音效後端（ADVENTURE_AUDIO_BACKEND=null），不會開啟音效裝置；
+這些環境變數只在 fork 期間改寫，啟動伺服器的程序的環境變數不變。
+
+用法 | Usage:
+    python game_server.py [--workers 4] [--host 127.0.0.1] [--port 8765]
+
+    POST /tools/<工具名稱>  {"session_id": "...", "args": {...}}  -> 工具回傳的 JSON
+    GET  /stats                                                 -> 各 worker 的分配與呼叫統計
+"""
+import argparse
+import bisect
+import gc
+import hashlib
+import inspect
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+# worker 可執行的工具（agent 模組裡的同步版本）
+SERVER_TOOLS = ("start_game", "process_user_action", "get_game_status", "get_story_context", "get_turn_details",
+                "set_language", "stop_music", "get_music_ticket", "get_music_info", "get_emotion_analysis_info",
+                "get_diagnostics", "export_trace")
+DEFAULT_REPLICAS = 128
+DEFAULT_TIMEOUT = 30.0
+# 父程序預先載入與 fork 期間暫時改寫的環境變數：記錄檔與錄製檔由各 worker 自行開啟，音訊一律用 null 後端
+WORKER_ENVIRONMENT = {"ADVENTURE_STATE_DIR": None, "ADVENTURE_RECORD_FILE": None, "ADVENTURE_AUDIO_BACKEND": "null"}
+
+
+def _hash64(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    def __init__(self, nodes: List[int], replicas: int = DEFAULT_REPLICAS):
+        """
+        一致性雜湊環：每個節點放 replicas 個虛擬節點，增減節點時只有約 1/N 的鍵改變歸屬
+
+        Args:
+            nodes (List): 節點（worker 編號）
+            replicas (int): 每個節點的虛擬節點數
+        """
+        points = sorted((_hash64(f"{node}#{replica}"), node) for node in nodes for replica in range(replicas))
+        self._keys = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: str) -> int:
+        index = bisect.bisect(self._keys, _hash64(key))
+        return self._nodes[index % len(self._nodes)]
+
+
+def preload():
+    """在父程序載入所有唯讀資料並建立 agent 模組裡延遲建立的單例，回傳 agent 模組"""
+    from adventure_game_master import agent
+    from lazy import resolve
+    from story_graph import list_scenarios
+
+    for name in ("sessions", "music_player", "emotion_analyzer", "music_prefetcher", "music_queue"):
+        resolve(getattr(agent, name))
+    list_scenarios()
+    agent.emotion_analyzer.analyze_emotion("warm up")
+    agent.music_player.list_available_music_files()
+    return agent
+
+
+@contextmanager
+def worker_environment():
+    """暫時套用 WORKER_ENVIRONMENT，結束時還原呼叫端原本的環境變數"""
+    saved = {name: os.environ.get(name) for name in WORKER_ENVIRONMENT}
+
+    def apply(values):
+        for name, value in values.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    apply(WORKER_ENVIRONMENT)
+    try:
+        yield
+    finally:
+        apply(saved)
+
+
+def worker_record_file(record_file: str, index: int) -> str:
+    """worker 的錄製檔路徑：sessions.jsonl -> sessions.worker-<編號>.jsonl"""
+    root, ext = os.path.splitext(record_file)
+    return f"{root}.worker-{index}{ext or '.jsonl'}"
+
+
+def _worker_main(index: int, conn, inherited, state_dir: Optional[str], record_file: Optional[str] = None):
+    """worker 程序：依序執行收到的工具呼叫"""
+    for other in inherited:
+        other.close()
+    # fork 時已套用 WORKER_ENVIRONMENT；worker 不播放聲音，音訊後端在第一次使用時以 null 建立
+    os.environ["ADVENTURE_AUDIO_BACKEND"] = "null"
+    agent = sys.modules["adventure_game_master.agent"]
+    journal = None
+    if state_dir:
+        from game_persistence import GameJournal
+
+        journal = GameJournal(os.path.join(state_dir, f"worker-{index}"))
+        agent.game_journal = journal
+        # 淘汰只移出記憶體，會話下次存取時從這個 worker 的記錄檔重建
+        agent.sessions = agent.open_registry(journal)
+    tools = {name: getattr(agent, name) for name in SERVER_TOOLS}
+    recorder = None
+    if record_file:
+        # fork 之後才開啟：每個 worker 有自己的檔案、序號與起始時間
+        from session_recorder import SessionRecorder
+
+        recorder = SessionRecorder(worker_record_file(record_file, index))
+        tools = {name: recorder.wrap(func, agent.get_session_id, name) for name, func in tools.items()}
+    takes_context = {name: "tool_context" in inspect.signature(func).parameters for name, func in tools.items()}
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        request_id, session_id, tool, arguments = message
+        try:
+            func = tools[tool]
+            if takes_context[tool]:
+                result = func(**arguments, tool_context=SimpleNamespace(session=SimpleNamespace(id=session_id)))
+            else:
+                result = func(**arguments)
+        except Exception as e:
+            result = {"status": "error", "message": f"工具執行失敗 | Tool failed: {type(e).__name__}: {e}"}
+        try:
+            conn.send((request_id, result))
+        except (BrokenPipeError, OSError):
+            break
+
+    if journal is not None:
+        journal.close()
+    if recorder is not None:
+        recorder.close()
+    conn.close()
+
+
+class _WorkerHandle:
+    def __init__(self, index: int, process, conn):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.calls = 0
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._reader = threading.Thread(target=self._read, name=f"game-server-reader-{index}", daemon=True)
+        self._reader.start()
+
+    def submit(self, session_id: str, tool: str, arguments: Dict[str, Any]) -> Future:
+        future = Future()
+        with self._lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            self.calls += 1
+            try:
+                self.conn.send((request_id, session_id, tool, arguments))
+            except (BrokenPipeError, OSError) as e:
+                del self._pending[request_id]
+                future.set_exception(RuntimeError(f"worker {self.index} 已停止 | worker {self.index} is gone: {e}"))
+        return future
+
+    def _read(self):
+        while True:
+            try:
+                request_id, result = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+            if future is not None:
+                future.set_result(result)
+        # worker 結束：還在等待的呼叫全部失敗
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(RuntimeError(f"worker {self.index} 已停止 | worker {self.index} exited"))
+
+
+class GameServer:
+    def __init__(self, workers: Optional[int] = None, replicas: int = DEFAULT_REPLICAS):
+        """
+        分片的多程序遊戲伺服器
+
+        Args:
+            workers (int): worker 程序數，預設為 CPU 數
+            replicas (int): 一致性雜湊環上每個 worker 的虛擬節點數
+        """
+        self.worker_count = workers or os.cpu_count() or 1
+        self.ring = HashRing(list(range(self.worker_count)), replicas)
+        self._workers: List[_WorkerHandle] = []
+
+    def start(self):
+        """
+        預先載入並 fork 所有 worker
+
+        預先載入與 fork 期間暫時改寫 WORKER_ENVIRONMENT 裡的環境變數，fork 完成後還原呼叫端的環境。
+
+        Raises:
+            RuntimeError: agent 已在啟用記錄檔或錄製的狀態下載入（寫入執行緒與檔案無法安全地在 worker 間共用），
+                          或父程序已建立非 null 的音訊後端
+        """
+        state_dir = os.environ.get("ADVENTURE_STATE_DIR") or None
+        record_file = os.environ.get("ADVENTURE_RECORD_FILE") or None
+        loaded = sys.modules.get("adventure_game_master.agent")
+        if loaded is not None and loaded.game_journal is not None:
+            raise RuntimeError("請在載入 agent 前啟動伺服器 | Start the server before importing the agent "
+                               "when ADVENTURE_STATE_DIR is set")
+        if loaded is not None and loaded.session_recorder is not None:
+            # 工具已包上共用的錄製器：fork 後各 worker 會寫入同一個檔案，序號重複、時間交錯
+            raise RuntimeError("請在載入 agent 前啟動伺服器 | Start the server before importing the agent "
+                               "when ADVENTURE_RECORD_FILE is set")
+        if loaded is not None:
+            from lazy import LazySingleton
+
+            player = loaded.music_player
+            backend = None if isinstance(player, LazySingleton) else player.backend_created
+            if backend is not None and backend.name != "null":
+                # 音效裝置已在父程序開啟：worker 會繼承同一個裝置與混音執行緒
+                raise RuntimeError("請在播放音樂前啟動伺服器 | Start the server before the agent plays music "
+                                   f"(audio backend already created: {backend.name})")
+
+        with worker_environment():
+            preload()
+            # 讓預先載入的物件不再被 GC 觸碰，fork 後維持共用的記憶體分頁
+            gc.collect()
+            gc.freeze()
+
+            context = multiprocessing.get_context("fork")
+            pipes = [context.Pipe() for _ in range(self.worker_count)]
+            processes = []
+            for index, (parent_conn, child_conn) in enumerate(pipes):
+                inherited = [conn for pair in pipes for conn in pair if conn is not child_conn]
+                process = context.Process(target=_worker_main,
+                                          args=(index, child_conn, inherited, state_dir, record_file),
+                                          name=f"adventure-worker-{index}", daemon=True)
+                process.start()
+                processes.append(process)
+        # 所有 worker 都 fork 之後才建立讀取執行緒
+        for index, (parent_conn, child_conn) in enumerate(pipes):
+            child_conn.close()
+            self._workers.append(_WorkerHandle(index, processes[index], parent_conn))
+        return self
+
+    def worker_for(self, session_id: str) -> int:
+        return self.ring.node_for(session_id)
+
+    def submit(self, session_id: str, tool: str, **arguments) -> Future:
+        """非同步送出工具呼叫"""
+        if tool not in SERVER_TOOLS:
+            future = Future()
+            future.set_result({"status": "error", "message": f"未知的工具 | Unknown tool: {tool}",
+                               "available_tools": list(SERVER_TOOLS)})
+            return future
+        return self._workers[self.worker_for(session_id)].submit(session_id, tool, arguments)
+
+    def call(self, session_id: str, tool: str, timeout: float = DEFAULT_TIMEOUT, **arguments) -> Dict[str, Any]:
+        """在負責這個會話的 worker 執行工具並等待結果"""
+        return self.submit(session_id, tool, **arguments).result(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": [{"index": worker.index, "pid": worker.process.pid, "alive": worker.process.is_alive(),
+                         "calls": worker.calls} for worker in self._workers]
+        }
+
+    def stop(self, timeout: float = 5.0):
+        for worker in self._workers:
+            try:
+                worker.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for worker in self._workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+        self._workers = []
+        gc.unfreeze()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+        return False
+
+
+def serve(server: GameServer, host: str = "127.0.0.1", port: int = 8765):
+    """以 HTTP + JSON 提供工具呼叫"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, payload: Dict[str, Any]):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._reply(200, server.stats())
+            else:
+                self._reply(404, {"status": "error", "message": f"找不到路徑 | Not found: {self.path}"})
+
+        def do_POST(self):
+            if not self.path.startswith("/tools/"):
+                self._reply(404, {"status": "error", "message": f"找不到路徑 | Not found: {self.path}"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", "0"))) or b"{}")
+                session_id = str(request.get("session_id") or "local")
+                arguments = request.get("args") or {}
+                if not isinstance(arguments, dict):
+                    raise ValueError("args 必須是物件 | args must be an object")
+            except ValueError as e:
+                self._reply(400, {"status": "error", "message": f"請求格式錯誤 | Bad request: {str(e)}"})
+                return
+            try:
+                result = server.call(session_id, self.path[len("/tools/"):], **arguments)
+            except Exception as e:
+                self._reply(503, {"status": "error", "message": f"worker 無法使用 | Worker unavailable: {str(e)}"})
+                return
+            self._reply(200, result)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer((host, port), Handler)
+    print(f"遊戲伺服器已啟動 | Game server listening on http://{host}:{port} ({server.worker_count} workers)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=None, help="worker 程序數（預設為 CPU 數）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with GameServer(args.workers) as server:
+        serve(server, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,241 @@
-class GameState:
+import itertools
+import threading
+from array import array
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from context_builder import DEFAULT_TOKEN_BUDGET, DEFAULT_WINDOW_TURNS, ContextBuilder
+from story_graph import StoryGraph, get_scenario
+
+
+class CodeTable:
     def __init__(self):
+        """
+        所有會話共用的編碼表：把情緒名稱、story id 等重複出現的值對應成小整數
+        """
+        self._lock = threading.Lock()
+        self._values: List[Hashable] = []
+        self._codes: Dict[Hashable, int] = {}
+
+    def encode(self, value: Hashable) -> int:
+        """取得值的編碼，第一次出現時加入編碼表"""
+        code = self._codes.get(value)
+        if code is None:
+            with self._lock:
+                code = self._codes.get(value)
+                if code is None:
+                    code = len(self._values)
+                    self._values.append(value)
+                    self._codes[value] = code
+        return code
+
+    def decode(self, code: int) -> Hashable:
+        return self._values[code]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+# 情緒名稱與 story id 的共用編碼表
+EMOTION_CODES = CodeTable()
+STORY_CODES = CodeTable()
+
+# 版本號 = 遊戲編號 * VERSION_STRIDE + 變更次數；重新開始的遊戲不會與舊遊戲的版本號重複
+VERSION_STRIDE = 1_000_000
+_GAME_NUMBERS = itertools.count(1)
+
+# 變更記錄的每個元素是「值 << KIND_BITS | 變更種類」：
+# 故事的值是 story id 的編碼，情緒的值是情緒名稱的編碼，行動的值是行動文本的 UTF-8 位元組數，回合的值是 0
+CHANGE_STORY = 1
+CHANGE_ACTION = 2
+CHANGE_EMOTION = 3
+CHANGE_TURN = 4
+KIND_BITS = 3
+KIND_MASK = (1 << KIND_BITS) - 1
+
+
+class GameState:
+    # 大量會話同時存在時，每個會話只保存一個 array 與一個 bytearray：
+    # 變更記錄依序存放故事、行動、情緒與回合（故事指向劇本共用的文本表，情緒是共用編碼表裡的小整數），
+    # 它的長度就是版本號，也用來回答「某個版本之後新增了哪些項目」；
+    # 用戶行動的文本以 UTF-8 接在同一個 bytearray 裡。文本與名稱在需要時才組回
+    __slots__ = ("current_turn", "max_turns", "scenario",
+                 "_events", "_action_text", "_custom_stories", "_version_base", "_context")
+
+    def __init__(self, scenario: Optional[StoryGraph] = None):
+        self.scenario = scenario if scenario is not None else get_scenario()  # 所有會話共用的劇本圖
         self.current_turn = 0
-        self.max_turns = 3
-        self.story_history = []
-        self.user_actions = []
-        self.emotion_history = []  # 新增：追蹤情緒歷史
-        self.current_emotion = "intro"
-        
+        self.max_turns = self.scenario.max_turns
+        self._events = array("H")         # 故事、行動、情緒（新增：追蹤情緒歷史）與回合的變更記錄
+        self._action_text = bytearray()   # 用戶行動的 UTF-8 文本（舊到新，依變更記錄裡的位元組數切開）
+        self._custom_stories = None       # 不在劇本裡的故事文本：{變更記錄索引: 文本}
+        self._version_base = next(_GAME_NUMBERS) * VERSION_STRIDE
+        self._context = None              # 第一次取得上下文時才建立的 ContextBuilder（保存增量摘要）
+
+    def _append(self, kind: int, value: int = 0):
+        entry = value << KIND_BITS | kind
+        try:
+            self._events.append(entry)
+        except OverflowError:
+            # 編碼或行動長度超過 16 位元時改用 32 位元的 array
+            self._events = array("I", self._events)
+            self._events.append(entry)
+
     def add_story(self, story: str):
-        """添加故事內容到歷史記錄"""
-        self.story_history.append(story)
-        
+        """添加故事內容到歷史記錄；劇本裡已有的文本只保存 story id"""
+        story_id = self.scenario.text_ids.get(story)
+        if story_id is None and story is not None:
+            if self._custom_stories is None:
+                self._custom_stories = {}
+            self._custom_stories[len(self._events)] = story
+        self.add_story_ref(story_id)
+
+    def add_story_ref(self, story_id: Optional[str]):
+        """以 story id 添加故事到歷史記錄"""
+        self._append(CHANGE_STORY, STORY_CODES.encode(story_id))
+
     def add_user_action(self, action: str):
         """添加用戶行動到記錄"""
-        self.user_actions.append(action)
-        
+        text = action.encode("utf-8")
+        self._append(CHANGE_ACTION, len(text))
+        self._action_text += text
+
     def add_emotion(self, emotion: str):
         """添加情緒到歷史記錄"""
-        self.emotion_history.append(emotion)
-        self.current_emotion = emotion
-        
+        self._append(CHANGE_EMOTION, EMOTION_CODES.encode(emotion))
+
+    @property
+    def version(self) -> int:
+        """狀態版本號，每次變更加一"""
+        return self._version_base + len(self._events)
+
+    def entries_since(self, version: int, language: str = "both") -> Optional[Tuple[List[str], List[str]]]:
+        """
+        取得某個版本之後新增的故事與用戶行動（只解碼這個版本之後的變更）
+
+        Args:
+            version (int): 呼叫端上次看到的版本號
+            language (str): 故事文本的語言：zh / en / both
+
+        Returns:
+            Tuple: (新的故事文本, 新的用戶行動)；版本號不屬於這場遊戲時回傳 None
+        """
+        seen = version - self._version_base
+        if seen < 0 or seen > len(self._events):
+            return None
+        return self._render_stories(language, seen), self._actions(seen)
+
+    def _actions(self, start: int = 0) -> List[str]:
+        """變更記錄 start 之後的用戶行動；從文本尾端往回算起點，不讀取更早的記錄"""
+        lengths = [entry >> KIND_BITS for entry in self._events[start:] if entry & KIND_MASK == CHANGE_ACTION]
+        text = self._action_text
+        offset = len(text) - sum(lengths)
+        actions = []
+        for length in lengths:
+            actions.append(text[offset:offset + length].decode("utf-8"))
+            offset += length
+        return actions
+
+    def _render_stories(self, language: str, start: int = 0) -> List[str]:
+        """以指定語言組回變更記錄 start 之後的故事；不在劇本裡的文本原樣回傳"""
+        custom = self._custom_stories or {}
+        texts = self.scenario.localized_texts[language]
+        events = self._events
+        return [custom[index] if index in custom else texts.get(STORY_CODES.decode(events[index] >> KIND_BITS))
+                for index in range(start, len(events)) if events[index] & KIND_MASK == CHANGE_STORY]
+
+    def _values(self, kind: int) -> List[int]:
+        return [entry >> KIND_BITS for entry in self._events if entry & KIND_MASK == kind]
+
+    def turn_entries(self, start_turn: int = 0) -> List[list]:
+        """
+        取得 start_turn 之後各回合的記錄，從變更記錄尾端往回掃描，只讀取需要的部分
+
+        Returns:
+            List: [[回合, 行動, 情緒, story id], ...]（依回合排序；第 0 回合是開場故事）
+        """
+        entries: Dict[int, list] = {}
+        counter = self.current_turn       # 變更發生時的回合計數；故事屬於該回合，行動與情緒屬於下一回合
+        text_end = len(self._action_text)
+        for entry in reversed(self._events):
+            kind = entry & KIND_MASK
+            if kind == CHANGE_TURN:
+                counter -= 1
+                if counter + 1 < start_turn:
+                    break
+            elif kind == CHANGE_STORY:
+                if counter >= start_turn:
+                    item = entries.setdefault(counter, [counter, None, None, None])
+                    if item[3] is None:
+                        item[3] = STORY_CODES.decode(entry >> KIND_BITS)
+            elif kind == CHANGE_ACTION:
+                text_start = text_end - (entry >> KIND_BITS)
+                action = self._action_text[text_start:text_end].decode("utf-8")
+                entries.setdefault(counter + 1, [counter + 1, None, None, None])[1] = action
+                text_end = text_start
+            elif kind == CHANGE_EMOTION:
+                item = entries.setdefault(counter + 1, [counter + 1, None, None, None])
+                if item[2] is None:
+                    item[2] = EMOTION_CODES.decode(entry >> KIND_BITS)
+        return [entries[turn] for turn in sorted(entries) if turn >= start_turn]
+
+    @property
+    def user_actions(self) -> List[str]:
+        """用戶行動（舊到新），每次呼叫時從 UTF-8 文本組回"""
+        return self._actions()
+
+    @property
+    def story_ids(self) -> List[Optional[str]]:
+        """故事歷史的 story id（自訂文本為 None）"""
+        return [STORY_CODES.decode(code) for code in self._values(CHANGE_STORY)]
+
+    @property
+    def story_history(self) -> List[str]:
+        """故事歷史的完整文本，每次呼叫時從劇本組回"""
+        return self.render_story_history()
+
+    def render_story_history(self, language: str = "both") -> List[str]:
+        """以指定語言（zh / en / both）組回故事歷史；不在劇本裡的文本原樣回傳"""
+        return self._render_stories(language)
+
+    @property
+    def emotion_history(self) -> List[str]:
+        """情緒歷史（舊到新）"""
+        return [EMOTION_CODES.decode(code) for code in self._values(CHANGE_EMOTION)]
+
+    @property
+    def current_emotion(self) -> str:
+        return self.get_previous_emotion()
+
     def get_previous_emotion(self):
         """獲取前一個情緒"""
-        if len(self.emotion_history) > 0:
-            return self.emotion_history[-1]
+        for entry in reversed(self._events):
+            if entry & KIND_MASK == CHANGE_EMOTION:
+                return EMOTION_CODES.decode(entry >> KIND_BITS)
         return "intro"
-        
+
     def next_turn(self):
         """進入下一回合"""
         self.current_turn += 1
-        
+        self._append(CHANGE_TURN)
+
     def is_game_over(self):
         """檢查遊戲是否結束"""
         return self.current_turn >= self.max_turns
-        
-    def get_context(self):
-        """獲取遊戲上下文，用於AI生成故事"""
-        return {
-            "turn": self.current_turn,
-            "story_history": self.story_history,
-            "user_actions": self.user_actions,
-            "emotion_history": self.emotion_history,
-            "current_emotion": self.current_emotion
-        }
\ No newline at end of file
+
+    def get_context(self, language: str = "both", token_budget: Optional[int] = DEFAULT_TOKEN_BUDGET,
+                    window_turns: Optional[int] = None) -> Dict:
+        """
+        獲取遊戲上下文，用於AI生成故事：最近的回合完整保留，較早的回合併入摘要
+
+        Args:
+            language (str): 故事文本的語言：zh / en / both
+            token_budget (int): token 上限；None 或小於等於 0 表示不限制
+            window_turns (int): 保留完整內容的最近回合數（預設 DEFAULT_WINDOW_TURNS）
+
+        Returns:
+            Dict: turn, current_emotion, summary, recent_turns 與 token_report
+        """
+        window_turns = window_turns or DEFAULT_WINDOW_TURNS
+        if self._context is None or self._context.window_turns != window_turns:
+            self._context = ContextBuilder(window_turns)
+        return self._context.build(self, language, token_budget)
@@ -0,0 +1,120 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class KeywordMatcher:
+    def __init__(self, patterns: Iterable[str]):
+        """
+        以 Aho-Corasick 自動機編譯關鍵詞，單次線性掃描即可找出所有命中
+
+        Args:
+            patterns (Iterable[str]): 關鍵詞（以字面比對，不作正則解析）
+        """
+        self.patterns: Tuple[str, ...] = tuple(dict.fromkeys(p for p in patterns if p))
+
+        # goto[state][char] -> 下一個狀態；fail[state] -> 失敗轉移；output[state] -> 在此結束的關鍵詞編號
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[Tuple[int, ...]] = [()]
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                state = next_state
+            self.output[state] = self.output[state] + (pattern_id,)
+
+        # 以廣度優先建立失敗轉移，並把後綴狀態的輸出合併進來
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                if self.output[self.fail[next_state]]:
+                    self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    @classmethod
+    def from_tables(cls, patterns, goto, fail, output) -> "KeywordMatcher":
+        """由 to_tables 匯出的表格直接還原自動機，不需重新建構"""
+        matcher = cls.__new__(cls)
+        matcher.patterns = tuple(patterns)
+        matcher.goto = list(goto)
+        matcher.fail = list(fail)
+        matcher.output = [tuple(ids) for ids in output]
+        if not (len(matcher.goto) == len(matcher.fail) == len(matcher.output)):
+            raise ValueError("自動機表格長度不一致 | Inconsistent matcher tables")
+        return matcher
+
+    def to_tables(self) -> Tuple[Tuple[str, ...], List[Dict[str, int]], List[int], List[Tuple[int, ...]]]:
+        """匯出自動機表格（只含基本型別，可直接序列化）"""
+        return self.patterns, self.goto, self.fail, self.output
+
+    def scan(self, text: str, state: int = 0, found: Optional[Set[int]] = None) -> Tuple[int, Set[int]]:
+        """
+        掃描文字並收集命中的關鍵詞編號
+
+        可傳入上一次回傳的狀態繼續掃描，跨段落的關鍵詞也能正確比對。
+
+        Args:
+            text (str): 要掃描的文字（呼叫端負責大小寫正規化）
+            state (int): 起始狀態
+            found (Set[int]): 累積命中的集合，會就地更新
+
+        Returns:
+            Tuple: (結束狀態, 命中的關鍵詞編號集合)
+        """
+        if found is None:
+            found = set()
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+
+        for char in text:
+            transitions = goto[state]
+            while char not in transitions and state:
+                state = fail[state]
+                transitions = goto[state]
+            state = transitions.get(char, 0)
+            if output[state]:
+                found.update(output[state])
+
+        return state, found
+
+    def count(self, text: str, state: int = 0, counts: Optional[Dict[int, int]] = None) -> Tuple[int, Dict[int, int]]:
+        """
+        與 scan 相同，但累計每個關鍵詞出現的次數
+
+        Returns:
+            Tuple: (結束狀態, 關鍵詞編號 -> 出現次數)
+        """
+        if counts is None:
+            counts = {}
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+
+        for char in text:
+            transitions = goto[state]
+            while char not in transitions and state:
+                state = fail[state]
+                transitions = goto[state]
+            state = transitions.get(char, 0)
+            for pattern_id in output[state]:
+                counts[pattern_id] = counts.get(pattern_id, 0) + 1
+
+        return state, counts
+
+    def find(self, text: str) -> Set[int]:
+        """回傳文字中出現過的關鍵詞編號"""
+        return self.scan(text)[1]
@@ -0,0 +1,59 @@
+"""
+延遲建立的模組層級物件，縮短匯入時間
+
+模組層級的單例（音樂播放器、情緒分析器、會話表等）在匯入時只放一個 LazySingleton，
+第一次讀取屬性時才呼叫 factory 建立真正的物件，並把模組裡的全域變數換成該物件，
+之後的存取不再經過代理。
+"""
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class LazySingleton:
+    # 雙底線名稱會被改名（_LazySingleton__*），不會遮住被代理物件的屬性
+    __slots__ = ("__factory", "__namespace", "__name", "__lock", "__instance")
+
+    def __init__(self, factory: Callable[[], Any], namespace: Optional[Dict[str, Any]] = None,
+                 name: Optional[str] = None):
+        """
+        第一次使用時才建立的物件
+
+        Args:
+            factory (Callable): 建立物件的函式（不帶參數）
+            namespace (Dict): 建立後要改寫的命名空間，通常是模組的 globals()
+            name (str): namespace 裡指向這個代理的變數名稱
+        """
+        object.__setattr__(self, "_LazySingleton__factory", factory)
+        object.__setattr__(self, "_LazySingleton__namespace", namespace)
+        object.__setattr__(self, "_LazySingleton__name", name)
+        object.__setattr__(self, "_LazySingleton__lock", threading.Lock())
+        object.__setattr__(self, "_LazySingleton__instance", None)
+
+    def __get(self) -> Any:
+        instance = self.__instance
+        if instance is not None:
+            return instance
+        with self.__lock:
+            if self.__instance is None:
+                instance = self.__factory()
+                object.__setattr__(self, "_LazySingleton__instance", instance)
+                if self.__namespace is not None and self.__namespace.get(self.__name) is self:
+                    self.__namespace[self.__name] = instance
+            return self.__instance
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.__get(), attr)
+
+    def __setattr__(self, attr: str, value: Any):
+        setattr(self.__get(), attr, value)
+
+    def __repr__(self) -> str:
+        state = repr(self.__instance) if self.__instance is not None else "not created"
+        return f"<LazySingleton {self.__name or self.__factory!r}: {state}>"
+
+
+def resolve(value: Any) -> Any:
+    """LazySingleton 回傳（必要時建立）真正的物件，其他值原樣回傳"""
+    if isinstance(value, LazySingleton):
+        return value._LazySingleton__get()
+    return value
@@ -0,0 +1,77 @@
+"""
+雙語文本的語言選擇：把「中文 | English」格式的文本預先拆成單一語言版本
+
+規則 | Rules:
+    - 含有「|」的行：左邊是中文、右邊是英文；行首的表情符號與裝飾（例如 "=== "）兩邊都保留
+    - 只有中文的行只出現在 zh，只有英文的行只出現在 en
+    - 空白行與只有符號的行兩種語言都保留
+"""
+import re
+from typing import Dict, Optional, Tuple
+
+LANGUAGES = ("zh", "en", "both")
+DEFAULT_LANGUAGE = "both"
+
+_CJK = re.compile(r"[㐀-鿿豈-﫿　-〿＀-￯]")
+_LATIN = re.compile(r"[A-Za-z]")
+# 行首不是文字的部分（表情符號、空白、"==="），不含開頭的括號與引號
+_PREFIX = re.compile(r"^[^\w（(「『\"'“]*")
+# 行尾的裝飾（例如 " ==="）
+_SUFFIX = re.compile(r"[\s=~*\-]*$")
+
+
+def split_line(line: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    拆開一行雙語文本
+
+    Returns:
+        Tuple: (中文, 英文)；該語言沒有內容時為 None
+    """
+    if "|" in line:
+        left, right = line.split("|", 1)
+        zh = left.rstrip()
+        en = right.strip()
+        prefix = _PREFIX.match(left).group(0)
+        suffix = _SUFFIX.search(en).group(0)
+        if prefix.strip() and not en.startswith(prefix.strip()):
+            en = prefix + en
+        if suffix.strip() and not zh.endswith(suffix.strip()):
+            zh = zh + suffix
+        return zh, en
+    if _CJK.search(line):
+        return line, None
+    if _LATIN.search(line):
+        return None, line
+    return line, line
+
+
+def split_bilingual(text: str) -> Dict[str, str]:
+    """
+    把雙語文本拆成各語言版本
+
+    Returns:
+        Dict: {"zh": 中文, "en": 英文, "both": 原文}
+    """
+    zh_lines = []
+    en_lines = []
+    for line in text.split("\n"):
+        zh, en = split_line(line)
+        if zh is not None:
+            zh_lines.append(zh)
+        if en is not None:
+            en_lines.append(en)
+    return {"zh": "\n".join(zh_lines), "en": "\n".join(en_lines), "both": text}
+
+
+def split_table(table: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+    """
+    把「鍵 -> 雙語文本」的表拆成「語言 -> 鍵 -> 文本」
+
+    Returns:
+        Dict: {"zh": {...}, "en": {...}, "both": {...}}
+    """
+    localized = {language: {} for language in LANGUAGES}
+    for key, text in table.items():
+        for language, value in split_bilingual(text).items():
+            localized[language][key] = value
+    return localized
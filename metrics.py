@@ -0,0 +1,233 @@
+"""
+低開銷的呼叫次數、錯誤次數與延遲統計
+
+每個名稱（例如 "tool.process_user_action"）一組計數器與一個 HDR 式的延遲直方圖：
+延遲以微秒記錄，每個 2 的次方區間再分成 16 格，百分位數取格子中點，相對誤差約 3% 以內，
+記錄一次只需要一次 bit_length 與一次陣列加一，不保存個別樣本。
+
+用法 | Usage:
+    @timed("emotion_analyzer.analyze_emotion")
+    def analyze_emotion(...): ...
+
+    with timer("audio.load"):
+        ...
+
+設定 ADVENTURE_METRICS=0 可關閉記錄。
+"""
+import functools
+import os
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# 直方圖：小於 SUB_BUCKETS 微秒的值各自一格，之後每個 2 的次方區間 HALF_BUCKETS 格
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_BUCKETS = SUB_BUCKETS >> 1
+MAX_SHIFT = 36                     # 最大約 2^41 微秒（約 25 天），更大的值記在最後一格
+BUCKET_COUNT = SUB_BUCKETS + MAX_SHIFT * HALF_BUCKETS
+
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+DEFAULT_PROMETHEUS_FILE = "adventure_metrics.prom"
+
+
+def _bucket_index(value: int) -> int:
+    if value < SUB_BUCKETS:
+        return value
+    shift = value.bit_length() - SUB_BUCKET_BITS
+    if shift > MAX_SHIFT:
+        return BUCKET_COUNT - 1
+    return SUB_BUCKETS + (shift - 1) * HALF_BUCKETS + (value >> shift) - HALF_BUCKETS
+
+
+def _bucket_range(index: int) -> Tuple[int, int]:
+    """格子內的最小值與最大值（微秒）"""
+    if index < SUB_BUCKETS:
+        return index, index
+    shift = (index - SUB_BUCKETS) // HALF_BUCKETS + 1
+    mantissa = (index - SUB_BUCKETS) % HALF_BUCKETS + HALF_BUCKETS
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    def __init__(self):
+        """以微秒為單位的延遲直方圖；呼叫端負責同步"""
+        self.counts = array("Q", bytes(8 * BUCKET_COUNT))
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def record(self, value_us: int):
+        self.counts[_bucket_index(value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def percentile(self, quantile: float) -> int:
+        """估計百分位數（微秒）；沒有樣本時回傳 0"""
+        if not self.count:
+            return 0
+        rank = max(1, int(quantile * self.count + 0.999999))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count:
+                seen += count
+                if seen >= rank:
+                    lower, upper = _bucket_range(index)
+                    return min((lower + upper) // 2, self.max_us)
+        return self.max_us
+
+
+class CallMetric:
+    __slots__ = ("name", "calls", "errors", "histogram", "lock")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.histogram = LatencyHistogram()
+        self.lock = threading.Lock()
+
+    def record(self, elapsed_ns: int, error: bool = False):
+        with self.lock:
+            self.calls += 1
+            if error:
+                self.errors += 1
+            self.histogram.record(elapsed_ns // 1000)
+
+    def snapshot(self, quantiles=DEFAULT_QUANTILES) -> Dict[str, Any]:
+        with self.lock:
+            histogram = self.histogram
+            info = {
+                "calls": self.calls,
+                "errors": self.errors,
+                "mean_ms": round(histogram.total_us / histogram.count / 1000, 3) if histogram.count else 0.0,
+                "max_ms": round(histogram.max_us / 1000, 3),
+            }
+            for quantile in quantiles:
+                info[f"p{quantile * 100:g}_ms"] = round(histogram.percentile(quantile) / 1000, 3)
+            return info
+
+
+def _is_error_result(result: Any) -> bool:
+    """工具函數以 {"status": "error"} 回報的失敗也算錯誤"""
+    return isinstance(result, dict) and result.get("status") == "error"
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = True):
+        """
+        以名稱區分的呼叫統計
+
+        Args:
+            enabled (bool): False 時 timed / timer 不做任何記錄
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, CallMetric] = {}
+
+    def get(self, name: str) -> CallMetric:
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(name, CallMetric(name))
+        return metric
+
+    def record(self, name: str, elapsed_seconds: float, error: bool = False):
+        """直接記錄一次呼叫"""
+        if self.enabled:
+            self.get(name).record(int(elapsed_seconds * 1e9), error)
+
+    def timed(self, name: str) -> Callable:
+        """裝飾器：記錄函數的呼叫次數、錯誤次數與延遲（保留原函數簽名，ADK 工具可直接使用）"""
+        def decorator(func):
+            metric = self.get(name)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    result = func(*args, **kwargs)
+                except BaseException:
+                    metric.record(time.perf_counter_ns() - start, True)
+                    raise
+                metric.record(time.perf_counter_ns() - start, _is_error_result(result))
+                return result
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def timer(self, name: str):
+        """記錄 with 區塊的延遲；區塊拋出例外時算一次錯誤"""
+        if not self.enabled:
+            yield
+            return
+        metric = self.get(name)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        except BaseException:
+            metric.record(time.perf_counter_ns() - start, True)
+            raise
+        metric.record(time.perf_counter_ns() - start)
+
+    def snapshot(self, quantiles=DEFAULT_QUANTILES) -> Dict[str, Dict[str, Any]]:
+        """名稱 -> 呼叫次數、錯誤次數與延遲百分位數（毫秒）"""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        return {name: metric.snapshot(quantiles) for name, metric in metrics if metric.calls}
+
+    def reset(self):
+        """歸零所有統計（已裝飾的函數仍記錄到同一組統計）"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            with metric.lock:
+                metric.calls = 0
+                metric.errors = 0
+                metric.histogram = LatencyHistogram()
+
+    def to_prometheus(self, quantiles=DEFAULT_QUANTILES) -> str:
+        """Prometheus 文字格式"""
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        calls: List[str] = []
+        errors: List[str] = []
+        latency: List[str] = []
+        for name, metric in metrics:
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            with metric.lock:
+                histogram = metric.histogram
+                calls.append(f'adventure_calls_total{{name="{label}"}} {metric.calls}')
+                errors.append(f'adventure_errors_total{{name="{label}"}} {metric.errors}')
+                for quantile in quantiles:
+                    latency.append(f'adventure_call_latency_seconds{{name="{label}",quantile="{quantile:g}"}} '
+                                   f'{histogram.percentile(quantile) / 1e6:.6f}')
+                latency.append(f'adventure_call_latency_seconds_sum{{name="{label}"}} {histogram.total_us / 1e6:.6f}')
+                latency.append(f'adventure_call_latency_seconds_count{{name="{label}"}} {histogram.count}')
+        lines = ["# HELP adventure_calls_total Number of calls.", "# TYPE adventure_calls_total counter", *calls,
+                 "# HELP adventure_errors_total Number of failed calls.", "# TYPE adventure_errors_total counter",
+                 *errors,
+                 "# HELP adventure_call_latency_seconds Call latency.",
+                 "# TYPE adventure_call_latency_seconds summary", *latency]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Optional[str] = None) -> str:
+        """把 Prometheus 文字格式寫入檔案（先寫暫存檔再替換），回傳檔案路徑"""
+        path = path or os.environ.get("ADVENTURE_METRICS_FILE", DEFAULT_PROMETHEUS_FILE)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(temp_path, path)
+        return path
+
+
+# 整個程序共用的統計
+REGISTRY = MetricsRegistry(enabled=os.environ.get("ADVENTURE_METRICS", "1") != "0")
+timed = REGISTRY.timed
+timer = REGISTRY.timer
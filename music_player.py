@@ -1,14 +1,35 @@
-import pygame
 import os
+import threading
 from typing import Dict, Optional
 
+from audio_backend import CROSSFADE_CURVE_NAMES, AudioBackend, create_backend
+from localization import split_bilingual, split_table
+from metrics import timed
+from tracing import tracer
+
 class MusicPlayer:
-    def __init__(self, music_folder: str = "music"):
-        """初始化音樂播放器"""
-        pygame.mixer.init()
+    def __init__(self, music_folder: str = "music", cache_max_bytes: int = 64 * 1024 * 1024,
+                 crossfade_ms: int = 1500, crossfade_curve: str = "equal_power",
+                 backend: Optional[AudioBackend] = None):
+        """
+        初始化音樂播放器
+        
+        Args:
+            music_folder (str): 音樂文件資料夾
+            cache_max_bytes (int): 已解碼音樂快取的記憶體預算（位元組）
+            crossfade_ms (int): 切換音樂時的交叉淡化時間（毫秒），0 表示直接切換
+            crossfade_curve (str): 淡化曲線（linear / equal_power / exponential / s_curve）
+            backend (AudioBackend): 音訊後端；未指定時依 ADVENTURE_AUDIO_BACKEND 建立（pygame / null）
+        """
         self.music_folder = music_folder
         self.current_playing = None
         
+        # 音訊後端：第一次使用時才建立，pygame 混音器在第一次實際播放時才初始化；null 後端只記錄音樂提示事件
+        self._backend = backend
+        self._backend_options = {"cache_max_bytes": cache_max_bytes, "crossfade_ms": crossfade_ms,
+                                 "crossfade_curve": crossfade_curve}
+        self._backend_lock = threading.Lock()
+        
         # 擴展的音樂情緒映射表 - 覆蓋所有音樂文件
         self.music_mapping = {
             # 開場
@@ -109,13 +130,40 @@ class MusicPlayer:
             "ending(defeat).mp3": "失敗結局音樂 | Defeat Ending Music",
             "ending(peaceful).mp3": "和平結局音樂 | Peaceful Ending Music"
         }
+        # 預先拆好的各語言描述：語言 -> 音樂文件 -> 描述
+        self._localized_descriptions = split_table(self.music_descriptions)
         
-    def play_music(self, emotion_type: str) -> Dict[str, str]:
+    @property
+    def backend(self) -> AudioBackend:
+        """音訊後端（第一次讀取時依 ADVENTURE_AUDIO_BACKEND 建立）"""
+        backend = self._backend
+        if backend is None:
+            with self._backend_lock:
+                if self._backend is None:
+                    self._backend = create_backend(**self._backend_options)
+                backend = self._backend
+        return backend
+
+    @property
+    def backend_created(self) -> Optional[AudioBackend]:
+        """已建立的音訊後端；尚未建立時為 None（不會觸發建立）"""
+        return self._backend
+        
+    def describe(self, music_file: str, language: str = "both") -> str:
+        """音樂描述（language: zh / en / both）"""
+        description = self._localized_descriptions[language].get(music_file)
+        if description is None:
+            description = split_bilingual(self.music_descriptions.get(music_file, f"未知音樂 | Unknown music: {music_file}"))[language]
+        return description
+        
+    @timed("music_player.play_music")
+    def play_music(self, emotion_type: str, language: str = "both") -> Dict[str, str]:
         """
         根據情緒類型播放對應音樂
         
         Args:
             emotion_type (str): 情緒類型
+            language (str): 音樂描述的語言：zh / en / both
             
         Returns:
             Dict: 播放狀態和音樂文件信息
@@ -140,24 +188,24 @@ class MusicPlayer:
                     "message": f"音樂文件不存在 | Music file not found: {music_path}"
                 }
             
-            # 停止當前播放的音樂
-            pygame.mixer.music.stop()
-            
-            # 載入並播放新音樂
-            pygame.mixer.music.load(music_path)
-            pygame.mixer.music.play(-1)  # -1 表示循環播放
+            # 排程交叉淡化到新音樂後立即返回；解碼與淡化在背景進行
+            cached = self.backend.is_cached(music_path)
+            with tracer.span("audio.play", file=music_file, cached=cached):
+                transition = self.backend.play(music_path, emotion_type)
             
             self.current_playing = music_file
             
             # 獲取音樂描述
-            description = self.music_descriptions.get(music_file, f"未知音樂 | Unknown music: {music_file}")
+            description = self.describe(music_file, language)
             
             return {
                 "status": "success",
                 "message": f"正在播放 | Now playing: {music_file}",
                 "description": description,
                 "emotion": emotion_type,
-                "file": music_file
+                "file": music_file,
+                "cached": cached,
+                "transition": transition
             }
             
         except Exception as e:
@@ -166,10 +214,12 @@ class MusicPlayer:
                 "message": f"播放音樂時發生錯誤 | Error playing music: {str(e)}"
             }
     
+    @timed("music_player.stop_music")
     def stop_music(self) -> Dict[str, str]:
         """停止播放音樂"""
         try:
-            pygame.mixer.music.stop()
+            with tracer.span("audio.stop"):
+                self.backend.stop()
             current_file = self.current_playing
             self.current_playing = None
             return {
@@ -182,6 +232,46 @@ class MusicPlayer:
                 "message": f"停止音樂時發生錯誤 | Error stopping music: {str(e)}"
             }
     
+    def set_crossfade(self, duration_ms: int, curve: Optional[str] = None) -> Dict[str, str]:
+        """調整交叉淡化時間與曲線"""
+        if curve is not None and curve not in CROSSFADE_CURVE_NAMES:
+            return {
+                "status": "error",
+                "message": f"未知的淡化曲線 | Unknown crossfade curve: {curve}",
+                "available_curves": sorted(CROSSFADE_CURVE_NAMES)
+            }
+        self.backend.set_crossfade(duration_ms, curve)
+        return {"status": "success", "message": f"交叉淡化 | Crossfade: {self.backend.crossfade_curve} {duration_ms} ms"}
+    
+    @timed("music_player.prefetch")
+    def prefetch(self, emotion_type: str) -> bool:
+        """
+        預先解碼情緒對應的音樂放入快取（可在背景執行緒呼叫）
+        
+        Returns:
+            bool: 是否實際進行了解碼
+        """
+        music_file = self.music_mapping.get(emotion_type.lower())
+        if not music_file:
+            return False
+        music_path = os.path.join(self.music_folder, music_file)
+        if not os.path.exists(music_path):
+            return False
+        return self.backend.prefetch(music_path)
+    
+    def resolve_music_path(self, emotion_type: str) -> Optional[str]:
+        """情緒對應的音樂文件路徑，找不到對應時回傳 None"""
+        music_file = self.music_mapping.get(emotion_type.lower())
+        return os.path.join(self.music_folder, music_file) if music_file else None
+    
+    def is_cached(self, music_path: str) -> bool:
+        """音樂文件是否已解碼在記憶體中"""
+        return self.backend.is_cached(music_path)
+    
+    def get_cache_stats(self) -> dict:
+        """獲取已解碼音樂快取的命中率與解碼耗時"""
+        return self.backend.cache_stats()
+    
     def get_current_playing(self) -> Optional[str]:
         """獲取當前播放的音樂"""
         return self.current_playing
@@ -196,9 +286,11 @@ class MusicPlayer:
         """列出所有可用的情緒類型"""
         return sorted(list(set(self.music_mapping.keys())))
     
-    def list_available_music_files(self) -> dict:
+    def list_available_music_files(self, language: str = "both") -> dict:
         """列出所有可用的音樂文件及其描述"""
-        return self.music_descriptions
+        if language == "both":
+            return self.music_descriptions
+        return {music_file: self.describe(music_file, language) for music_file in self.music_descriptions}
     
     def get_emotion_music_mapping(self) -> dict:
         """獲取情緒到音樂的完整映射"""
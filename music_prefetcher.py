@@ -0,0 +1,112 @@
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List
+
+
+def rank_by_history(emotion_history: Iterable[str], candidates: Iterable[str]) -> List[str]:
+    """
+    依情緒歷史出現次數排序候選情緒；次數相同時較近期出現者優先，其餘維持原順序
+
+    Args:
+        emotion_history (Iterable[str]): 過去的情緒記錄（舊到新）
+        candidates (Iterable[str]): 候選情緒
+    """
+    history = list(emotion_history)
+    frequency = Counter(history)
+    last_seen = {emotion: index for index, emotion in enumerate(history)}
+    ordered = list(dict.fromkeys(candidates))
+    return sorted(ordered, key=lambda emotion: (-frequency[emotion], -last_seen.get(emotion, -1), ordered.index(emotion)))
+
+
+class MusicPrefetcher:
+    def __init__(self, music_player, max_concurrent: int = 2):
+        """
+        在背景執行緒預先解碼接下來可能播放的音樂
+
+        Args:
+            music_player (MusicPlayer): 提供 prefetch 與解碼快取的播放器
+            max_concurrent (int): 同時進行的預先載入上限
+        """
+        self.music_player = music_player
+        self.max_concurrent = max_concurrent
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="music-prefetch")
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+        self.scheduled = 0
+        self.completed = 0
+        self.already_cached = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def prefetch(self, emotions: Iterable[str]) -> List[str]:
+        """
+        排程預先載入；已在快取或正在載入的音樂會略過，超過同時上限的候選直接捨棄
+
+        Args:
+            emotions (Iterable[str]): 依優先順序排列的候選情緒
+
+        Returns:
+            List[str]: 實際排程的情緒
+        """
+        scheduled = []
+        if not self.music_player.backend.supports_prefetch:
+            return scheduled
+        for emotion in emotions:
+            music_path = self.music_player.resolve_music_path(emotion)
+            if music_path is None or self.music_player.is_cached(music_path):
+                continue
+
+            with self._lock:
+                if music_path in self._in_flight:
+                    continue
+                if len(self._in_flight) >= self.max_concurrent:
+                    self.skipped += 1
+                    continue
+                self._in_flight[music_path] = self._executor.submit(self._run, emotion, music_path)
+                self.scheduled += 1
+            scheduled.append(emotion)
+        return scheduled
+
+    def _run(self, emotion: str, music_path: str) -> None:
+        try:
+            decoded = self.music_player.prefetch(emotion)
+            with self._lock:
+                if decoded:
+                    self.completed += 1
+                else:
+                    self.already_cached += 1
+        except Exception:
+            with self._lock:
+                self.failed += 1
+        finally:
+            with self._lock:
+                self._in_flight.pop(music_path, None)
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """等待目前排程的預先載入完成（主要供基準測試使用）"""
+        with self._lock:
+            futures = list(self._in_flight.values())
+        _, not_done = wait(futures, timeout)
+        return not not_done
+
+    def shutdown(self) -> None:
+        """停止背景執行緒"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> Dict[str, any]:
+        """預先載入統計，包含因命中預先載入而省下的切換延遲"""
+        cache_stats = self.music_player.get_cache_stats()
+        with self._lock:
+            return {
+                "scheduled": self.scheduled,
+                "completed": self.completed,
+                "already_cached": self.already_cached,
+                "skipped_over_limit": self.skipped,
+                "failed": self.failed,
+                "in_flight": len(self._in_flight),
+                "max_concurrent": self.max_concurrent,
+                "prefetch_hits": cache_stats["prefetch_hits"],
+                "saved_switch_seconds": cache_stats["prefetch_saved_seconds"]
+            }
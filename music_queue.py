@@ -0,0 +1,199 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from tracing import tracer
+
+
+class MusicTicket:
+    def __init__(self, ticket_id: int, action: str, emotion: Optional[str] = None, music_file: Optional[str] = None,
+                 language: str = "both"):
+        """
+        音樂指令的憑證，可稍後查詢執行結果
+
+        狀態 | Status: queued → done / skipped / superseded / error
+        """
+        self.ticket_id = ticket_id
+        self.action = action
+        self.emotion = emotion
+        self.file = music_file
+        self.language = language
+        self.trace_id = tracer.current_trace_id()  # 建立指令的會話，音訊執行緒的 span 沿用
+        self.status = "queued"
+        self.result: Optional[Dict[str, Any]] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉成工具函數可回傳的 dict"""
+        messages = {
+            "queued": "指令已排入佇列 | Command queued",
+            "done": "指令已執行 | Command executed",
+            "skipped": "已在播放相同音樂，略過 | Same music already playing, skipped",
+            "superseded": "已被較新的指令取代 | Superseded by a newer command",
+            "error": "指令執行失敗 | Command failed"
+        }
+        info = {
+            "status": self.status,
+            "message": messages[self.status],
+            "ticket_id": self.ticket_id,
+            "action": self.action,
+            "emotion": self.emotion,
+            "file": self.file
+        }
+        if self.result is not None:
+            info["result"] = self.result
+        return info
+
+
+class MusicCommandQueue:
+    def __init__(self, music_player, min_dwell_seconds: float = 3.0, max_tickets: int = 256):
+        """
+        非阻塞的音樂指令佇列：由專用的音訊執行緒依序執行播放/停止指令
+
+        - 尚未執行的舊指令會被較新的指令合併取代，只執行最後一個
+        - 要求的音樂與目前播放的相同時不重新載入
+        - 每首音樂至少播放 min_dwell_seconds 秒才會被切換，避免頻繁換曲
+
+        Args:
+            music_player (MusicPlayer): 實際執行播放的播放器
+            min_dwell_seconds (float): 每首音樂的最短播放時間（秒）
+            max_tickets (int): 保留可查詢的憑證數量
+        """
+        self.music_player = music_player
+        self.min_dwell_seconds = min_dwell_seconds
+        self.max_tickets = max_tickets
+
+        self._condition = threading.Condition()
+        self._pending: Optional[MusicTicket] = None
+        self._tickets: "OrderedDict[int, MusicTicket]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._track_started = 0.0
+        self._executing = False
+        self._thread = None
+
+        self.executed = 0
+        self.skipped = 0
+        self.superseded = 0
+
+    def play(self, emotion_type: str, language: str = "both") -> MusicTicket:
+        """排入播放指令並立即返回憑證（language 為音樂描述的語言）"""
+        music_path = self.music_player.resolve_music_path(emotion_type)
+        music_file = self.music_player.music_mapping.get(emotion_type.lower())
+        ticket = MusicTicket(next(self._ids), "play", emotion_type, music_file, language)
+
+        if music_path is None:
+            # 找不到對應音樂：不進佇列，直接回傳播放器的錯誤說明
+            ticket.status = "error"
+            ticket.result = self.music_player.play_music(emotion_type, language)
+            ticket.finished_at = time.time()
+            self._remember(ticket)
+            return ticket
+
+        return self._enqueue(ticket)
+
+    def stop(self) -> MusicTicket:
+        """排入停止指令並立即返回憑證"""
+        return self._enqueue(MusicTicket(next(self._ids), "stop"))
+
+    def get_ticket(self, ticket_id: int) -> Optional[MusicTicket]:
+        """查詢憑證；過舊的憑證可能已被清除"""
+        with self._condition:
+            return self._tickets.get(ticket_id)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """等待佇列清空（主要供測試與基準測試使用）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending is not None or self._executing:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """佇列統計"""
+        with self._condition:
+            return {
+                "executed": self.executed,
+                "skipped_same_track": self.skipped,
+                "superseded": self.superseded,
+                "pending": self._pending.to_dict() if self._pending else None,
+                "min_dwell_seconds": self.min_dwell_seconds
+            }
+
+    def _remember(self, ticket: MusicTicket) -> None:
+        with self._condition:
+            self._tickets[ticket.ticket_id] = ticket
+            while len(self._tickets) > self.max_tickets:
+                self._tickets.popitem(last=False)
+
+    def _enqueue(self, ticket: MusicTicket) -> MusicTicket:
+        with self._condition:
+            pending = self._pending
+            if pending is not None and (pending.action, pending.file) == (ticket.action, ticket.file):
+                # 與尚未執行的指令相同：直接沿用原本的憑證
+                return pending
+            if pending is not None:
+                self._finish(pending, "superseded")
+                self.superseded += 1
+            self._pending = ticket
+            self._remember(ticket)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="music-command-queue", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+        return ticket
+
+    def _finish(self, ticket: MusicTicket, status: str, result: Optional[Dict[str, Any]] = None) -> None:
+        ticket.status = status
+        ticket.result = result
+        ticket.finished_at = time.time()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+
+                ticket = self._pending
+
+                # 播放指令需等目前音樂播滿最短時間；等待期間的新指令會取代這個指令
+                if ticket.action == "play" and self.music_player.get_current_playing() not in (None, ticket.file):
+                    remaining = self._track_started + self.min_dwell_seconds - time.monotonic()
+                    if remaining > 0:
+                        self._condition.wait(remaining)
+                        continue
+
+                self._pending = None
+
+                if ticket.action == "play" and ticket.file == self.music_player.get_current_playing():
+                    self._finish(ticket, "skipped", {"status": "success", "file": ticket.file})
+                    self.skipped += 1
+                    self._condition.notify_all()
+                    continue
+                self._executing = True
+
+            # 在鎖外執行，執行期間仍可接受新指令
+            try:
+                with tracer.trace(ticket.trace_id), tracer.span(f"music.{ticket.action}", file=ticket.file):
+                    if ticket.action == "play":
+                        result = self.music_player.play_music(ticket.emotion, ticket.language)
+                    else:
+                        result = self.music_player.stop_music()
+                status = "done" if result.get("status") == "success" else "error"
+            except Exception as e:
+                result = {"status": "error", "message": str(e)}
+                status = "error"
+
+            with self._condition:
+                if ticket.action == "play" and status == "done":
+                    self._track_started = time.monotonic()
+                self._finish(ticket, status, result)
+                self.executed += 1
+                self._executing = False
+                self._condition.notify_all()
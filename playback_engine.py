@@ -0,0 +1,195 @@
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import pygame
+
+# 淡入增益曲線：t 由 0 到 1；淡出使用 curve(1 - t)
+CROSSFADE_CURVES: Dict[str, Callable[[float], float]] = {
+    "linear": lambda t: t,
+    "equal_power": lambda t: math.sin(t * math.pi / 2),      # 等功率：交叉點音量不下陷
+    "exponential": lambda t: t * t,
+    "s_curve": lambda t: t * t * (3 - 2 * t)                  # 平滑起止
+}
+
+
+# 保留的混音頻道數：一個淡入，其餘讓連續切換時仍在淡出的音樂從目前音量繼續淡出
+CHANNEL_COUNT = 4
+
+
+class CrossfadeEngine:
+    def __init__(self, duration_ms: int = 1500, curve: str = "equal_power", tick_ms: int = 20,
+                 channel_count: int = CHANNEL_COUNT):
+        """
+        以多個混音頻道播放、交叉淡入淡出的播放引擎
+
+        play() 只排程切換並立即返回；載入執行緒先把下一首解碼好，淡化執行緒只負責調整音量，
+        解碼期間進行中的淡化不會停頓。切換時新音樂在空閒頻道淡入，所有還有聲音的頻道
+        （包括上一次淡化中途的頻道）都從目前的音量淡出，不會突然中斷。
+
+        Args:
+            duration_ms (int): 預設交叉淡化時間（毫秒）
+            curve (str): 預設淡化曲線，見 CROSSFADE_CURVES
+            tick_ms (int): 音量更新間隔（毫秒）
+            channel_count (int): 保留的混音頻道數（至少 2）
+        """
+        if curve not in CROSSFADE_CURVES:
+            raise ValueError(f"未知的淡化曲線 | Unknown crossfade curve: {curve}")
+        self.duration_ms = duration_ms
+        self.curve = curve
+        self.tick_ms = tick_ms
+        self.channel_count = max(2, channel_count)
+
+        self._condition = threading.Condition()
+        self._serial = 0              # 每個請求的編號；解碼完成時已有更新的請求就丟棄結果
+        self._to_load = None          # 等待解碼的最新播放請求
+        self._loading = False
+        self._pending = None          # 已解碼、等待開始的切換，舊的請求會被覆蓋
+        self._fade = None             # 進行中的淡化
+        self._channels = None         # 保留的頻道
+        self._current = None          # 正在淡入或播放中的頻道
+        self._thread = None
+        self._loader = None
+
+        self.transitions = 0
+        self.superseded = 0           # 解碼完成前就被新請求取代的次數
+        self.last_error: Optional[str] = None
+
+    def play(self, load: Callable[[], Any], duration_ms: Optional[int] = None, curve: Optional[str] = None) -> Dict[str, Any]:
+        """
+        排程切換到新的音樂並立即返回
+
+        Args:
+            load (Callable): 回傳已解碼 Sound 的函式，在載入執行緒呼叫；回傳 None 表示改由其他方式播放
+            duration_ms (int): 本次交叉淡化時間
+            curve (str): 本次淡化曲線
+
+        Returns:
+            Dict: 排程的淡化設定
+        """
+        curve = curve or self.curve
+        if curve not in CROSSFADE_CURVES:
+            raise ValueError(f"未知的淡化曲線 | Unknown crossfade curve: {curve}")
+        duration_ms = self.duration_ms if duration_ms is None else duration_ms
+
+        with self._condition:
+            self._serial += 1
+            self._to_load = (self._serial, load, duration_ms, curve)
+            self._start_threads()
+            self._condition.notify_all()
+        return {"curve": curve, "duration_ms": duration_ms}
+
+    def stop(self, fade_ms: Optional[int] = None) -> None:
+        """淡出並停止目前的音樂（立即返回）；取代還在解碼的播放請求"""
+        with self._condition:
+            self._serial += 1
+            self._to_load = None
+            self._pending = ("stop", None, self.duration_ms if fade_ms is None else fade_ms, self.curve)
+            self._start_threads()
+            self._condition.notify_all()
+
+    def is_busy(self) -> bool:
+        """是否還有尚未處理的請求、解碼中的音樂或進行中的淡化"""
+        with self._condition:
+            return (self._to_load is not None or self._loading or self._pending is not None
+                    or self._fade is not None)
+
+    def _start_threads(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="crossfade-engine", daemon=True)
+            self._thread.start()
+            self._loader = threading.Thread(target=self._load_loop, name="crossfade-loader", daemon=True)
+            self._loader.start()
+
+    def _load_loop(self) -> None:
+        """載入執行緒：只解碼最新的播放請求，完成後交給淡化執行緒"""
+        while True:
+            with self._condition:
+                while self._to_load is None:
+                    self._condition.wait()
+                (serial, load, duration_ms, curve), self._to_load = self._to_load, None
+                self._loading = True
+
+            try:
+                sound = load()
+            except Exception as e:
+                self.last_error = str(e)
+                sound = None
+
+            with self._condition:
+                self._loading = False
+                if serial != self._serial:
+                    self.superseded += 1
+                    continue
+                self._pending = ("play", sound, duration_ms, curve)
+                self._condition.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._pending is None and self._fade is None:
+                    self._condition.wait()
+                request, self._pending = self._pending, None
+
+            if request is not None:
+                try:
+                    self._start_transition(*request)
+                except Exception as e:
+                    self.last_error = str(e)
+
+            if self._fade is not None:
+                self._tick()
+                time.sleep(self.tick_ms / 1000)
+
+    def _start_transition(self, action: str, sound, duration_ms: int, curve: str) -> None:
+        if self._channels is None:
+            pygame.mixer.set_reserved(self.channel_count)
+            self._channels = [pygame.mixer.Channel(index) for index in range(self.channel_count)]
+
+        # 所有還有聲音的頻道都從目前的音量開始淡出（包括上一次淡化中途的頻道）
+        outgoing = [] if self._fade is None else [channel for channel, _ in self._fade["out"]]
+        if self._current is not None and self._current not in outgoing:
+            outgoing.append(self._current)
+        fading = [(channel, channel.get_volume()) for channel in outgoing if channel.get_busy()]
+        for channel in outgoing:
+            if not channel.get_busy():
+                channel.stop()
+
+        incoming = None
+        if sound is not None:
+            incoming = self._free_channel(fading)
+            fading = [(channel, volume) for channel, volume in fading if channel is not incoming]
+            incoming.set_volume(0.0 if duration_ms > 0 else 1.0)
+            incoming.play(sound, loops=-1)  # -1 表示循環播放
+            self.transitions += 1
+        # sound 為 None：停止請求（或音樂改由串流播放），只淡出
+
+        self._current = incoming
+        self._fade = {"out": fading, "in": incoming, "start": time.perf_counter(),
+                      "duration": duration_ms / 1000, "curve": CROSSFADE_CURVES[curve]}
+
+    def _free_channel(self, fading):
+        """取得空閒的頻道；全部都在淡出時停止目前最小聲的那個"""
+        busy = {id(channel) for channel, _ in fading}
+        for channel in self._channels:
+            if id(channel) not in busy:
+                return channel
+        quietest = min(fading, key=lambda item: item[0].get_volume())[0]
+        quietest.stop()
+        return quietest
+
+    def _tick(self) -> None:
+        fade = self._fade
+        progress = 1.0 if fade["duration"] <= 0 else min((time.perf_counter() - fade["start"]) / fade["duration"], 1.0)
+        curve = fade["curve"]
+
+        if fade["in"] is not None:
+            fade["in"].set_volume(curve(progress))
+        for channel, volume in fade["out"]:
+            channel.set_volume(volume * curve(1.0 - progress))
+
+        if progress >= 1.0:
+            for channel, _ in fade["out"]:
+                channel.stop()
+            self._fade = None
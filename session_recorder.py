@@ -0,0 +1,271 @@
+"""
+工具呼叫的錄製與重播，用來重現慢回合並檢查效能退化
+
+錄製 | Recording:
+    每次工具呼叫寫成 JSONL 的一行：
+    {"seq": 1, "t": 0.0123, "sid": "<session id>", "tool": "process_user_action",
+     "args": {"user_action": "..."}, "ms": 0.42, "status": "success", "digest": "<16 hex>", "version": 1000004}
+    t 是呼叫開始時距離開始錄製的秒數；digest 是結果去掉易變欄位（音樂憑證、版本號等）後的雜湊。
+
+重播 | Replay:
+    依原本的順序以目前的程式碼重新執行每個呼叫（全速或依原本的時間間隔），
+    比對 digest 找出結果不同的呼叫，並找出延遲超過門檻的呼叫。
+    會話 id 會加上前綴，不會與正在進行的遊戲衝突；since_version 會換成重播時對應的版本號。
+"""
+import functools
+import hashlib
+import inspect
+import json
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# 每次執行都可能不同的欄位（音樂指令與播放狀態、全域計數器產生的 id、統計資料），不列入 digest
+VOLATILE_KEYS = frozenset({"version", "music_ticket", "ticket_id", "music_status", "current_music",
+                           "cached", "transition", "prometheus_file", "file"})
+# 結果是執行期統計或音訊狀態的工具，只比較延遲不比較結果
+UNCOMPARED_TOOLS = frozenset({"get_music_info", "get_diagnostics", "get_music_ticket", "stop_music",
+                              "export_trace"})
+
+DEFAULT_THRESHOLD = 0.5        # 重播延遲超過錄製延遲的 50%
+DEFAULT_MIN_REGRESSION_MS = 1.0  # 且至少慢 1 毫秒才算退化，避免微秒級呼叫的雜訊
+
+
+def _stable(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _stable(item) for key, item in value.items() if key not in VOLATILE_KEYS}
+    if isinstance(value, (list, tuple)):
+        return [_stable(item) for item in value]
+    return value
+
+
+def result_digest(result: Any) -> str:
+    """結果去掉易變欄位後的雜湊"""
+    canonical = json.dumps(_stable(result), ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def wrap_tool(func: Callable, session_id_of: Callable[[Any], str], record: Callable, name: Optional[str] = None) -> Callable:
+    """
+    包裝工具函數，每次呼叫後以 record(session id, 工具名稱, 參數, 結果, 耗時, 開始時間) 寫入記錄
+
+    record 可以在呼叫時才取得錄製器（例如延遲建立的錄製器），包裝時不必先建立。
+
+    Args:
+        func (Callable): 工具函數
+        session_id_of (Callable): 由 tool_context 取得 session id 的函式
+        record (Callable): 寫入記錄的函式，參數同 SessionRecorder.record
+        name (str): 記錄的工具名稱，預設為函數名稱
+    """
+    name = name or func.__name__
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            arguments = dict(signature.bind(*args, **kwargs).arguments)
+        except TypeError:
+            # 參數不符：不錄製，直接呼叫讓工具函數丟出原本的錯誤
+            return func(*args, **kwargs)
+        session_id = session_id_of(arguments.pop("tool_context", None))
+
+        result = None
+        started_at = time.monotonic()
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            result = {"status": "error", "message": f"{type(e).__name__}: {e}"}
+            raise
+        finally:
+            record(session_id, name, arguments, result, time.perf_counter() - start, started_at)
+        return result
+    return wrapper
+
+
+class SessionRecorder:
+    def __init__(self, path: str):
+        """
+        把工具呼叫附加寫入 JSONL 檔
+
+        Args:
+            path (str): 錄製檔路徑（附加模式）
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+        self._seq = 0
+        self._start = time.monotonic()
+        self.records = 0
+
+    def wrap(self, func: Callable, session_id_of: Callable[[Any], str], name: Optional[str] = None) -> Callable:
+        """
+        包裝工具函數：記錄參數、延遲與結果 digest（保留原函數簽名，ADK 工具可直接使用）
+
+        Args:
+            func (Callable): 工具函數
+            session_id_of (Callable): 由 tool_context 取得 session id 的函式
+            name (str): 記錄的工具名稱，預設為函數名稱
+        """
+        return wrap_tool(func, session_id_of, self.record, name)
+
+    def record(self, session_id: str, tool: str, arguments: Dict[str, Any], result: Any, elapsed: float,
+               started_at: Optional[float] = None):
+        """
+        寫入一筆工具呼叫
+
+        Args:
+            elapsed (float): 呼叫耗時（秒）
+            started_at (float): 呼叫開始時的 time.monotonic()，預設為寫入時間；重播依此重現呼叫間隔
+        """
+        if started_at is None:
+            started_at = time.monotonic()
+        entry = {
+            "sid": session_id,
+            "tool": tool,
+            "args": arguments,
+            "ms": round(elapsed * 1000, 4),
+            "status": result.get("status") if isinstance(result, dict) else None,
+            "digest": result_digest(result),
+        }
+        if isinstance(result, dict) and "version" in result:
+            entry["version"] = result["version"]
+        with self._lock:
+            self._seq += 1
+            entry["seq"] = self._seq
+            entry["t"] = round(started_at - self._start, 6)
+            self._file.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._file.flush()
+            self.records += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def load_records(path: str) -> Iterator[Dict[str, Any]]:
+    """依序讀出錄製檔；略過寫到一半的最後一行"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _percentile(samples: List[float], quantile: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(quantile * len(ordered)))], 4)
+
+
+class SessionReplayer:
+    def __init__(self, tools: Dict[str, Callable], threshold: float = DEFAULT_THRESHOLD,
+                 min_regression_ms: float = DEFAULT_MIN_REGRESSION_MS, session_prefix: Optional[str] = None):
+        """
+        以目前的程式碼重播錄製的工具呼叫
+
+        Args:
+            tools (Dict): 工具名稱 -> 工具函數（例如 agent 模組裡未包裝錄製的函數）
+            threshold (float): 延遲退化的比例門檻
+            min_regression_ms (float): 延遲退化的最小絕對差（毫秒）
+            session_prefix (str): 重播會話 id 的前綴，預設每次重播不同
+        """
+        self.tools = tools
+        self.threshold = threshold
+        self.min_regression_ms = min_regression_ms
+        self.session_prefix = session_prefix or f"replay-{time.time_ns()}-"
+
+    def replay(self, records, pacing: str = "full", max_reports: int = 50) -> Dict[str, Any]:
+        """
+        重播
+
+        Args:
+            records (Iterable): load_records 讀出的記錄
+            pacing (str): full（全速）或 original（依錄製時的時間間隔）
+            max_reports (int): 最多列出的不一致與退化呼叫數
+
+        Returns:
+            Dict: 各工具的呼叫數、不一致數、退化數與延遲百分位數，以及不一致與退化的呼叫
+        """
+        if pacing not in ("full", "original"):
+            raise ValueError(f"未知的重播速度 | Unknown pacing: {pacing}")
+        versions: Dict[tuple, int] = {}     # (session id, 錄製時的版本號) -> 重播時的版本號
+        tools: Dict[str, Dict[str, Any]] = {}
+        mismatches: List[Dict[str, Any]] = []
+        regressions: List[Dict[str, Any]] = []
+        skipped = 0
+        started = time.monotonic()
+        first_t = None
+
+        for record in records:
+            func = self.tools.get(record["tool"])
+            if func is None:
+                skipped += 1
+                continue
+            if pacing == "original":
+                first_t = record["t"] if first_t is None else first_t
+                delay = (record["t"] - first_t) - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+
+            session_id = self.session_prefix + record["sid"]
+            arguments = dict(record["args"])
+            if arguments.get("since_version", -1) >= 0:
+                arguments["since_version"] = versions.get((record["sid"], arguments["since_version"]), -1)
+            context = SimpleNamespace(session=SimpleNamespace(id=session_id))
+
+            start = time.perf_counter()
+            try:
+                result = func(**arguments, tool_context=context) if _takes_context(func) else func(**arguments)
+            except Exception as e:
+                result = {"status": "error", "message": f"{type(e).__name__}: {e}"}
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            if isinstance(result, dict) and "version" in result and "version" in record:
+                versions[(record["sid"], record["version"])] = result["version"]
+
+            stats = tools.setdefault(record["tool"], {"calls": 0, "mismatches": 0, "regressions": 0,
+                                                      "recorded_ms": [], "replay_ms": []})
+            stats["calls"] += 1
+            stats["recorded_ms"].append(record["ms"])
+            stats["replay_ms"].append(elapsed_ms)
+
+            if record["tool"] not in UNCOMPARED_TOOLS and result_digest(result) != record["digest"]:
+                stats["mismatches"] += 1
+                if len(mismatches) < max_reports:
+                    mismatches.append({"seq": record["seq"], "sid": record["sid"], "tool": record["tool"],
+                                       "args": record["args"], "result": _stable(result)})
+            if (elapsed_ms > record["ms"] * (1 + self.threshold)
+                    and elapsed_ms - record["ms"] > self.min_regression_ms):
+                stats["regressions"] += 1
+                if len(regressions) < max_reports:
+                    regressions.append({"seq": record["seq"], "sid": record["sid"], "tool": record["tool"],
+                                        "recorded_ms": record["ms"], "replay_ms": round(elapsed_ms, 4)})
+
+        summary = {}
+        for tool, stats in tools.items():
+            summary[tool] = {
+                "calls": stats["calls"],
+                "mismatches": stats["mismatches"],
+                "regressions": stats["regressions"],
+                "recorded_p50_ms": _percentile(stats["recorded_ms"], 0.5),
+                "replay_p50_ms": _percentile(stats["replay_ms"], 0.5),
+                "recorded_p95_ms": _percentile(stats["recorded_ms"], 0.95),
+                "replay_p95_ms": _percentile(stats["replay_ms"], 0.95),
+            }
+        return {
+            "status": "success" if not mismatches and not regressions else "regressed",
+            "calls": sum(stats["calls"] for stats in tools.values()),
+            "skipped": skipped,
+            "mismatches": mismatches,
+            "regressions": regressions,
+            "tools": summary,
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def _takes_context(func: Callable) -> bool:
+    return "tool_context" in inspect.signature(func).parameters
@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from game_state import GameState
+
+
+class GameSession:
+    def __init__(self, session_id: str, game_state: GameState):
+        """
+        單一玩家的遊戲會話
+
+        lock 保護這個會話的遊戲狀態；不同會話各自上鎖，可以平行處理。
+        """
+        self.session_id = session_id
+        self.game_state = game_state
+        self.language = "both"  # 故事與說明文字的語言：zh / en / both
+        self.last_turn = None   # 上一回合的詳細結果（情緒分析、音樂憑證 id），需要時才由診斷工具展開
+        self.lock = threading.RLock()
+        self.created_at = time.time()
+        self.last_access = time.monotonic()
+
+
+class SessionRegistry:
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 3600.0,
+                 state_factory: Callable[[], GameState] = GameState,
+                 on_evict: Optional[Callable[[str], None]] = None,
+                 loader: Optional[Callable[[str], Optional[GameSession]]] = None,
+                 on_remove: Optional[Callable[[str], None]] = None):
+        """
+        以 ADK session id 為鍵的執行緒安全會話表
+
+        淘汰只把會話移出記憶體；設定 loader 時，被淘汰的會話下次存取會由 loader 重新載入
+        （例如從持久化記錄重建），不會遺失遊戲進度。
+
+        Args:
+            max_sessions (int): 同時存在的會話上限，超過時淘汰最久未使用的會話
+            ttl_seconds (float): 閒置超過此秒數的會話會被淘汰
+            state_factory (Callable): 建立新遊戲狀態的函式
+            on_evict (Callable): 會話因閒置或容量被移出記憶體後以 session id 呼叫（不持有會話表的鎖）
+            loader (Callable): 記憶體中沒有會話時以 session id 呼叫，回傳已保存的會話（含遊戲狀態與語言）或 None
+            on_remove (Callable): 呼叫 remove() 明確移除會話後以 session id 呼叫（例如從持久化記錄刪除）
+        """
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.state_factory = state_factory
+        self.on_evict = on_evict
+        self.loader = loader
+        self.on_remove = on_remove
+
+        # 會話表的鎖只在查表/插入/淘汰時短暫持有；遊戲邏輯使用各會話自己的鎖，
+        # loader 與通知函式都在鎖外呼叫
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, GameSession]" = OrderedDict()
+
+        self.created = 0
+        self.reloaded = 0
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+
+    def get(self, session_id: str) -> Optional[GameSession]:
+        """取得既有的會話（不建立新會話）；被淘汰的會話由 loader 重新載入"""
+        return self._lookup(session_id, create=False, load=True)
+
+    def get_or_create(self, session_id: str) -> GameSession:
+        """取得會話，不存在時重新載入已保存的遊戲狀態，沒有保存的狀態時建立新的遊戲狀態"""
+        return self._lookup(session_id, create=True, load=True)
+
+    def reset(self, session_id: str, game_state: Optional[GameState] = None) -> GameSession:
+        """
+        重新開始會話的遊戲；既有會話沿用同一把鎖，只替換遊戲狀態
+
+        呼叫端應持有回傳會話的鎖後再讀寫遊戲狀態。
+
+        Args:
+            session_id (str): 會話 id
+            game_state (GameState): 新的遊戲狀態，未指定時以 state_factory 建立
+        """
+        # 舊的遊戲會被取代，不需要從 loader 重新載入
+        session = self._lookup(session_id, create=True, load=False)
+        with session.lock:
+            session.game_state = game_state if game_state is not None else self.state_factory()
+            session.last_turn = None
+        return session
+
+    def restore(self, session_id: str, game_state: GameState) -> GameSession:
+        """放入已還原的遊戲狀態（例如重新啟動時從持久化記錄重建）"""
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._insert(GameSession(session_id, game_state), now, evicted)
+                self.reloaded += 1
+            session.game_state = game_state
+            session.last_access = now
+            self._sessions.move_to_end(session_id)
+        self._notify_evicted(evicted)
+        return session
+
+    def remove(self, session_id: str) -> bool:
+        """移除會話（明確結束的遊戲，會呼叫 on_remove）"""
+        with self._lock:
+            removed = self._sessions.pop(session_id, None) is not None
+        if self.on_remove is not None:
+            # 已被淘汰出記憶體的會話仍可能有保存的狀態，一併通知
+            self.on_remove(session_id)
+        return removed
+
+    def evict_expired(self) -> int:
+        """淘汰所有閒置過久的會話，回傳淘汰數量"""
+        evicted = []
+        with self._lock:
+            self._evict_expired(time.monotonic(), evicted)
+        self._notify_evicted(evicted)
+        return len(evicted)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        """會話表統計"""
+        with self._lock:
+            return {
+                "live_sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "created": self.created,
+                "reloaded": self.reloaded,
+                "evicted_idle": self.evicted_idle,
+                "evicted_capacity": self.evicted_capacity
+            }
+
+    def _lookup(self, session_id: str, create: bool, load: bool) -> Optional[GameSession]:
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            self._evict_expired(now, evicted)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_access = now
+                self._sessions.move_to_end(session_id)
+        self._notify_evicted(evicted)
+        if session is not None:
+            return session
+
+        # 記憶體中沒有：在鎖外載入已保存的會話（可能讀取記錄檔），再放入會話表
+        loaded = self.loader(session_id) if load and self.loader is not None else None
+        if loaded is None and not create:
+            return None
+
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                # 載入期間沒有其他執行緒放入同一個會話
+                session = self._insert(loaded if loaded is not None else GameSession(session_id, self.state_factory()),
+                                       now, evicted)
+                if loaded is not None:
+                    self.reloaded += 1
+                else:
+                    self.created += 1
+            session.last_access = now
+            self._sessions.move_to_end(session_id)
+        self._notify_evicted(evicted)
+        return session
+
+    def _insert(self, session: GameSession, now: float, evicted: list) -> GameSession:
+        # 呼叫端需持有 self._lock；被淘汰的 session id 加入 evicted，由呼叫端在鎖外通知
+        while len(self._sessions) >= self.max_sessions:
+            evicted_id, _ = self._sessions.popitem(last=False)
+            self.evicted_capacity += 1
+            evicted.append(evicted_id)
+        session.last_access = now
+        self._sessions[session.session_id] = session
+        return session
+
+    def _evict_expired(self, now: float, evicted: list) -> None:
+        # 會話依最後存取時間排序，過期的一定在最前面
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_access < self.ttl_seconds:
+                break
+            evicted_id, _ = self._sessions.popitem(last=False)
+            self.evicted_idle += 1
+            evicted.append(evicted_id)
+
+    def _notify_evicted(self, evicted: list) -> None:
+        if self.on_evict is not None:
+            for session_id in evicted:
+                self.on_evict(session_id)
@@ -0,0 +1,156 @@
+"""
+劇本圖：把 scenarios/ 裡的劇本檔編譯成以 (回合, 情緒) 直接查表的故事圖
+
+劇本檔格式 | Scenario format (JSON):
+    {
+      "id": "giant_siege", "title": "...", "max_turns": 3, "opening": "opening",
+      "nodes": {"<node id>": {"text": "文本或逐行的 list", "music": "選用的音樂提示"}},
+      "turns": [{"turn": 1, "branches": [{"emotions": [...], "node": "<node id>"}], "default": "<node id>"}]
+    }
+
+同一回合依序比對分支，第一個包含該情緒的分支生效；沒有分支符合時使用 default。
+文本只在載入時讀取一次，所有會話共用同一份。
+"""
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from localization import split_bilingual, split_table
+
+SCENARIOS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios")
+DEFAULT_SCENARIO_ID = "giant_siege"
+
+
+class StoryNode:
+    __slots__ = ("node_id", "text", "music", "localized")
+
+    def __init__(self, node_id: str, text: str, music: Optional[str] = None):
+        """
+        故事節點
+
+        Args:
+            node_id (str): 節點 id（即 story id）
+            text (str): 中英文雙語故事文本
+            music (str): 進入節點時播放的音樂提示（例如結局音樂）
+        """
+        self.node_id = node_id
+        self.text = text
+        self.music = music
+        # 載入時預先拆好的單一語言版本：{"zh": ..., "en": ..., "both": ...}
+        self.localized = split_bilingual(text)
+
+    def render(self, language: str = "both") -> str:
+        """取得指定語言（zh / en / both）的故事文本"""
+        return self.localized[language]
+
+
+class StoryGraph:
+    def __init__(self, definition: Dict):
+        """
+        編譯劇本定義
+
+        Args:
+            definition (Dict): 劇本檔的內容，格式見模組說明
+
+        Raises:
+            ValueError: 劇本引用了不存在的節點或超出回合數
+        """
+        self.scenario_id = definition["id"]
+        self.title = definition.get("title", self.scenario_id)
+        self.max_turns = int(definition["max_turns"])
+
+        self.nodes: Dict[str, StoryNode] = {}
+        for node_id, node in definition["nodes"].items():
+            text = node["text"]
+            if isinstance(text, list):
+                text = "\n".join(text)
+            self.nodes[node_id] = StoryNode(node_id, text, node.get("music"))
+        # story id -> 文本，供 GameState 組回故事歷史
+        self.texts: Dict[str, str] = {node_id: node.text for node_id, node in self.nodes.items()}
+        # 語言 -> story id -> 文本
+        self.localized_texts: Dict[str, Dict[str, str]] = split_table(self.texts)
+        # 文本 -> story id，讓以文本加入的故事也只保存 id
+        self.text_ids: Dict[str, str] = {text: node_id for node_id, text in self.texts.items()}
+
+        self.opening = self._node(definition["opening"])
+        self._table: Dict[Tuple[int, str], StoryNode] = {}
+        self._defaults: Dict[int, StoryNode] = {}
+        for turn_definition in definition["turns"]:
+            turn = int(turn_definition["turn"])
+            if not 1 <= turn <= self.max_turns:
+                raise ValueError(f"回合超出範圍 | Turn out of range in {self.scenario_id}: {turn}")
+            for branch in turn_definition.get("branches", []):
+                node = self._node(branch["node"])
+                for emotion in branch["emotions"]:
+                    # 先列出的分支優先
+                    self._table.setdefault((turn, emotion), node)
+            if turn_definition.get("default"):
+                self._defaults[turn] = self._node(turn_definition["default"])
+
+    def select(self, turn: int, emotion: str) -> Optional[StoryNode]:
+        """依回合與情緒取得故事節點；回合不在劇本內時回傳 None"""
+        node = self._table.get((turn, emotion))
+        if node is None:
+            node = self._defaults.get(turn)
+        return node
+
+    def music_cues(self, turn: int) -> Dict[str, List[str]]:
+        """某回合各節點的音樂提示 -> 會觸發該節點的情緒"""
+        cues: Dict[str, List[str]] = {}
+        for (node_turn, emotion), node in self._table.items():
+            if node_turn == turn and node.music is not None:
+                cues.setdefault(node.music, []).append(emotion)
+        default = self._defaults.get(turn)
+        if default is not None and default.music is not None:
+            cues.setdefault(default.music, [])
+        return cues
+
+    def _node(self, node_id: str) -> StoryNode:
+        node = self.nodes.get(node_id)
+        if node is None:
+            raise ValueError(f"找不到故事節點 | Story node not found in {self.scenario_id}: {node_id}")
+        return node
+
+
+def load_scenario(path: str) -> StoryGraph:
+    """讀取並編譯劇本檔"""
+    with open(path, encoding="utf-8") as f:
+        return StoryGraph(json.load(f))
+
+
+_scenarios: Dict[str, StoryGraph] = {}
+_scenarios_lock = threading.Lock()
+
+
+def load_scenarios(directory: str = SCENARIOS_DIR) -> Dict[str, StoryGraph]:
+    """載入資料夾裡的所有劇本檔（*.json），已載入的劇本會被取代"""
+    graphs = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".json"):
+            graph = load_scenario(os.path.join(directory, name))
+            graphs[graph.scenario_id] = graph
+    with _scenarios_lock:
+        _scenarios.update(graphs)
+    return graphs
+
+
+def get_scenario(scenario_id: str = DEFAULT_SCENARIO_ID) -> StoryGraph:
+    """
+    取得已載入的劇本；第一次呼叫時載入 scenarios/ 資料夾
+
+    Raises:
+        KeyError: 找不到劇本
+    """
+    if not _scenarios:
+        load_scenarios()
+    graph = _scenarios.get(scenario_id)
+    if graph is None:
+        raise KeyError(f"找不到劇本 | Scenario not found: {scenario_id}")
+    return graph
+
+
+def list_scenarios() -> Dict[str, str]:
+    """已載入的劇本 id -> 標題"""
+    get_scenario()
+    return {scenario_id: graph.title for scenario_id, graph in _scenarios.items()}
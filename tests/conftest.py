@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# 測試直接匯入根目錄的模組；音效一律使用無聲後端
+sys.path.insert(0, ROOT)
+os.environ.setdefault("ADVENTURE_AUDIO_BACKEND", "null")
+
+
+def pytest_collect_directory(path, parent):
+    # 根目錄的 __init__.py 只是資料夾標記，不當成套件匯入
+    if str(path) == ROOT:
+        return pytest.Dir.from_parent(parent, path=path)
+    return None
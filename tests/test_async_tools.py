@@ -0,0 +1,123 @@
+import asyncio
+import contextvars
+import inspect
+import itertools
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from async_tools import ToolExecutor
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+@pytest.fixture
+def executor():
+    executor = ToolExecutor(max_workers=2, max_pending=2)
+    yield executor
+    executor.shutdown()
+
+
+def lookup(name: str, tool_context=None) -> dict:
+    """查詢"""
+    return {"status": "success", "name": name, "thread": threading.current_thread().name,
+            "request": request_id.get()}
+
+
+def test_wrapper_keeps_tool_metadata(executor):
+    wrapped = executor.make_async(lookup)
+    assert wrapped.__name__ == "lookup" and wrapped.__doc__ == "查詢"
+    assert inspect.iscoroutinefunction(wrapped)
+    assert list(inspect.signature(wrapped).parameters) == ["name", "tool_context"]
+
+
+def test_runs_on_pool_with_caller_context(executor):
+    wrapped = executor.make_async(lookup)
+
+    async def main():
+        request_id.set("r-1")
+        return await wrapped("giant")
+
+    result = asyncio.run(main())
+    assert result["name"] == "giant"
+    assert result["thread"].startswith("adventure-tool")
+    assert result["request"] == "r-1"
+    assert executor.stats()["completed"] == 1
+
+
+def test_exceptions_propagate(executor):
+    def broken():
+        raise RuntimeError("bad tool")
+
+    with pytest.raises(RuntimeError, match="bad tool"):
+        asyncio.run(executor.make_async(broken)())
+    assert executor.stats()["pending"] == 0
+
+
+def test_rejects_when_busy(executor):
+    release = threading.Event()
+
+    def blocking():
+        release.wait(2.0)
+        return {"status": "success"}
+
+    wrapped = executor.make_async(blocking)
+
+    async def main():
+        running = [asyncio.ensure_future(wrapped()) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        rejected = await wrapped()
+        release.set()
+        return rejected, await asyncio.gather(*running)
+
+    rejected, done = asyncio.run(main())
+    assert rejected["status"] == "error"
+    assert [result["status"] for result in done] == ["success", "success"]
+    assert executor.stats()["rejected"] == 1
+
+
+def test_cancelled_call_still_completes(executor):
+    started, release, finished = threading.Event(), threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(2.0)
+        finished.set()
+        return {"status": "success"}
+
+    wrapped = executor.make_async(slow)
+
+    async def main():
+        task = asyncio.ensure_future(wrapped())
+        while not started.is_set():
+            await asyncio.sleep(0.005)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert not finished.is_set()
+    release.set()
+    assert finished.wait(2.0)
+    executor.shutdown()
+    stats = executor.stats()
+    assert stats["abandoned"] == 1 and stats["pending"] == 0 and stats["completed"] == 1
+
+
+def test_agent_async_tools_match_sync_tools():
+    from adventure_game_master import agent
+
+    ids = itertools.count()
+    contexts = [SimpleNamespace(session=SimpleNamespace(id=f"async-test-{next(ids)}")) for _ in range(2)]
+    sync_result = [agent.start_game(language="en", tool_context=contexts[0]),
+                   agent.process_user_action("I attack", tool_context=contexts[0])]
+
+    async def main():
+        return [await agent.start_game_async(language="en", tool_context=contexts[1]),
+                await agent.process_user_action_async("I attack", tool_context=contexts[1])]
+
+    async_result = asyncio.run(main())
+    assert async_result[1]["story"] == sync_result[1]["story"]
+    assert async_result[1]["emotion"] == sync_result[1]["emotion"]
+    assert async_result[0]["status"] == sync_result[0]["status"] == "success"
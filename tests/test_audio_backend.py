@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import audio_backend
+from audio_backend import NullBackend, PygameBackend, create_backend
+from music_player import MusicPlayer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def test_env_selects_null_backend(monkeypatch):
+    monkeypatch.setenv("ADVENTURE_AUDIO_BACKEND", "null")
+    assert isinstance(create_backend(), NullBackend)
+
+
+def test_explicit_name_overrides_env(monkeypatch):
+    monkeypatch.setenv("ADVENTURE_AUDIO_BACKEND", "pygame")
+    assert isinstance(create_backend("NULL"), NullBackend)
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        create_backend("alsa")
+
+
+def test_pygame_falls_back_to_null_when_missing(monkeypatch):
+    monkeypatch.setattr(audio_backend.importlib.util, "find_spec", lambda name: None)
+    assert isinstance(create_backend("pygame"), NullBackend)
+
+
+def test_pygame_backend_is_lazy():
+    pytest.importorskip("pygame")
+    backend = create_backend("pygame", crossfade_ms=300)
+    assert isinstance(backend, PygameBackend)
+    # 建立後端時不初始化混音器，也不建立播放引擎
+    assert backend.playback is None and backend.audio_cache is None
+    assert backend.cache_stats()["max_bytes"] == backend.cache_max_bytes
+    backend.stop()
+
+
+def test_pygame_backend_rejects_unknown_curve():
+    with pytest.raises(ValueError):
+        PygameBackend(crossfade_curve="bogus")
+
+
+def test_null_backend_records_cues():
+    backend = NullBackend(max_events=2)
+    backend.set_crossfade(250, "linear")
+    assert backend.play("music/battle_2.mp3", "battle") == {"curve": "linear", "duration_ms": 250}
+    backend.stop()
+    backend.play("music/sad.mp3", "sad")
+
+    events = backend.events()
+    assert [event["action"] for event in events] == ["stop", "play"]
+    assert events[-1]["file"] == "sad.mp3" and events[-1]["emotion"] == "sad"
+    assert not backend.prefetch("music/sad.mp3") and not backend.is_cached("music/sad.mp3")
+    backend.clear_events()
+    assert backend.events() == []
+
+
+def test_music_player_creates_backend_on_first_use():
+    player = MusicPlayer(backend=None)
+    assert player._backend is None
+    result = player.play_music("battle", language="en")
+    assert result["status"] == "success"
+    assert isinstance(player.backend, NullBackend)
+    assert player.backend.events()[-1]["file"] == "battle_2.mp3"
+    assert player.stop_music()["status"] == "success"
+    assert player.get_current_playing() is None
+
+
+def test_null_backend_never_imports_pygame():
+    code = ("import sys; from music_player import MusicPlayer; player = MusicPlayer(); "
+            "assert player.play_music('sad')['status'] == 'success'; "
+            "assert player.get_cache_stats()['hits'] == 0; "
+            "print('pygame' in sys.modules)")
+    env = dict(os.environ, ADVENTURE_AUDIO_BACKEND="null")
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, cwd=ROOT)
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.strip() == "False"
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+import pytest
+
+import audio_cache
+from audio_cache import AudioCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(audio_cache, "time", SimpleNamespace(perf_counter=clock.perf_counter))
+    return clock
+
+
+def make_cache(clock, sizes, max_bytes=100, decode_seconds=None):
+    """sizes: 路徑 -> 解碼後的位元組數；decode_seconds: 路徑 -> 解碼耗時（預設 0.5 秒）"""
+    decoded = []
+
+    def loader(path):
+        decoded.append(path)
+        clock.now += (decode_seconds or {}).get(path, 0.5)
+        return f"audio:{path}"
+
+    return AudioCache(loader, lambda audio: sizes[audio[len("audio:"):]], max_bytes=max_bytes), decoded
+
+
+def test_hits_and_misses(clock):
+    cache, decoded = make_cache(clock, {"a": 10, "b": 10})
+    assert cache.get("a") == "audio:a"
+    assert cache.get("a") == "audio:a"
+    cache.get("b")
+    stats = cache.stats()
+    assert decoded == ["a", "b"]
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+
+
+def test_lru_eviction_respects_byte_budget(clock):
+    cache, decoded = make_cache(clock, {"a": 40, "b": 40, "c": 40})
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")                       # a 變成最近使用
+    cache.get("c")                       # 120 > 100：淘汰最久未使用的 b
+
+    stats = cache.stats()
+    assert stats["cached_tracks"] == ["a", "c"]
+    assert stats["bytes"] == 80 and stats["evictions"] == 1
+    assert not cache.contains("b")
+    cache.get("b")
+    assert decoded == ["a", "b", "c", "b"]
+    assert cache.stats()["bytes"] <= cache.max_bytes
+
+
+def test_track_larger_than_budget_bypasses_cache(clock):
+    cache, decoded = make_cache(clock, {"small": 30, "huge": 500})
+    cache.get("small")
+    assert cache.get("huge") == "audio:huge"
+    assert cache.get("huge") == "audio:huge"
+
+    stats = cache.stats()
+    assert decoded == ["small", "huge", "huge"]
+    assert stats["cached_tracks"] == ["small"]
+    assert stats["bytes"] == 30 and stats["evictions"] == 0
+
+
+def test_decode_time_stats(clock):
+    cache, _ = make_cache(clock, {"a": 10, "b": 10}, decode_seconds={"a": 0.25, "b": 0.75})
+    cache.get("a")
+    cache.get("b")
+    cache.get("a")
+
+    stats = cache.stats()
+    assert stats["decode_count"] == 2
+    assert stats["decode_seconds_total"] == pytest.approx(1.0)
+    assert stats["decode_seconds_avg"] == pytest.approx(0.5)
+    assert cache.last_decode_seconds == {"a": pytest.approx(0.25), "b": pytest.approx(0.75)}
+
+
+def test_prefetch_counts_saved_decode_once(clock):
+    cache, decoded = make_cache(clock, {"a": 10}, decode_seconds={"a": 0.4})
+    assert cache.load("a") is True
+    assert cache.load("a") is False          # 已在快取中，不再解碼
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+
+    cache.get("a")
+    cache.get("a")
+    stats = cache.stats()
+    assert decoded == ["a"]
+    assert stats["prefetch_hits"] == 1
+    assert stats["prefetch_saved_seconds"] == pytest.approx(0.4)
+
+
+def test_clear_keeps_stats(clock):
+    cache, _ = make_cache(clock, {"a": 10})
+    cache.get("a")
+    cache.clear()
+    stats = cache.stats()
+    assert stats["cached_tracks"] == [] and stats["bytes"] == 0
+    assert stats["misses"] == 1 and stats["decode_count"] == 1
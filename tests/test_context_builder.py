@@ -0,0 +1,100 @@
+import copy
+import itertools
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from adventure_game_master import agent
+from context_builder import ContextBuilder, estimate_tokens, payload_tokens
+from game_state import GameState
+
+_ids = itertools.count()
+
+
+def play(state, turns, rng=None):
+    rng = rng or random.Random(0)
+    if not state.story_ids:
+        state.add_story_ref(state.scenario.opening.node_id)
+    emotions = ["battle", "sad", "heroic", "wait_hide", "smile"]
+    for _ in range(turns):
+        state.add_user_action("我要" + "衝鋒" * rng.randint(1, 40) + " and charge " * rng.randint(0, 20))
+        emotion = rng.choice(emotions)
+        state.add_emotion(emotion)
+        state.next_turn()
+        # 超過劇本回合數的長遊戲直接取用劇本裡的節點
+        state.add_story_ref(rng.choice(sorted(state.scenario.nodes)))
+
+
+def long_game(turns):
+    state = GameState()
+    state.max_turns = turns
+    play(state, turns)
+    return state
+
+
+def without_report(context):
+    context = copy.deepcopy(context)
+    del context["token_report"]
+    return context
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("巨人") == 2
+    assert estimate_tokens("abcd") == 1
+
+
+def test_unlimited_budget_keeps_window():
+    state = long_game(6)
+    context = state.get_context(token_budget=0)
+    assert [entry["turn"] for entry in context["recent_turns"]] == [5, 6]
+    assert context["summary"]["summarized_turns"] == 5
+    assert all("story" in entry for entry in context["recent_turns"])
+
+
+@pytest.mark.parametrize("budget", [40, 60, 100, 200, 400, 800, 1200])
+@pytest.mark.parametrize("language", ["zh", "en", "both"])
+def test_context_never_exceeds_budget(budget, language):
+    state = long_game(8)
+    context = ContextBuilder().build(state, language, budget)
+    tokens = payload_tokens(without_report(context))
+    assert tokens <= budget
+    assert context["token_report"]["context_tokens"] == tokens
+    assert context["turn"] == 8
+
+
+def test_newest_entries_are_truncated_last():
+    state = long_game(8)
+    full = ContextBuilder().build(state, "both", 0)
+    budget = payload_tokens(without_report(full)) - 5
+    context = ContextBuilder().build(state, "both", budget)
+    assert payload_tokens(without_report(context)) <= budget
+    # 先拿掉較舊回合的故事，最新一回合的故事仍完整
+    assert "story" not in context["recent_turns"][0]
+    assert context["recent_turns"][-1]["story"] == full["recent_turns"][-1]["story"]
+
+
+def test_incremental_summary_matches_fresh_build():
+    state = GameState()
+    state.max_turns = 10
+    builder = ContextBuilder()
+    rng = random.Random(1)
+    for _ in range(10):
+        play(state, 1, rng)
+        if rng.random() < 0.5:
+            builder.build(state, "en", 0)
+    assert builder.build(state, "en", 0) == ContextBuilder().build(state, "en", 0)
+
+
+def test_process_user_action_does_not_build_context():
+    context = SimpleNamespace(session=SimpleNamespace(id=f"context-test-{next(_ids)}"))
+    agent.start_game(tool_context=context)
+    result = agent.process_user_action("I attack the giant", tool_context=context)
+    assert "context_tokens_saved" not in result
+    session = agent.sessions.get(context.session.id)
+    assert session.game_state._context is None
+
+    story_context = agent.get_story_context(token_budget=80, tool_context=context)
+    assert story_context["status"] == "success"
+    assert story_context["token_report"]["context_tokens"] <= 80
@@ -0,0 +1,93 @@
+import pytest
+
+from emotion_analyzer import EmotionAnalyzer
+from emotion_cache import EmotionCache
+
+
+def result(emotion: str, analysis: str = "x") -> dict:
+    return {"primary_emotion": emotion, "confidence": 0.5, "emotion_scores": {emotion: 1.0},
+            "matched_keywords": {emotion: ["k"]}, "analysis": analysis}
+
+
+@pytest.mark.parametrize("text", ["give  up", "give up", "run\naway", "run away", "life  or death",
+                                  "life or death", "  我要\n\n拔劍  ", "I\tWANT to  HIDE"])
+def test_cached_results_match_uncached(text):
+    uncached = EmotionAnalyzer()
+    cached = EmotionAnalyzer(cache_size=64)
+    expected = uncached.analyze_emotion(text)
+    assert cached.analyze_emotion(text) == expected
+    # 第二次呼叫由快取回傳
+    assert cached.analyze_emotion(text) == expected
+    assert cached.cache_info()["hits"] == 1
+
+
+def test_whitespace_variants_do_not_share_cache_entries():
+    cached = EmotionAnalyzer(cache_size=64)
+    uncached = EmotionAnalyzer()
+    for text in ["give up", "give  up", "GIVE  UP", "give\nup"]:
+        assert cached.analyze_emotion(text) == uncached.analyze_emotion(text)
+
+
+def test_case_variants_share_one_entry():
+    cached = EmotionAnalyzer(cache_size=64)
+    cached.analyze_emotion("Attack")
+    cached.analyze_emotion("ATTACK")
+    info = cached.cache_info()
+    assert info["entries"] == 1
+    assert info["hits"] == 1
+
+
+def test_cached_result_is_a_copy():
+    cached = EmotionAnalyzer(cache_size=64)
+    first = cached.analyze_emotion("attack")
+    first["emotion_scores"].clear()
+    first["primary_emotion"] = "tampered"
+    assert cached.analyze_emotion("attack")["primary_emotion"] != "tampered"
+
+
+def test_language_variants_from_one_entry():
+    cached = EmotionAnalyzer(cache_size=64)
+    both = cached.analyze_emotion("attack")
+    english = cached.analyze_emotion("attack", language="en")
+    assert english["primary_emotion"] == both["primary_emotion"]
+    assert english["analysis"] != both["analysis"]
+    assert cached.analyze_emotion("attack")["analysis"] == both["analysis"]
+
+
+def test_lru_eviction_order():
+    cache = EmotionCache(max_entries=2)
+    cache.put("a", 1, result("battle"))
+    cache.put("b", 1, result("sad"))
+    assert cache.get("a", 1) is not None     # a 變成最近使用
+    cache.put("c", 1, result("smile"))
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 1)["primary_emotion"] == "battle"
+    assert cache.get("c", 1)["primary_emotion"] == "smile"
+    assert cache.info()["evictions"] == 1
+
+
+def test_version_change_invalidates():
+    cache = EmotionCache(max_entries=8)
+    cache.put("a", 1, result("battle"))
+    assert cache.get("a", 2) is None
+    assert cache.info()["invalidations"] == 1
+    assert cache.info()["entries"] == 0
+
+
+def test_memory_budget():
+    cache = EmotionCache(max_entries=100, max_bytes=4000)
+    for index in range(50):
+        cache.put(f"key-{index}", 1, result("battle", "analysis " * 20))
+    info = cache.info()
+    assert 0 < info["entries"] < 50
+    assert info["bytes"] <= 4000
+    # 單筆就超過上限的結果不寫入
+    cache.put("huge", 1, result("battle", "x" * 10000))
+    assert cache.get("huge", 1) is None
+
+
+def test_analyzer_edit_invalidates_cache():
+    cached = EmotionAnalyzer(cache_size=64)
+    assert cached.analyze_emotion("zzqx")["primary_emotion"] == "battle"
+    cached.emotion_keywords = {**cached.emotion_keywords, "smile": cached.emotion_keywords["smile"] + ["zzqx"]}
+    assert cached.analyze_emotion("zzqx")["primary_emotion"] == "smile"
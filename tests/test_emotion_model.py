@@ -0,0 +1,132 @@
+import copy
+import json
+import os
+
+import pytest
+
+from emotion_analyzer import EmotionAnalyzer
+from emotion_model import (ARTIFACT_MAGIC, _HEADER, EmotionModel, compile_lexicon, load_artifact,
+                           write_artifact)
+
+TEXTS = ["attack", "我要拔劍衝向巨人！", "I run away and flee", "give up", "為了保護孩子們，我願意犧牲自己", ""]
+
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = str(tmp_path / "model.bin")
+    write_artifact(EmotionModel.from_analyzer(EmotionAnalyzer()), path)
+    return path
+
+
+def test_artifact_round_trip(artifact):
+    loaded = EmotionAnalyzer(model_path=artifact)
+    builtin = EmotionAnalyzer()
+    for text in TEXTS:
+        assert loaded.analyze_emotion(text) == builtin.analyze_emotion(text)
+    assert loaded.export_lexicon() == builtin.export_lexicon()
+
+
+def test_artifact_payload_is_json(artifact):
+    with open(artifact, "rb") as f:
+        header = f.read(_HEADER.size)
+        payload = f.read()
+    magic, _, length, _ = _HEADER.unpack(header)
+    assert magic == ARTIFACT_MAGIC
+    assert len(payload) == length
+    assert set(json.loads(payload.decode("utf-8"))) == {"definition", "matcher", "keyword_index"}
+
+
+def test_corrupted_artifact_is_rejected(artifact):
+    with open(artifact, "r+b") as f:
+        f.seek(-2, os.SEEK_END)
+        f.write(b"!!")
+    with pytest.raises(ValueError):
+        load_artifact(artifact)
+
+
+@pytest.mark.parametrize("content", [b"", b"short", b"NOTMODEL" + b"\0" * 60])
+def test_invalid_header_is_rejected(tmp_path, content):
+    path = tmp_path / "bad.bin"
+    path.write_bytes(content)
+    with pytest.raises(ValueError):
+        load_artifact(str(path))
+
+
+def test_compile_lexicon_overrides_and_defaults(tmp_path):
+    lexicon = tmp_path / "lexicon.json"
+    lexicon.write_text(json.dumps({"emotion_keywords": {"smile": ["zzqx"], "battle": ["fight"]}}), encoding="utf-8")
+    path = str(tmp_path / "model.bin")
+    assert compile_lexicon(str(lexicon), path)["status"] == "success"
+    analyzer = EmotionAnalyzer(model_path=path)
+    assert analyzer.analyze_emotion("zzqx")["primary_emotion"] == "smile"
+    # 未提供的欄位沿用內建值
+    assert analyzer.emotion_weights == EmotionAnalyzer().emotion_weights
+
+
+def test_hot_reload(tmp_path, artifact):
+    analyzer = EmotionAnalyzer(model_path=artifact)
+    assert analyzer.reload_if_changed()["status"] == "unchanged"
+    assert analyzer.analyze_emotion("zzqx")["primary_emotion"] == "battle"
+
+    updated = EmotionAnalyzer()
+    updated.emotion_keywords = {**updated.emotion_keywords, "smile": updated.emotion_keywords["smile"] + ["zzqx"]}
+    write_artifact(EmotionModel.from_analyzer(updated), artifact)
+    os.utime(artifact, ns=(1, 1))
+    assert analyzer.reload_if_changed()["status"] == "success"
+    assert analyzer.analyze_emotion("zzqx")["primary_emotion"] == "smile"
+
+
+def test_failed_reload_keeps_current_model(artifact):
+    analyzer = EmotionAnalyzer(model_path=artifact)
+    model = analyzer._get_model()
+    with open(artifact, "wb") as f:
+        f.write(b"garbage")
+    assert analyzer.reload_if_changed()["status"] == "error"
+    assert analyzer._get_model() is model
+
+
+def test_model_rebuilt_only_when_lexicon_changes():
+    analyzer = EmotionAnalyzer()
+    model = analyzer._get_model()
+    analyzer.analyze_emotion("attack")
+    assert analyzer._get_model() is model
+
+    analyzer.emotion_weights = {**analyzer.emotion_weights, "smile": 5.0}
+    rebuilt = analyzer._get_model()
+    assert rebuilt is not model
+    assert rebuilt.weight("smile") == 5.0
+
+
+def test_in_place_edit_rebuilds_model():
+    analyzer = EmotionAnalyzer()
+    analyzer.analyze_emotion("zzqx")
+    analyzer.emotion_keywords["smile"].append("zzqx")
+    assert analyzer.analyze_emotion("zzqx")["primary_emotion"] == "smile"
+
+
+def test_in_place_weight_edit_invalidates_cache():
+    analyzer = EmotionAnalyzer(cache_size=16)
+    assert analyzer.analyze_emotion("attack")["emotion_scores"]["battle"] == 1.0
+    analyzer.emotion_weights["battle"] = 5.0
+    assert analyzer.analyze_emotion("attack")["emotion_scores"]["battle"] == 5.0
+    analyzer.emotion_keywords.update({"smile": ["attack"]})
+    assert "smile" in analyzer.analyze_emotion("attack")["emotion_scores"]
+    del analyzer.emotion_keywords["smile"][0]
+    assert "smile" not in analyzer.analyze_emotion("attack")["emotion_scores"]
+
+
+def test_nested_lexicon_values_are_tracked():
+    analyzer = EmotionAnalyzer()
+    model = analyzer._get_model()
+    analyzer.emotion_keywords["custom"] = ["zzqx"]
+    analyzer.emotion_keywords["custom"].append("qqzx")
+    rebuilt = analyzer._get_model()
+    assert rebuilt is not model
+    assert ("custom", ("zzqx", "qqzx")) in rebuilt.lexicon
+    assert type(copy.deepcopy(analyzer.emotion_keywords)) is dict
+
+
+def test_model_is_immutable():
+    model = EmotionAnalyzer()._get_model()
+    with pytest.raises(AttributeError):
+        model.weights = ()
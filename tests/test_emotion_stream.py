@@ -0,0 +1,81 @@
+import pytest
+
+from emotion_analyzer import EmotionAnalyzer
+from emotion_stream import EmotionStream
+from keyword_matcher import KeywordMatcher
+
+TEXTS = ["我要拔劍衝向巨人！", "I want to hide and wait", "為了保護孩子們，我願意犧牲自己",
+         "I smile and hope for a peaceful ending", "I am so scared, I run away and flee", "attack attack attack"]
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return EmotionAnalyzer()
+
+
+def feed_chunks(stream: EmotionStream, text: str, size: int):
+    for start in range(0, len(text), size):
+        stream.feed(text[start:start + size])
+
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1000])
+def test_chunked_matches_whole_text(analyzer, text, size):
+    stream = EmotionStream(analyzer)
+    feed_chunks(stream, text, size)
+    expected = analyzer.analyze_emotion(text)
+    result = stream.result()
+    assert result["primary_emotion"] == expected["primary_emotion"]
+    assert result["confidence"] == expected["confidence"]
+    assert result["emotion_scores"] == expected["emotion_scores"]
+    assert stream.chars_fed == len(text)
+
+
+def test_keyword_split_across_chunks(analyzer):
+    stream = EmotionStream(analyzer)
+    stream.feed("I will att")
+    assert "attack" not in stream.matched_counts()
+    stream.feed("ack now")
+    assert stream.matched_counts()["attack"] == 1
+
+
+def test_counts_repeat_occurrences(analyzer):
+    stream = EmotionStream(analyzer)
+    stream.feed("attack ")
+    stream.feed("ATTACK")
+    assert stream.matched_counts()["attack"] == 2
+
+
+def test_empty_and_blank_input(analyzer):
+    stream = EmotionStream(analyzer)
+    assert stream.feed("") == 0
+    stream.feed("   \n")
+    assert stream.current_emotion() == "intro"
+
+
+def test_reset(analyzer):
+    stream = EmotionStream(analyzer)
+    stream.feed("attack")
+    stream.reset()
+    assert stream.keyword_counts == {}
+    assert stream.chars_fed == 0
+    assert stream.current_emotion() == "intro"
+
+
+def test_stream_keeps_model_after_lexicon_change():
+    analyzer = EmotionAnalyzer()
+    stream = EmotionStream(analyzer)
+    analyzer.emotion_keywords["smile"].append("zzqx")
+    stream.feed("zzqx")
+    assert stream.current_emotion() == "battle"
+    assert analyzer.analyze_emotion("zzqx")["primary_emotion"] == "smile"
+
+
+def test_matcher_overlapping_patterns():
+    matcher = KeywordMatcher(["he", "she", "his", "hers"])
+    found = {matcher.patterns[pattern_id] for pattern_id in matcher.find("ushers")}
+    assert found == {"he", "she", "hers"}
+    state, counts = matcher.count("ush")
+    state, counts = matcher.count("ers", state, counts)
+    assert {matcher.patterns[pattern_id]: count for pattern_id, count in counts.items()} == \
+        {"she": 1, "he": 1, "hers": 1}
@@ -0,0 +1,244 @@
+import itertools
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import game_persistence
+from adventure_game_master import agent
+from game_persistence import GameJournal, rebuild_state
+from story_graph import get_scenario
+
+_ids = itertools.count()
+
+
+def play(journal, session_id, turns):
+    scenario = get_scenario()
+    journal.record_start(session_id, scenario.scenario_id)
+    for turn, (action, emotion) in enumerate(turns, start=1):
+        node = scenario.select(turn, emotion)
+        journal.record_turn(session_id, action, emotion, node.node_id if node else None)
+
+
+def journal_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.startswith("journal-"))
+
+
+def test_unknown_durability_mode(tmp_path):
+    with pytest.raises(ValueError):
+        GameJournal(str(tmp_path), durability="sometimes")
+
+
+@pytest.mark.parametrize("durability", ["group", "async", "off"])
+def test_recovery_replays_journal(tmp_path, durability):
+    journal = GameJournal(str(tmp_path), durability=durability)
+    play(journal, "a", [("attack", "battle"), ("run", "retreat")])
+    play(journal, "b", [("hide", "wait_hide")])
+    expected = journal.sessions()
+    journal.close()
+
+    recovered = GameJournal(str(tmp_path))
+    try:
+        assert recovered.sessions() == expected
+        assert recovered.recovery["replayed_records"] == 5
+        state = recovered.rebuild("a")
+        assert state.user_actions == ["attack", "run"]
+        assert state.emotion_history == ["battle", "retreat"]
+        assert state.current_turn == 2
+        assert recovered.rebuild("missing") is None
+    finally:
+        recovered.close()
+
+
+def test_torn_tail_is_truncated(tmp_path):
+    journal = GameJournal(str(tmp_path))
+    play(journal, "a", [("attack", "battle")])
+    journal.close()
+
+    path = os.path.join(str(tmp_path), journal_files(str(tmp_path))[-1])
+    intact = os.path.getsize(path)
+    with open(path, "ab") as f:
+        f.write(b'{"op":"turn","session":"a","action":"ru')     # 寫到一半中斷
+
+    recovered = GameJournal(str(tmp_path))
+    try:
+        assert os.path.getsize(path) == intact
+        assert [turn[:2] for turn in recovered.sessions()["a"]["turns"]] == [["attack", "battle"]]
+        # 截斷後的新記錄不會接在殘缺的行後面
+        recovered.record_turn("a", "run", "retreat", None)
+    finally:
+        recovered.close()
+
+    again = GameJournal(str(tmp_path))
+    try:
+        assert [turn[0] for turn in again.sessions()["a"]["turns"]] == ["attack", "run"]
+    finally:
+        again.close()
+
+
+def test_corrupt_line_stops_replay(tmp_path):
+    journal = GameJournal(str(tmp_path))
+    play(journal, "a", [("attack", "battle")])
+    journal.close()
+    path = os.path.join(str(tmp_path), journal_files(str(tmp_path))[-1])
+    with open(path, "ab") as f:
+        f.write(b"not json\n")
+        f.write(json.dumps({"op": "drop", "session": "a", "seq": 99}).encode() + b"\n")
+
+    recovered = GameJournal(str(tmp_path))
+    try:
+        assert "a" in recovered.sessions()
+    finally:
+        recovered.close()
+
+
+def test_snapshot_compacts_journal(tmp_path):
+    journal = GameJournal(str(tmp_path), snapshot_every=4)
+    play(journal, "a", [("attack", "battle"), ("run", "retreat")])
+    assert journal.snapshot(timeout=2.0)
+    play(journal, "b", [("hide", "wait_hide")])
+    expected = journal.sessions()
+    journal.close()
+
+    # 快照涵蓋的記錄檔已刪除，只剩快照之後的記錄
+    assert os.path.exists(os.path.join(str(tmp_path), "snapshot.json"))
+    assert len(journal_files(str(tmp_path))) == 1
+
+    recovered = GameJournal(str(tmp_path))
+    try:
+        assert recovered.sessions() == expected
+        assert recovered.recovery["snapshot_sessions"] == 1
+        assert recovered.recovery["replayed_records"] == 2
+    finally:
+        recovered.close()
+
+
+def test_drop_removes_session_on_recovery(tmp_path):
+    journal = GameJournal(str(tmp_path))
+    play(journal, "a", [("attack", "battle")])
+    play(journal, "b", [("hide", "wait_hide")])
+    journal.record_drop("a")
+    journal.record_drop("unknown")          # 沒有記錄的會話不寫入
+    journal.flush(timeout=2.0)
+    assert journal.stats()["last_seq"] == 5
+    journal.close()
+
+    recovered = GameJournal(str(tmp_path))
+    try:
+        assert sorted(recovered.sessions()) == ["b"]
+    finally:
+        recovered.close()
+
+
+def test_group_commit_shares_fsync(tmp_path):
+    journal = GameJournal(str(tmp_path), durability="group")
+    try:
+        play(journal, "a", [("attack", "battle")])
+        stats = journal.stats()
+        assert stats["durable_seq"] == stats["last_seq"] == 2
+        assert stats["fsyncs"] <= 2
+    finally:
+        journal.close()
+
+
+def test_closed_journal_rejects_records(tmp_path):
+    journal = GameJournal(str(tmp_path))
+    journal.close()
+    with pytest.raises(RuntimeError):
+        journal.record_start("a")
+
+
+def test_rebuild_state_matches_live_game():
+    scenario = get_scenario()
+    node = scenario.select(1, "battle")
+    record = {"scenario": scenario.scenario_id, "opening": True, "turns": [["attack", "battle", node.node_id]]}
+    state = rebuild_state(record)
+    assert state.story_ids == [scenario.opening.node_id, node.node_id]
+    assert state.user_actions == ["attack"]
+
+
+def test_language_survives_rebuild(tmp_path):
+    journal = GameJournal(str(tmp_path))
+    journal.record_start("a", language="zh")
+    journal.record_turn("a", "attack", "battle", None)
+    journal.record_language("a", "en")
+    journal.record_language("unknown", "en")   # 沒有記錄的會話不寫入
+    journal.close()
+
+    recovered = GameJournal(str(tmp_path))
+    try:
+        session = recovered.load_session("a")
+        assert session.session_id == "a" and session.language == "en"
+        assert session.game_state.user_actions == ["attack"]
+        assert recovered.load_session("unknown") is None
+    finally:
+        recovered.close()
+
+
+def test_idle_sessions_expire_with_drop_records(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(game_persistence, "time", SimpleNamespace(time=lambda: now[0], monotonic=time.monotonic,
+                                                                  perf_counter=time.perf_counter))
+    journal = GameJournal(str(tmp_path), ttl_seconds=60)
+    play(journal, "a", [("attack", "battle")])
+    now[0] += 30
+    play(journal, "b", [("hide", "wait_hide")])
+    now[0] += 40                               # a 閒置 70 秒，b 閒置 40 秒
+    journal.record_turn("b", "run", "retreat", None)
+    assert sorted(journal.sessions()) == ["b"]
+    assert journal.stats()["expired"] == 1
+    journal.close()
+
+    # drop 記錄寫入記錄檔，重播得到相同的結果；停機期間過期的會話在開啟時捨棄
+    recovered = GameJournal(str(tmp_path), ttl_seconds=60)
+    assert sorted(recovered.sessions()) == ["b"]
+    recovered.close()
+    now[0] += 120
+    later = GameJournal(str(tmp_path), ttl_seconds=60)
+    try:
+        assert later.sessions() == {}
+    finally:
+        later.close()
+
+
+def test_session_cap_drops_least_recently_updated(tmp_path):
+    journal = GameJournal(str(tmp_path), durability="off", max_sessions=2, snapshot_every=5)
+    try:
+        for session_id in ("a", "b", "c"):
+            play(journal, session_id, [("attack", "battle")])
+        journal.record_turn("b", "run", "retreat", None)
+        play(journal, "d", [("hide", "wait_hide")])
+        assert sorted(journal.sessions()) == ["b", "d"]
+        assert journal.snapshot(timeout=2.0)
+        with open(os.path.join(str(tmp_path), "snapshot.json"), encoding="utf-8") as f:
+            assert sorted(json.load(f)["sessions"]) == ["b", "d"]
+    finally:
+        journal.close()
+
+
+def test_agent_journals_language_and_drops_finished_games(tmp_path, monkeypatch):
+    journal = GameJournal(str(tmp_path), durability="off")
+    monkeypatch.setattr(agent, "game_journal", journal)
+    monkeypatch.setattr(agent, "sessions", agent.open_registry(journal))
+    session_id = f"journal-test-{next(_ids)}"
+    context = SimpleNamespace(session=SimpleNamespace(id=session_id))
+    try:
+        agent.start_game(tool_context=context)
+        agent.set_language("en", tool_context=context)
+        agent.process_user_action("I attack the giant", tool_context=context)
+
+        # 新的會話表：會話不在記憶體中，下次存取由記錄檔重建
+        monkeypatch.setattr(agent, "sessions", agent.open_registry(journal))
+        details = agent.get_turn_details(tool_context=context)
+        assert details["status"] == "success" and details["turn"] == 1
+        assert details["emotion_analysis"]["primary_emotion"] == "battle"
+        assert details["music_status"]["status"] == "error"
+        assert agent.sessions.get(session_id).language == "en"
+
+        while not agent.process_user_action("I attack again", tool_context=context)["game_over"]:
+            pass
+        assert session_id not in journal.sessions()
+    finally:
+        journal.close()
@@ -0,0 +1,89 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from game_server import HashRing, worker_record_file
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+SERVER_SCRIPT = """
+import json, os, sys
+from game_server import GameServer
+with GameServer(workers=2) as server:
+    sessions = [f"player-{index}" for index in range(8)]
+    for session_id in sessions:
+        server.call(session_id, "start_game")
+        server.call(session_id, "process_user_action", user_action="I attack the giant")
+    owners = {session_id: server.worker_for(session_id) for session_id in sessions}
+    worker_backends = {server.call(session_id, "get_music_info")["audio_backend"] for session_id in sessions}
+print(json.dumps({"owners": owners, "backend": os.environ.get("ADVENTURE_AUDIO_BACKEND"),
+                  "record_env": os.environ.get("ADVENTURE_RECORD_FILE"), "worker_backends": sorted(worker_backends)}))
+"""
+
+PLAYED_SCRIPT = """
+from adventure_game_master import agent
+from game_server import GameServer
+agent.music_player.backend          # 父程序已建立 pygame 後端
+try:
+    GameServer(workers=1).start()
+except RuntimeError as e:
+    print("refused", "pygame" in str(e))
+"""
+
+
+def test_hash_ring_is_stable_and_spreads_keys():
+    ring = HashRing([0, 1, 2, 3])
+    keys = [f"session-{index}" for index in range(2000)]
+    owners = [ring.node_for(key) for key in keys]
+    assert owners == [HashRing([0, 1, 2, 3]).node_for(key) for key in keys]
+    assert all(owners.count(node) > 300 for node in range(4))
+    # 增加一個 worker 只移動一部分的會話
+    grown = HashRing([0, 1, 2, 3, 4])
+    moved = sum(1 for key, owner in zip(keys, owners) if grown.node_for(key) != owner)
+    assert moved < len(keys) * 0.35
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("sessions.jsonl", "sessions.worker-3.jsonl"),
+    ("/tmp/rec/calls", "/tmp/rec/calls.worker-3.jsonl"),
+])
+def test_worker_record_file(path, expected):
+    assert worker_record_file(path, 3) == expected
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="需要 fork")
+def test_each_worker_records_its_own_sessions(tmp_path):
+    record_file = str(tmp_path / "sessions.jsonl")
+    env = dict(os.environ, ADVENTURE_RECORD_FILE=record_file, ADVENTURE_AUDIO_BACKEND="pygame")
+    env.pop("ADVENTURE_STATE_DIR", None)
+    completed = subprocess.run([sys.executable, "-c", SERVER_SCRIPT], capture_output=True, text=True,
+                               env=env, cwd=ROOT, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+    # worker 使用 null 後端；伺服器結束後呼叫端的環境變數不變
+    assert report["worker_backends"] == ["null"]
+    assert report["backend"] == "pygame"
+    assert report["record_env"] == record_file
+    assert not os.path.exists(record_file)
+
+    for worker in (0, 1):
+        with open(worker_record_file(record_file, worker), encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        # 每個 worker 的序號從 1 連續遞增，只包含分配給它的會話（get_music_info 沒有會話）
+        assert [record["seq"] for record in records] == list(range(1, len(records) + 1))
+        assert {report["owners"][record["sid"]] for record in records if record["tool"] != "get_music_info"} == {worker}
+        assert [record["t"] for record in records] == sorted(record["t"] for record in records)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="需要 fork")
+def test_start_refuses_parent_audio_backend():
+    env = dict(os.environ, ADVENTURE_AUDIO_BACKEND="pygame")
+    env.pop("ADVENTURE_STATE_DIR", None)
+    env.pop("ADVENTURE_RECORD_FILE", None)
+    completed = subprocess.run([sys.executable, "-c", PLAYED_SCRIPT], capture_output=True, text=True,
+                               env=env, cwd=ROOT, timeout=120)
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.split()[-2:] == ["refused", "True"]
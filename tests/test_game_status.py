@@ -0,0 +1,127 @@
+import itertools
+from types import SimpleNamespace
+
+import pytest
+
+import game_state
+from adventure_game_master import agent
+from game_state import GameState
+
+_ids = itertools.count()
+
+
+@pytest.fixture
+def context():
+    return SimpleNamespace(session=SimpleNamespace(id=f"status-test-{next(_ids)}"))
+
+
+def test_version_counts_changes():
+    state = GameState()
+    start = state.version
+    state.add_story_ref(state.scenario.opening.node_id)
+    state.add_user_action("attack")
+    state.add_emotion("battle")
+    state.next_turn()
+    assert state.version == start + 4
+
+
+def test_entries_since_returns_only_new_items():
+    state = GameState()
+    state.add_story_ref(state.scenario.opening.node_id)
+    seen = state.version
+    state.add_user_action("attack")
+    state.add_emotion("battle")
+    state.next_turn()
+    state.add_story("a custom story")
+
+    stories, actions = state.entries_since(seen)
+    assert stories == ["a custom story"]
+    assert actions == ["attack"]
+    assert state.entries_since(state.version) == ([], [])
+
+
+def test_entries_since_decodes_only_new_entries(monkeypatch):
+    state = GameState()
+    for turn in range(50):
+        state.add_story_ref(state.scenario.opening.node_id)
+        state.add_user_action(f"action {turn}")
+        state.next_turn()
+    seen = state.version
+    state.add_story_ref(state.scenario.opening.node_id)
+    state.add_user_action("last")
+
+    decoded = []
+    decode = game_state.STORY_CODES.decode
+    monkeypatch.setattr(game_state.STORY_CODES, "decode", lambda code: decoded.append(code) or decode(code))
+    stories, actions = state.entries_since(seen)
+    assert len(stories) == 1 and actions == ["last"]
+    assert len(decoded) == 1
+
+
+def test_history_round_trips_through_the_event_log():
+    state = GameState()
+    long_action = "衝" * 5000          # UTF-8 超過 16 位元可表示的長度
+    state.add_story_ref(state.scenario.opening.node_id)
+    for action, emotion in (("我要攻擊", "battle"), (long_action, "charge"), ("hide", "wait_hide")):
+        state.add_user_action(action)
+        state.add_emotion(emotion)
+        state.next_turn()
+        state.add_story(f"story after {emotion}")
+
+    assert state.user_actions == ["我要攻擊", long_action, "hide"]
+    assert state.emotion_history == ["battle", "charge", "wait_hide"]
+    assert state.current_emotion == "wait_hide"
+    assert state.story_history[1:] == ["story after battle", "story after charge", "story after wait_hide"]
+    assert state.story_ids == [state.scenario.opening.node_id, None, None, None]
+    assert [entry[:3] for entry in state.turn_entries(2)] == [[2, long_action, "charge"], [3, "hide", "wait_hide"]]
+
+
+def test_versions_from_another_game_are_rejected():
+    old, new = GameState(), GameState()
+    old.add_user_action("attack")
+    assert new.entries_since(old.version) is None
+    assert new.entries_since(new.version + 1) is None
+
+
+def test_status_delta_matches_full_status(context):
+    agent.start_game(language="en", tool_context=context)
+    first = agent.get_game_status(tool_context=context)
+    assert first["delta"] is False
+
+    agent.process_user_action("I attack the giant", tool_context=context)
+    delta = agent.get_game_status(since_version=first["version"], tool_context=context)
+    full = agent.get_game_status(tool_context=context)
+
+    assert delta["delta"] is True
+    assert delta["version"] == full["version"] > first["version"]
+    assert first["story_history"] + delta["story_history"] == full["story_history"]
+    assert first["user_actions"] + delta["user_actions"] == full["user_actions"] == ["I attack the giant"]
+
+
+def test_restart_returns_full_status(context):
+    agent.start_game(tool_context=context)
+    agent.process_user_action("attack", tool_context=context)
+    old = agent.get_game_status(tool_context=context)
+    agent.start_game(tool_context=context)
+
+    status = agent.get_game_status(since_version=old["version"], tool_context=context)
+    assert status["delta"] is False
+    assert status["user_actions"] == []
+    assert len(status["story_history"]) == 1
+
+
+def test_fields_and_emotions_etag(context):
+    agent.start_game(tool_context=context)
+    status = agent.get_game_status(fields="current_turn, available_emotions", tool_context=context)
+    assert set(status) == {"version", "delta", "current_turn", "available_emotions", "emotions_etag"}
+
+    again = agent.get_game_status(fields="available_emotions", emotions_etag_seen=status["emotions_etag"],
+                                  tool_context=context)
+    assert "available_emotions" not in again
+    assert again["emotions_etag"] == status["emotions_etag"]
+
+
+def test_unknown_field(context):
+    result = agent.get_game_status(fields="current_turn,secret", tool_context=context)
+    assert result["status"] == "error"
+    assert "secret" in result["message"]
@@ -0,0 +1,68 @@
+import pytest
+
+from emotion_analyzer import EmotionAnalyzer
+from localization import LANGUAGES, split_bilingual, split_line, split_table
+from music_player import MusicPlayer
+from story_graph import get_scenario
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("巨人來了！| The giants are coming!", ("巨人來了！", "The giants are coming!")),
+    ("🏰 === 文字冒險遊戲 | Text Adventure Game ===", ("🏰 === 文字冒險遊戲 ===", "🏰 === Text Adventure Game ===")),
+    ("（請描述你的行動）", ("（請描述你的行動）", None)),
+    ("(Please describe your action)", (None, "(Please describe your action)")),
+    ("", ("", "")),
+    ("---", ("---", "---")),
+])
+def test_split_line(line, expected):
+    assert split_line(line) == expected
+
+
+def test_split_bilingual_keeps_original_as_both():
+    text = "第一行 | First line\n只有中文\nEnglish only\n"
+    parts = split_bilingual(text)
+    assert parts == {"zh": "第一行\n只有中文\n", "en": "First line\nEnglish only\n", "both": text}
+
+
+def test_split_table():
+    table = split_table({"a": "甲 | A", "b": "乙 | B"})
+    assert set(table) == set(LANGUAGES)
+    assert table["zh"] == {"a": "甲", "b": "乙"}
+    assert table["en"] == {"a": "A", "b": "B"}
+
+
+def test_story_nodes_have_no_other_language():
+    scenario = get_scenario()
+    for node in scenario.nodes.values():
+        assert not any("一" <= char <= "鿿" for char in node.render("en")), node.node_id
+        assert "|" not in node.render("zh")
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return EmotionAnalyzer(cache_size=16)
+
+
+@pytest.mark.parametrize("text", ["I attack the giant!", "我要逃跑", "   "])
+def test_analysis_follows_language(analyzer, text):
+    results = {language: analyzer.analyze_emotion(text, language) for language in LANGUAGES}
+    assert "|" not in results["en"]["analysis"]
+    assert not any("一" <= char <= "鿿" for char in results["en"]["analysis"])
+    assert "|" not in results["zh"]["analysis"]
+    assert "|" in results["both"]["analysis"]
+    primary = {result["primary_emotion"] for result in results.values()}
+    assert len(primary) == 1
+
+
+def test_cached_result_is_not_changed_by_language(analyzer):
+    analyzer.analyze_emotion("fight the giant", "en")
+    both = analyzer.analyze_emotion("fight the giant", "both")
+    assert "|" in both["analysis"]
+
+
+def test_music_description_language():
+    player = MusicPlayer()
+    result = player.play_music("battle", "en")
+    assert result["status"] == "success"
+    assert "|" not in result["description"]
+    assert player.describe(result["file"], "zh") in player.describe(result["file"], "both")
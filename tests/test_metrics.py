@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from metrics import (BUCKET_COUNT, SUB_BUCKETS, LatencyHistogram, MetricsRegistry, _bucket_index,
+                     _bucket_range)
+
+
+def test_bucket_boundaries():
+    # 小於 SUB_BUCKETS 的值各自一格
+    for value in range(SUB_BUCKETS):
+        assert _bucket_index(value) == value
+        assert _bucket_range(value) == (value, value)
+    # 之後的格子首尾相接，每個值都落在自己格子的範圍內
+    previous_upper = SUB_BUCKETS - 1
+    for index in range(SUB_BUCKETS, BUCKET_COUNT):
+        lower, upper = _bucket_range(index)
+        assert lower == previous_upper + 1 and upper >= lower
+        assert _bucket_index(lower) == _bucket_index(upper) == index
+        previous_upper = upper
+    assert _bucket_index(2 ** 60) == BUCKET_COUNT - 1
+
+
+def test_percentiles_within_relative_error():
+    rng = random.Random(7)
+    values = sorted(int(rng.lognormvariate(8, 1.5)) for _ in range(20000))
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    for quantile in (0.5, 0.9, 0.99, 0.999):
+        exact = values[max(0, int(quantile * len(values) + 0.999999) - 1)]
+        assert histogram.percentile(quantile) == pytest.approx(exact, rel=0.035)
+    assert histogram.percentile(1.0) <= histogram.max_us == values[-1]
+    assert LatencyHistogram().percentile(0.5) == 0
+
+
+def test_timed_counts_calls_errors_and_error_results():
+    registry = MetricsRegistry()
+
+    @registry.timed("tool")
+    def tool(outcome):
+        if outcome == "raise":
+            raise ValueError(outcome)
+        return {"status": outcome}
+
+    tool("success")
+    tool("error")
+    with pytest.raises(ValueError):
+        tool("raise")
+    with registry.timer("block"):
+        pass
+    with pytest.raises(KeyError):
+        with registry.timer("block"):
+            raise KeyError("x")
+
+    snapshot = registry.snapshot()
+    assert (snapshot["tool"]["calls"], snapshot["tool"]["errors"]) == (3, 2)
+    assert (snapshot["block"]["calls"], snapshot["block"]["errors"]) == (2, 1)
+    assert tool.__name__ == "tool"
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    registry.timed("tool")(lambda: None)()
+    registry.record("direct", 0.5)
+    assert registry.snapshot() == {}
+
+
+def test_prometheus_text(tmp_path):
+    registry = MetricsRegistry()
+    registry.record("tool.start_game", 0.002)
+    registry.record("tool.start_game", 0.004, error=True)
+    registry.record('odd"name', 0.001)
+
+    text = registry.to_prometheus(quantiles=(0.5,))
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    assert "# TYPE adventure_calls_total counter" in lines
+    assert "# TYPE adventure_call_latency_seconds summary" in lines
+    assert 'adventure_calls_total{name="tool.start_game"} 2' in lines
+    assert 'adventure_errors_total{name="tool.start_game"} 1' in lines
+    assert 'adventure_calls_total{name="odd\\"name"} 1' in lines
+    assert 'adventure_call_latency_seconds_count{name="tool.start_game"} 2' in lines
+    assert 'adventure_call_latency_seconds_sum{name="tool.start_game"} 0.006000' in lines
+    median = next(line for line in lines
+                  if line.startswith('adventure_call_latency_seconds{name="tool.start_game",quantile="0.5"}'))
+    assert float(median.split()[-1]) == pytest.approx(0.002, rel=0.035)
+
+    path = registry.write_prometheus(str(tmp_path / "metrics.prom"))
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == registry.to_prometheus()
+    assert not (tmp_path / "metrics.prom.tmp").exists()
+
+
+def test_reset_keeps_decorated_functions_recording():
+    registry = MetricsRegistry()
+    tool = registry.timed("tool")(lambda: None)
+    tool()
+    registry.reset()
+    assert registry.snapshot() == {}
+    tool()
+    assert registry.snapshot()["tool"]["calls"] == 1
@@ -0,0 +1,124 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from adventure_game_master import agent
+from audio_cache import AudioCache
+from game_state import GameState
+from music_prefetcher import MusicPrefetcher, rank_by_history
+
+
+class FakePlayer:
+    """以真的 AudioCache 模擬播放器；gate 未設定時解碼會卡住，用來控制同時進行的預先載入"""
+
+    def __init__(self, known=("battle", "sad", "victory", "peaceful")):
+        self.known = set(known)
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = []
+        self.backend = SimpleNamespace(supports_prefetch=True)
+
+        def loader(path):
+            self.started.append(path)
+            self.gate.wait(2.0)
+            time.sleep(0.01)
+            return path
+
+        self.cache = AudioCache(loader, lambda audio: 1, max_bytes=100)
+
+    def resolve_music_path(self, emotion):
+        return f"music/{emotion}.mp3" if emotion in self.known else None
+
+    def is_cached(self, music_path):
+        return self.cache.contains(music_path)
+
+    def prefetch(self, emotion):
+        return self.cache.load(self.resolve_music_path(emotion))
+
+    def get_cache_stats(self):
+        return self.cache.stats()
+
+
+@pytest.fixture
+def player():
+    return FakePlayer()
+
+
+@pytest.fixture
+def prefetcher(player):
+    prefetcher = MusicPrefetcher(player, max_concurrent=2)
+    yield prefetcher
+    player.gate.set()
+    prefetcher.shutdown()
+
+
+def test_rank_by_frequency_then_recency():
+    history = ["sad", "battle", "sad", "charge", "battle"]
+    ranked = rank_by_history(history, ["peaceful", "charge", "battle", "sad", "charge"])
+    # battle 與 sad 都出現兩次，battle 較近期；沒出現過的維持原順序
+    assert ranked == ["battle", "sad", "charge", "peaceful"]
+
+
+def test_prefetch_caps_concurrency_and_skips_in_flight(player, prefetcher):
+    player.gate.clear()
+    assert prefetcher.prefetch(["battle", "sad", "victory"]) == ["battle", "sad"]
+    assert prefetcher.prefetch(["battle", "sad"]) == []        # 正在載入，不重複排程
+    stats = prefetcher.get_stats()
+    assert stats["scheduled"] == 2 and stats["skipped_over_limit"] == 1
+    assert stats["in_flight"] == 2
+
+    player.gate.set()
+    assert prefetcher.wait_idle(timeout=2.0)
+    assert sorted(player.started) == ["music/battle.mp3", "music/sad.mp3"]
+    assert prefetcher.prefetch(["battle", "unknown", "victory"]) == ["victory"]   # 已快取與沒有音樂的略過
+    assert prefetcher.wait_idle(timeout=2.0)
+    stats = prefetcher.get_stats()
+    assert stats["completed"] == 3 and stats["in_flight"] == 0 and stats["failed"] == 0
+
+
+def test_saved_latency_counts_prefetched_tracks(player, prefetcher):
+    prefetcher.prefetch(["battle"])
+    assert prefetcher.wait_idle(timeout=2.0)
+    player.cache.get("music/battle.mp3")          # 播放時命中預先載入的音樂
+    player.cache.get("music/battle.mp3")          # 第二次命中不再計入
+    player.cache.get("music/sad.mp3")             # 沒有預先載入
+
+    stats = prefetcher.get_stats()
+    assert stats["prefetch_hits"] == 1
+    assert 0 < stats["saved_switch_seconds"] == pytest.approx(player.cache.last_decode_seconds["music/battle.mp3"])
+
+
+def test_failed_prefetch_is_counted(player, prefetcher):
+    player.prefetch = lambda emotion: 1 / 0
+    prefetcher.prefetch(["battle"])
+    assert prefetcher.wait_idle(timeout=2.0)
+    assert prefetcher.get_stats()["failed"] == 1
+
+
+def test_backend_without_prefetch_schedules_nothing(player, prefetcher):
+    player.backend.supports_prefetch = False
+    assert prefetcher.prefetch(["battle"]) == []
+
+
+def test_predict_next_music_ranks_history():
+    state = GameState()
+    for emotion in ("sad", "battle", "sad"):
+        state.add_emotion(emotion)
+    candidates = agent.predict_next_music(state)
+    assert len(candidates) == agent.PREFETCH_CANDIDATES
+    assert candidates[:2] == ["sad", "battle"]
+
+
+def test_predict_next_music_puts_likely_ending_first():
+    state = GameState()
+    for emotion in ("battle", "charge"):
+        state.add_emotion(emotion)
+        state.next_turn()
+    candidates = agent.predict_next_music(state)
+    # 下一回合是結局：四種結局音樂排在最前面，觸發次數最多的 victory 第一
+    assert candidates == ["victory", "defeat", "heroic_death", "peaceful"]
+
+    state.next_turn()
+    assert agent.predict_next_music(state) == []
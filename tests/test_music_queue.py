@@ -0,0 +1,132 @@
+import threading
+import time
+
+import pytest
+
+from music_queue import MusicCommandQueue
+
+
+class FakePlayer:
+    def __init__(self):
+        self.music_mapping = {"battle": "battle.mp3", "calm": "calm.mp3", "mystery": "mystery.mp3"}
+        self.current = None
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def resolve_music_path(self, emotion_type):
+        return self.music_mapping.get(emotion_type.lower())
+
+    def get_current_playing(self):
+        return self.current
+
+    def play_music(self, emotion_type, language="both"):
+        music_file = self.music_mapping.get(emotion_type.lower())
+        if music_file is None:
+            return {"status": "error", "message": f"no music for {emotion_type}"}
+        self.gate.wait(2.0)
+        self.calls.append(("play", music_file, time.monotonic()))
+        self.current = music_file
+        return {"status": "success", "file": music_file}
+
+    def stop_music(self):
+        self.calls.append(("stop", None, time.monotonic()))
+        self.current = None
+        return {"status": "success"}
+
+
+@pytest.fixture
+def player():
+    return FakePlayer()
+
+
+def test_play_runs_in_background(player):
+    queue = MusicCommandQueue(player, min_dwell_seconds=0)
+    ticket = queue.play("battle")
+    assert ticket.status in ("queued", "done")
+    assert queue.wait_idle(2.0)
+    assert ticket.status == "done"
+    assert player.current == "battle.mp3"
+
+
+def test_pending_commands_coalesce_to_latest(player):
+    queue = MusicCommandQueue(player, min_dwell_seconds=0)
+    player.gate.clear()
+    first = queue.play("battle")
+    assert not queue.wait_idle(0.05)          # 第一個指令正在執行
+    second = queue.play("calm")
+    third = queue.play("mystery")
+    player.gate.set()
+    assert queue.wait_idle(2.0)
+
+    assert first.status == "done"
+    assert second.status == "superseded"
+    assert third.status == "done"
+    assert [file for action, file, _ in player.calls] == ["battle.mp3", "mystery.mp3"]
+    assert queue.get_stats()["superseded"] == 1
+
+
+def test_duplicate_pending_command_reuses_ticket(player):
+    queue = MusicCommandQueue(player, min_dwell_seconds=0)
+    player.gate.clear()
+    queue.play("battle")
+    assert not queue.wait_idle(0.05)
+    pending = queue.play("calm")
+    assert queue.play("calm") is pending
+    player.gate.set()
+    assert queue.wait_idle(2.0)
+
+
+def test_same_track_is_skipped(player):
+    queue = MusicCommandQueue(player, min_dwell_seconds=0)
+    queue.play("battle")
+    assert queue.wait_idle(2.0)
+    again = queue.play("battle")
+    assert queue.wait_idle(2.0)
+    assert again.status == "skipped"
+    assert len(player.calls) == 1
+
+
+def test_min_dwell_delays_switch_and_keeps_latest(player):
+    dwell = 0.2
+    queue = MusicCommandQueue(player, min_dwell_seconds=dwell)
+    queue.play("battle")
+    assert queue.wait_idle(2.0)
+    started = player.calls[-1][2]
+
+    calm = queue.play("calm")
+    time.sleep(0.05)
+    assert calm.status == "queued"          # 還在最短播放時間內
+    mystery = queue.play("mystery")
+    assert queue.wait_idle(2.0)
+
+    assert calm.status == "superseded"
+    assert mystery.status == "done"
+    switched = player.calls[-1][2]
+    assert switched - started >= dwell - 0.01
+    assert [file for _, file, _ in player.calls] == ["battle.mp3", "mystery.mp3"]
+
+
+def test_stop_is_not_delayed_by_dwell(player):
+    queue = MusicCommandQueue(player, min_dwell_seconds=5.0)
+    queue.play("battle")
+    assert queue.wait_idle(2.0)
+    ticket = queue.stop()
+    assert queue.wait_idle(1.0)
+    assert ticket.status == "done"
+    assert player.current is None
+
+
+def test_unknown_emotion_returns_error_without_queueing(player):
+    queue = MusicCommandQueue(player)
+    ticket = queue.play("unknown")
+    assert ticket.status == "error"
+    assert queue.get_ticket(ticket.ticket_id) is ticket
+    assert queue._thread is None
+
+
+def test_old_tickets_are_forgotten(player):
+    queue = MusicCommandQueue(player, max_tickets=2)
+    tickets = [queue.play("unknown") for _ in range(3)]
+    assert queue.get_ticket(tickets[0].ticket_id) is None
+    assert queue.get_ticket(tickets[2].ticket_id) is tickets[2]
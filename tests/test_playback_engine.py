@@ -0,0 +1,161 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pygame")
+
+import playback_engine
+from playback_engine import CrossfadeEngine
+
+
+class FakeChannel:
+    def __init__(self, index):
+        self.index = index
+        self.volume = 1.0
+        self.sound = None
+        self.stops = []           # 停止時的音量
+
+    def play(self, sound, loops=0):
+        self.sound = sound
+
+    def stop(self):
+        if self.sound is not None:
+            self.stops.append(self.volume)
+        self.sound = None
+
+    def get_busy(self):
+        return self.sound is not None
+
+    def get_volume(self):
+        return self.volume
+
+    def set_volume(self, volume):
+        self.volume = volume
+
+
+@pytest.fixture
+def channels(monkeypatch):
+    created = {}
+
+    def channel(index):
+        return created.setdefault(index, FakeChannel(index))
+
+    mixer = SimpleNamespace(set_reserved=lambda count: None, Channel=channel)
+    monkeypatch.setattr(playback_engine, "pygame", SimpleNamespace(mixer=mixer))
+    return created
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.002)
+    return False
+
+
+def playing(channels, sound):
+    return [channel for channel in channels.values() if channel.sound == sound]
+
+
+def test_crossfade_completes(channels):
+    engine = CrossfadeEngine(duration_ms=40, curve="linear", tick_ms=1)
+    engine.play(lambda: "a")
+    assert wait_until(lambda: not engine.is_busy())
+    engine.play(lambda: "b")
+    assert wait_until(lambda: not engine.is_busy())
+    assert [channel.sound for channel in channels.values() if channel.sound] == ["b"]
+    assert playing(channels, "b")[0].volume == pytest.approx(1.0)
+    old = next(channel for channel in channels.values() if channel.stops)
+    assert old.stops == [pytest.approx(0.0)]
+    assert engine.transitions == 2
+
+
+def test_request_mid_fade_fades_out_instead_of_cutting(channels):
+    engine = CrossfadeEngine(duration_ms=300, curve="linear", tick_ms=1)
+    engine.play(lambda: "a", duration_ms=0)
+    assert wait_until(lambda: not engine.is_busy())
+    engine.play(lambda: "b")
+    channel_a = playing(channels, "a")[0]
+    assert wait_until(lambda: 0.3 < channel_a.volume < 0.8)
+
+    engine.play(lambda: "c")
+    assert wait_until(lambda: playing(channels, "c"))
+    # 仍在淡出的 a 沒有被直接停止，音量從當時的值繼續往下
+    assert channel_a.sound == "a"
+    assert wait_until(lambda: not engine.is_busy())
+    assert all(volume == pytest.approx(0.0) for channel in channels.values() for volume in channel.stops)
+    assert [channel.sound for channel in channels.values() if channel.sound] == ["c"]
+
+
+def test_decode_does_not_stall_running_fade(channels):
+    engine = CrossfadeEngine(duration_ms=400, curve="linear", tick_ms=1)
+    engine.play(lambda: "a", duration_ms=0)
+    assert wait_until(lambda: not engine.is_busy())
+    engine.play(lambda: "b")
+    channel_a = playing(channels, "a")[0]
+    assert wait_until(lambda: channel_a.volume < 0.95)
+
+    release = threading.Event()
+
+    def slow_load():
+        release.wait(2.0)
+        return "c"
+
+    engine.play(slow_load)
+    before = channel_a.volume
+    # 解碼卡住時淡化仍繼續進行
+    assert wait_until(lambda: channel_a.volume < before - 0.2)
+    release.set()
+    assert wait_until(lambda: not engine.is_busy())
+    assert [channel.sound for channel in channels.values() if channel.sound] == ["c"]
+
+
+def test_superseded_load_is_dropped(channels):
+    engine = CrossfadeEngine(duration_ms=0, tick_ms=1)
+    release = threading.Event()
+
+    def slow_load():
+        release.wait(2.0)
+        return "old"
+
+    engine.play(slow_load)
+    assert wait_until(lambda: engine._loading)
+    engine.play(lambda: "new")
+    release.set()
+    assert wait_until(lambda: not engine.is_busy())
+    assert [channel.sound for channel in channels.values() if channel.sound] == ["new"]
+    assert engine.superseded == 1
+
+
+def test_stop_cancels_pending_load(channels):
+    engine = CrossfadeEngine(duration_ms=0, tick_ms=1)
+    release = threading.Event()
+
+    def slow_load():
+        release.wait(2.0)
+        return "late"
+
+    engine.play(slow_load)
+    assert wait_until(lambda: engine._loading)
+    engine.stop()
+    release.set()
+    assert wait_until(lambda: not engine.is_busy())
+    assert not any(channel.sound for channel in channels.values())
+
+
+def test_many_rapid_requests_use_bounded_channels(channels):
+    engine = CrossfadeEngine(duration_ms=200, curve="linear", tick_ms=1, channel_count=3)
+    for index in range(10):
+        engine.play(lambda index=index: f"s{index}")
+        wait_until(lambda index=index: playing(channels, f"s{index}"), timeout=0.5)
+    assert wait_until(lambda: not engine.is_busy())
+    assert len(channels) == 3
+    assert [channel.sound for channel in channels.values() if channel.sound] == ["s9"]
+
+
+def test_unknown_curve():
+    with pytest.raises(ValueError):
+        CrossfadeEngine(curve="bogus")
@@ -0,0 +1,139 @@
+import functools
+import os
+import subprocess
+import sys
+import time
+from types import SimpleNamespace
+from typing import Optional
+
+import pytest
+
+from lazy import LazySingleton, resolve
+from session_recorder import SessionRecorder, SessionReplayer, load_records, result_digest, wrap_tool
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def session_id_of(tool_context):
+    return tool_context.session.id if tool_context is not None else "local"
+
+
+def context(session_id):
+    return SimpleNamespace(session=SimpleNamespace(id=session_id))
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    recorder = SessionRecorder(str(tmp_path / "calls.jsonl"))
+    yield recorder
+    recorder.close()
+
+
+def echo(text: str, times: int = 1, tool_context: Optional[object] = None) -> dict:
+    return {"status": "success", "text": text * times, "version": 7}
+
+
+def failing(tool_context: Optional[object] = None) -> dict:
+    raise ValueError("boom")
+
+
+def test_records_arguments_and_digest(recorder):
+    wrapped = recorder.wrap(echo, session_id_of)
+    result = wrapped("ab", times=2, tool_context=context("s1"))
+    assert result["text"] == "abab"
+
+    [record] = list(load_records(recorder.path))
+    assert record["sid"] == "s1" and record["tool"] == "echo"
+    assert record["args"] == {"text": "ab", "times": 2}
+    assert record["digest"] == result_digest(result)
+    assert record["version"] == 7 and record["seq"] == 1
+
+
+def test_binding_error_does_not_mask_tool_error(recorder):
+    @functools.wraps(echo)
+    def validated(*args, **kwargs):
+        # 像 timed 一樣接受任意參數的包裝，由包裝自己回報錯誤
+        if set(kwargs) - {"text", "times", "tool_context"}:
+            raise ValueError("unknown argument")
+        return echo(*args, **kwargs)
+
+    wrapped = recorder.wrap(validated, session_id_of)
+    with pytest.raises(ValueError, match="unknown argument"):
+        wrapped("ab", colour="red")
+    assert recorder.records == 0
+
+
+def test_tool_exception_is_recorded_and_reraised(recorder):
+    wrapped = recorder.wrap(failing, session_id_of)
+    with pytest.raises(ValueError, match="boom"):
+        wrapped(tool_context=context("s1"))
+    [record] = list(load_records(recorder.path))
+    assert record["status"] == "error"
+
+
+def test_time_is_stamped_at_call_start(recorder):
+    def slow(tool_context: Optional[object] = None) -> dict:
+        time.sleep(0.2)
+        return {"status": "success"}
+
+    wrapped = recorder.wrap(slow, session_id_of)
+    wrapped()
+    wrapped()
+    first, second = load_records(recorder.path)
+    assert first["t"] < 0.1
+    assert second["t"] - first["t"] == pytest.approx(first["ms"] / 1000, abs=0.05)
+
+
+def test_load_records_skips_torn_line(recorder):
+    recorder.wrap(echo, session_id_of)("a")
+    with open(recorder.path, "a", encoding="utf-8") as f:
+        f.write('{"seq": 2, "tool"')
+    assert [record["seq"] for record in load_records(recorder.path)] == [1]
+
+
+def test_replay_reports_mismatches(recorder):
+    recorder.wrap(echo, session_id_of)("a", tool_context=context("s1"))
+    recorder.close()
+
+    same = SessionReplayer({"echo": echo}, threshold=1000).replay(load_records(recorder.path))
+    assert same["status"] == "success" and same["calls"] == 1
+
+    def changed(text: str, times: int = 1, tool_context: Optional[object] = None) -> dict:
+        return {"status": "success", "text": text.upper()}
+
+    report = SessionReplayer({"echo": changed}, threshold=1000).replay(load_records(recorder.path))
+    assert report["status"] == "regressed"
+    assert report["mismatches"][0]["tool"] == "echo"
+
+
+def test_replay_rejects_unknown_pacing():
+    with pytest.raises(ValueError):
+        SessionReplayer({}).replay([], pacing="slow")
+
+
+def test_wrap_tool_resolves_recorder_on_call(tmp_path):
+    path = tmp_path / "lazy.jsonl"
+    namespace = {}
+    namespace["recorder"] = LazySingleton(lambda: SessionRecorder(str(path)), namespace, "recorder")
+    wrapped = wrap_tool(echo, session_id_of, lambda *args: resolve(namespace["recorder"]).record(*args))
+    assert not path.exists()
+
+    assert wrapped("a", tool_context=context("s1"))["text"] == "a"
+    recorder = namespace["recorder"]
+    assert isinstance(recorder, SessionRecorder)
+    recorder.close()
+    records = load_records(str(path))
+    assert [(record["sid"], record["tool"], record["args"]) for record in records] == [("s1", "echo", {"text": "a"})]
+
+
+def test_agent_opens_record_file_on_first_call(tmp_path):
+    path = tmp_path / "agent.jsonl"
+    code = ("import os, sys; from adventure_game_master import agent; "
+            "print(os.path.exists(sys.argv[1]), any(name.startswith('google') for name in sys.modules)); "
+            "agent.get_music_info(); agent.session_recorder.close(); print(os.path.exists(sys.argv[1]))")
+    env = dict(os.environ, ADVENTURE_AUDIO_BACKEND="null", ADVENTURE_RECORD_FILE=str(path))
+    completed = subprocess.run([sys.executable, "-c", code, str(path)], capture_output=True, text=True,
+                               env=env, cwd=ROOT)
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.split() == ["False", "False", "True"]
+    assert [record["tool"] for record in load_records(str(path))] == ["get_music_info"]
@@ -0,0 +1,156 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import session_store
+from game_persistence import GameJournal
+from game_state import GameState
+from session_store import GameSession, SessionRegistry
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_store, "time", SimpleNamespace(monotonic=clock.monotonic, time=clock.time))
+    return clock
+
+
+def test_get_or_create_reuses_session(clock):
+    registry = SessionRegistry()
+    first = registry.get_or_create("a")
+    assert registry.get_or_create("a") is first
+    assert registry.get("missing") is None
+    assert registry.stats()["created"] == 1
+
+
+def test_idle_sessions_expire(clock):
+    evicted = []
+    registry = SessionRegistry(ttl_seconds=10, on_evict=evicted.append)
+    registry.get_or_create("a")
+    clock.now += 5
+    registry.get_or_create("b")
+    clock.now += 6
+    # a 閒置 11 秒，b 只閒置 6 秒
+    assert registry.evict_expired() == 1
+    assert evicted == ["a"]
+    assert registry.get("b") is not None
+    assert registry.stats()["evicted_idle"] == 1
+
+
+def test_access_refreshes_ttl(clock):
+    registry = SessionRegistry(ttl_seconds=10)
+    session = registry.get_or_create("a")
+    clock.now += 8
+    assert registry.get("a") is session
+    clock.now += 8
+    assert registry.get("a") is session
+
+
+def test_capacity_evicts_least_recently_used(clock):
+    evicted = []
+    registry = SessionRegistry(max_sessions=2, on_evict=evicted.append)
+    registry.get_or_create("a")
+    registry.get_or_create("b")
+    registry.get("a")
+    registry.get_or_create("c")
+    assert evicted == ["b"]
+    assert len(registry) == 2
+    assert registry.stats()["evicted_capacity"] == 1
+
+
+def test_eviction_callback_runs_outside_registry_lock(clock):
+    held = []
+    registry = SessionRegistry(max_sessions=1, ttl_seconds=10)
+    registry.on_evict = lambda session_id: held.append(registry._lock.locked())
+    registry.get_or_create("a")
+    registry.get_or_create("b")
+    clock.now += 20
+    registry.get_or_create("c")
+    assert held == [False, False]
+
+
+def test_evicted_session_is_reloaded(clock):
+    saved = {}
+
+    def loader(session_id):
+        return saved.get(session_id)
+
+    registry = SessionRegistry(max_sessions=1, loader=loader)
+    state = registry.get_or_create("a").game_state
+    state.add_user_action("attack")
+    saved["a"] = GameSession("a", state)
+    registry.get_or_create("b")
+
+    reloaded = registry.get("a")
+    assert reloaded is not None and reloaded.game_state is state
+    assert registry.stats()["reloaded"] == 1
+    assert registry.get("unknown") is None
+
+
+def test_reset_does_not_load(clock):
+    calls = []
+    registry = SessionRegistry(loader=lambda session_id: calls.append(session_id))
+    fresh = GameState()
+    assert registry.reset("a", fresh).game_state is fresh
+    assert calls == []
+
+
+def test_remove_calls_on_remove_not_on_evict(clock):
+    removed, evicted = [], []
+    registry = SessionRegistry(on_remove=removed.append, on_evict=evicted.append)
+    registry.get_or_create("a")
+    assert registry.remove("a")
+    assert removed == ["a"] and evicted == []
+
+
+def test_concurrent_first_access_creates_one_session(clock):
+    gate = threading.Event()
+
+    def loader(session_id):
+        gate.wait(1.0)
+        return None
+
+    registry = SessionRegistry(loader=loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get_or_create("a"))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert len({id(session) for session in results}) == 1
+    assert registry.stats()["created"] == 1
+
+
+def test_journal_keeps_evicted_sessions(tmp_path):
+    journal = GameJournal(str(tmp_path), durability="off")
+    try:
+        registry = SessionRegistry(max_sessions=1, ttl_seconds=3600, loader=journal.load_session,
+                                   on_remove=journal.record_drop)
+        state = registry.reset("a", GameState()).game_state
+        journal.record_start("a")
+        state.add_story_ref(state.scenario.opening.node_id)
+        journal.record_turn("a", "attack", "battle", None)
+        registry.get_or_create("b")           # a 被移出記憶體
+
+        assert journal.sessions()["a"]["turns"] == [["attack", "battle", None]]
+        reloaded = registry.get_or_create("a").game_state
+        assert reloaded is not state
+        assert reloaded.user_actions == ["attack"]
+
+        registry.remove("a")
+        assert "a" not in journal.sessions()
+    finally:
+        journal.close()
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import story_graph
+from story_graph import StoryGraph, get_scenario, list_scenarios, load_scenarios
+
+DEFINITION = {
+    "id": "test_cave",
+    "title": "洞穴 | Cave",
+    "max_turns": 2,
+    "opening": "start",
+    "nodes": {
+        "start": {"text": ["你走進洞穴。| You enter the cave.", "（第二行）"]},
+        "fight": {"text": "你拔劍！| You draw your sword!"},
+        "flee": {"text": "你逃走了。| You run away."},
+        "wait": {"text": "你在等待。| You wait."},
+        "win": {"text": "勝利！| Victory!", "music": "victory"},
+        "lose": {"text": "失敗。| Defeat.", "music": "defeat"}
+    },
+    "turns": [
+        {"turn": 1, "branches": [{"emotions": ["battle", "charge"], "node": "fight"},
+                                 {"emotions": ["battle", "retreat"], "node": "flee"}], "default": "wait"},
+        {"turn": 2, "branches": [{"emotions": ["battle"], "node": "win"}], "default": "lose"}
+    ]
+}
+
+
+@pytest.fixture
+def graph():
+    return StoryGraph(json.loads(json.dumps(DEFINITION)))
+
+
+def test_select_branch_and_default(graph):
+    assert graph.select(1, "charge").node_id == "fight"
+    assert graph.select(1, "retreat").node_id == "flee"
+    assert graph.select(1, "smile").node_id == "wait"
+    assert graph.select(3, "battle") is None
+
+
+def test_first_listed_branch_wins(graph):
+    assert graph.select(1, "battle").node_id == "fight"
+
+
+def test_text_lists_are_joined_and_indexed(graph):
+    assert graph.opening.text == "你走進洞穴。| You enter the cave.\n（第二行）"
+    assert graph.text_ids[graph.texts["fight"]] == "fight"
+    assert graph.nodes["fight"].render("en") == graph.localized_texts["en"]["fight"]
+
+
+def test_music_cues(graph):
+    assert graph.music_cues(2) == {"victory": ["battle"], "defeat": []}
+    assert graph.music_cues(1) == {}
+
+
+@pytest.mark.parametrize("change", [
+    lambda d: d["turns"][0]["branches"].append({"emotions": ["sad"], "node": "missing"}),
+    lambda d: d.update(opening="missing"),
+    lambda d: d["turns"].append({"turn": 5, "branches": []}),
+])
+def test_invalid_definitions(change):
+    definition = json.loads(json.dumps(DEFINITION))
+    change(definition)
+    with pytest.raises(ValueError):
+        StoryGraph(definition)
+
+
+def test_load_custom_scenario_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(story_graph, "_scenarios", {})
+    (tmp_path / "cave.json").write_text(json.dumps(DEFINITION, ensure_ascii=False), encoding="utf-8")
+    (tmp_path / "notes.txt").write_text("ignored", encoding="utf-8")
+    assert list(load_scenarios(str(tmp_path))) == ["test_cave"]
+    assert get_scenario("test_cave").title == "洞穴 | Cave"
+    with pytest.raises(KeyError):
+        get_scenario("unknown")
+
+
+def test_default_scenario_covers_every_turn():
+    scenario = get_scenario()
+    assert "giant_siege" in list_scenarios()
+    for turn in range(1, scenario.max_turns + 1):
+        assert scenario.select(turn, "no_such_emotion") is not None
+    assert set(scenario.music_cues(scenario.max_turns)) >= {"victory"}
@@ -0,0 +1,162 @@
+import json
+import threading
+
+import pytest
+
+import tracing
+from music_queue import MusicCommandQueue
+from tracing import NULL_SPAN, Tracer
+
+
+class FakePlayer:
+    def __init__(self):
+        self.music_mapping = {"battle": "battle.mp3"}
+        self.current = None
+
+    def resolve_music_path(self, emotion_type):
+        return self.music_mapping.get(emotion_type)
+
+    def get_current_playing(self):
+        return self.current
+
+    def play_music(self, emotion_type, language="both"):
+        self.current = self.music_mapping[emotion_type]
+        return {"status": "success", "file": self.current}
+
+    def stop_music(self):
+        self.current = None
+        return {"status": "success"}
+
+
+@pytest.fixture
+def tracer():
+    return Tracer(enabled=True, capacity=100)
+
+
+@pytest.fixture
+def global_tracer():
+    """音樂佇列使用模組層級的 tracer：測試期間開啟並在結束時還原"""
+    shared = tracing.tracer
+    enabled = shared.enabled
+    shared.clear()
+    shared.enable()
+    yield shared
+    shared.clear()
+    if not enabled:
+        shared.disable()
+
+
+def play_turn(tracer, trace_id):
+    with tracer.trace(trace_id), tracer.span("turn", turn=1):
+        with tracer.span("analyze_emotion"):
+            pass
+        with tracer.span("story.select"):
+            pass
+
+
+def test_disabled_tracer_returns_null_span():
+    tracer = Tracer(enabled=False)
+    assert tracer.span("x") is NULL_SPAN and tracer.trace("s") is NULL_SPAN
+    with tracer.span("x"):
+        pass
+    assert tracer.records() == []
+
+
+def test_spans_nest_and_carry_trace_id(tracer):
+    play_turn(tracer, "session-a")
+    with pytest.raises(ValueError):
+        with tracer.span("failing"):
+            raise ValueError("boom")
+
+    turn, first, second, failing = tracer.records()
+    assert [span[1] for span in (turn, first, second)] == ["turn", "analyze_emotion", "story.select"]
+    assert {span[0] for span in (turn, first, second)} == {"session-a"}
+    for child in (first, second):
+        assert turn[2] <= child[2] and child[2] + child[3] <= turn[2] + turn[3]
+    assert turn[6] == {"turn": 1}
+    assert failing[0] is None and failing[6] == {"error": "ValueError"}
+    assert [span[1] for span in tracer.records("session-a")] == ["turn", "analyze_emotion", "story.select"]
+
+
+def test_trace_id_is_per_thread(tracer):
+    def worker():
+        with tracer.span("worker"):
+            pass
+
+    with tracer.trace("session-a"):
+        thread = threading.Thread(target=worker, name="plain-worker")
+        thread.start()
+        thread.join()
+    worker_span, = tracer.records()
+    # 一般執行緒不繼承 trace id；需要時要像音樂佇列一樣自行帶過去
+    assert worker_span[0] is None and worker_span[5] == "plain-worker"
+
+
+def test_music_queue_spans_keep_trace_id(global_tracer):
+    queue = MusicCommandQueue(FakePlayer(), min_dwell_seconds=0)
+    with global_tracer.trace("session-q"):
+        ticket = queue.play("battle")
+    assert queue.wait_idle(2.0) and ticket.status == "done"
+
+    music_span, = [span for span in global_tracer.records() if span[1] == "music.play"]
+    assert music_span[0] == "session-q"
+    assert music_span[4] != threading.get_ident()
+    assert music_span[6]["file"] == "battle.mp3"
+
+
+def test_ring_buffer_keeps_newest_spans():
+    tracer = Tracer(enabled=True, capacity=3)
+    for index in range(5):
+        with tracer.span(f"span-{index}"):
+            pass
+    assert [span[1] for span in tracer.records()] == ["span-2", "span-3", "span-4"]
+
+    tracer.enable(capacity=2)
+    assert [span[1] for span in tracer.records()] == ["span-3", "span-4"]
+
+
+def test_chrome_export(tracer, tmp_path):
+    play_turn(tracer, "session-a")
+    play_turn(tracer, "session-b")
+    path = str(tmp_path / "trace.json")
+    assert tracer.export(path, "chrome") == 6
+
+    with open(path, encoding="utf-8") as f:
+        events = json.load(f)["traceEvents"]
+    processes = {event["pid"]: event["args"]["name"] for event in events if event["name"] == "process_name"}
+    assert sorted(processes.values()) == ["trace session-a", "trace session-b"]
+    complete = [event for event in events if event["ph"] == "X"]
+    assert all(event["dur"] >= 0 and event["ts"] >= 0 for event in complete)
+    turn = next(event for event in complete if event["name"] == "turn" and event["args"]["trace_id"] == "session-b")
+    assert processes[turn["pid"]] == "trace session-b" and turn["args"]["turn"] == 1
+    assert tracer.export(path, "chrome", trace_id="session-a") == 3
+
+
+def test_speedscope_export_is_balanced(tracer, tmp_path):
+    play_turn(tracer, "session-a")
+    path = str(tmp_path / "trace.speedscope.json")
+    assert tracer.export(path, "speedscope") == 3
+
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    names = [frame["name"] for frame in data["shared"]["frames"]]
+    profile, = data["profiles"]
+    assert profile["type"] == "evented" and profile["name"].startswith("session-a / ")
+
+    stack, opened = [], []
+    last_at = profile["startValue"]
+    for event in profile["events"]:
+        assert event["at"] >= last_at
+        last_at = event["at"]
+        if event["type"] == "O":
+            stack.append(event["frame"])
+            opened.append(names[event["frame"]])
+        else:
+            assert stack.pop() == event["frame"]
+    assert stack == [] and last_at == profile["endValue"]
+    assert opened == ["turn", "analyze_emotion", "story.select"]
+
+
+def test_export_rejects_unknown_format(tracer, tmp_path):
+    with pytest.raises(ValueError):
+        tracer.export(str(tmp_path / "trace.txt"), "flamegraph")
@@ -0,0 +1,64 @@
+import itertools
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from adventure_game_master import agent
+
+_ids = itertools.count()
+
+COMPACT_FIELDS = {"status", "story", "story_id", "emotion", "confidence", "music", "music_ticket",
+                  "turn", "max_turns", "game_over"}
+
+
+@pytest.fixture
+def context():
+    context = SimpleNamespace(session=SimpleNamespace(id=f"turn-test-{next(_ids)}"))
+    agent.start_game(tool_context=context)
+    return context
+
+
+def test_compact_response_fields(context):
+    result = agent.process_user_action("我要拔劍衝向巨人！", tool_context=context)
+    assert set(result) == COMPACT_FIELDS
+    assert result["status"] == "success"
+    assert result["turn"] == 1
+    assert result["emotion"] in agent.music_player.music_mapping
+
+
+def test_verbose_response_matches_compact(context):
+    other = SimpleNamespace(session=SimpleNamespace(id=f"turn-test-{next(_ids)}"))
+    agent.start_game(tool_context=other)
+    compact = agent.process_user_action("I run away from the city", tool_context=context)
+    verbose = agent.process_user_action("I run away from the city", verbose=True, tool_context=other)
+
+    assert verbose["story"] == compact["story"]
+    assert verbose["emotion_analysis"]["primary_emotion"] == compact["emotion"]
+    assert verbose["emotion_analysis"]["confidence"] == compact["confidence"]
+    assert verbose["music_status"]["file"] == compact["music"]
+    assert len(json.dumps(compact, ensure_ascii=False)) < len(json.dumps(verbose, ensure_ascii=False))
+
+
+def test_turn_details_expand_last_turn(context):
+    assert agent.get_turn_details(tool_context=context)["status"] == "error"
+    compact = agent.process_user_action("I hope for a peaceful, calm ending", tool_context=context)
+    details = agent.get_turn_details(tool_context=context)
+
+    assert details["status"] == "success"
+    assert details["turn"] == compact["turn"]
+    assert details["emotion_analysis"]["primary_emotion"] == compact["emotion"]
+    assert details["music_status"]["ticket_id"] == compact["music_ticket"]
+
+
+def test_turn_details_reset_by_new_game(context):
+    agent.process_user_action("attack", tool_context=context)
+    agent.start_game(tool_context=context)
+    assert agent.get_turn_details(tool_context=context)["status"] == "error"
+
+
+def test_game_over_after_last_turn(context):
+    results = [agent.process_user_action(action, tool_context=context)
+               for action in ["attack", "fight on", "victory"]]
+    assert [result["game_over"] for result in results] == [False, False, True]
+    assert agent.process_user_action("again", tool_context=context)["status"] == "error"
@@ -0,0 +1,228 @@
+"""
+回合流程的巢狀 span 追蹤（預設關閉）
+
+每個 span 記錄名稱、開始時間、持續時間、執行緒與 trace id（會話 id），
+結束時放進固定大小的環狀緩衝區，最舊的 span 會被覆蓋。
+可匯出成 Chrome trace-event JSON（chrome://tracing、Perfetto）或 speedscope 格式。
+
+關閉時 span() 只檢查一次旗標並回傳共用的空物件，不取時間、不配置記憶體。
+
+用法 | Usage:
+    with tracer.trace(session_id), tracer.span("turn", turn=1):
+        with tracer.span("analyze_emotion"):
+            ...
+
+設定 ADVENTURE_TRACE=1 開啟，ADVENTURE_TRACE_CAPACITY 設定緩衝區大小（預設 20000 個 span）。
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+TRACE_FORMATS = ("chrome", "speedscope")
+DEFAULT_CAPACITY = 20000
+
+# 目前執行流程所屬的 trace id；音樂指令等跨執行緒的工作需自行帶過去
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("adventure_trace_id", default=None)
+
+
+class _NullSpan:
+    """追蹤關閉時共用的空 span"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        end = time.perf_counter_ns()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        thread = threading.current_thread()
+        self.tracer.spans.append((_current_trace.get(), self.name, self.start, end - self.start,
+                                  thread.ident, thread.name, self.args))
+        return False
+
+
+class _TraceScope:
+    __slots__ = ("trace_id", "token")
+
+    def __init__(self, trace_id: Optional[str]):
+        self.trace_id = trace_id
+
+    def __enter__(self):
+        self.token = _current_trace.set(self.trace_id)
+        return self
+
+    def __exit__(self, *exc_info):
+        _current_trace.reset(self.token)
+        return False
+
+
+class Tracer:
+    def __init__(self, enabled: bool = False, capacity: int = DEFAULT_CAPACITY):
+        """
+        span 追蹤器
+
+        Args:
+            enabled (bool): 是否記錄 span
+            capacity (int): 環狀緩衝區最多保留的 span 數
+        """
+        self.enabled = enabled
+        # deque.append 本身是執行緒安全的；超過容量時自動丟掉最舊的 span
+        self.spans = deque(maxlen=capacity)
+        self._origin = time.perf_counter_ns()
+
+    def enable(self, capacity: Optional[int] = None):
+        if capacity is not None and capacity != self.spans.maxlen:
+            self.spans = deque(self.spans, maxlen=capacity)
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def clear(self):
+        self.spans.clear()
+
+    def span(self, name: str, **args):
+        """巢狀 span；同一執行緒內依時間自然形成巢狀關係"""
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name, args)
+
+    def trace(self, trace_id: Optional[str]):
+        """在 with 區塊內把 span 標上 trace id"""
+        if not self.enabled:
+            return NULL_SPAN
+        return _TraceScope(trace_id)
+
+    @staticmethod
+    def current_trace_id() -> Optional[str]:
+        return _current_trace.get()
+
+    def records(self, trace_id: Optional[str] = None) -> List[tuple]:
+        """目前緩衝區裡的 span（可只取某個 trace id），依開始時間排序"""
+        spans = list(self.spans)
+        if trace_id is not None:
+            spans = [span for span in spans if span[0] == trace_id]
+        spans.sort(key=lambda span: (span[2], -span[3]))
+        return spans
+
+    def to_chrome_trace(self, trace_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Chrome trace-event 格式：每個 trace id 一個 process，每個執行緒一個 thread
+
+        Returns:
+            Dict: {"traceEvents": [...], "displayTimeUnit": "ms"}
+        """
+        events = []
+        pids: Dict[Optional[str], int] = {}
+        threads = set()
+        for span_trace, name, start, duration, thread_id, thread_name, args in self.records(trace_id):
+            pid = pids.get(span_trace)
+            if pid is None:
+                pid = pids[span_trace] = len(pids) + 1
+                events.append({"name": "process_name", "ph": "M", "pid": pid, "tid": 0,
+                               "args": {"name": f"trace {span_trace}" if span_trace is not None else "untraced"}})
+            if (pid, thread_id) not in threads:
+                threads.add((pid, thread_id))
+                events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id,
+                               "args": {"name": thread_name}})
+            events.append({"name": name, "cat": "adventure", "ph": "X", "pid": pid, "tid": thread_id,
+                           "ts": (start - self._origin) / 1000, "dur": duration / 1000,
+                           "args": dict(args, trace_id=span_trace)})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_speedscope(self, trace_id: Optional[str] = None) -> Dict[str, Any]:
+        """speedscope 格式：每個 (trace id, 執行緒) 一個 evented profile"""
+        frames: List[Dict[str, str]] = []
+        frame_index: Dict[str, int] = {}
+        groups: Dict[tuple, List[tuple]] = {}
+        for record in self.records(trace_id):
+            groups.setdefault((record[0], record[4], record[5]), []).append(record)
+
+        profiles = []
+        for (span_trace, _, thread_name), records in groups.items():
+            events = []
+            stack: List[tuple] = []   # (結束時間, frame)
+            for _, name, start, duration, _, _, _ in records:
+                start_us = (start - self._origin) / 1000
+                end_us = start_us + duration / 1000
+                while stack and stack[-1][0] <= start_us:
+                    closed_at, frame = stack.pop()
+                    events.append({"type": "C", "frame": frame, "at": closed_at})
+                # 時間上只部分重疊（不同呼叫的誤差）時截在外層 span 的結束時間，保持巢狀
+                if stack and end_us > stack[-1][0]:
+                    end_us = stack[-1][0]
+                frame = frame_index.get(name)
+                if frame is None:
+                    frame = frame_index[name] = len(frames)
+                    frames.append({"name": name})
+                events.append({"type": "O", "frame": frame, "at": start_us})
+                stack.append((end_us, frame))
+            while stack:
+                closed_at, frame = stack.pop()
+                events.append({"type": "C", "frame": frame, "at": closed_at})
+            profiles.append({
+                "type": "evented",
+                "name": f"{span_trace if span_trace is not None else 'untraced'} / {thread_name}",
+                "unit": "microseconds",
+                "startValue": events[0]["at"],
+                "endValue": events[-1]["at"],
+                "events": events,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+            "name": "adventure-game-master",
+            "exporter": "adventure-game-master tracing",
+        }
+
+    def export(self, path: str, trace_format: str = "chrome", trace_id: Optional[str] = None) -> int:
+        """
+        匯出到檔案
+
+        Returns:
+            int: 匯出的 span 數
+
+        Raises:
+            ValueError: 不支援的格式
+        """
+        if trace_format == "chrome":
+            data = self.to_chrome_trace(trace_id)
+            count = sum(1 for event in data["traceEvents"] if event["ph"] == "X")
+        elif trace_format == "speedscope":
+            data = self.to_speedscope(trace_id)
+            count = sum(len(profile["events"]) for profile in data["profiles"]) // 2
+        else:
+            raise ValueError(f"不支援的追蹤格式 | Unsupported trace format: {trace_format}")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        return count
+
+
+# 整個程序共用的追蹤器
+tracer = Tracer(enabled=os.environ.get("ADVENTURE_TRACE", "0") == "1",
+                capacity=int(os.environ.get("ADVENTURE_TRACE_CAPACITY", str(DEFAULT_CAPACITY))))